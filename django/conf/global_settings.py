@@ -272,6 +272,10 @@ STATIC_ROOT = ''
 # Example: "http://media.lawrence.com/static/"
 STATIC_URL = None
 
+# Maximum number of GET/POST parameters a request may contain before a
+# SuspiciousOperation is raised. `None` disables the check.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
+
 # List of upload handler classes to be applied in order.
 FILE_UPLOAD_HANDLERS = (
     'django.core.files.uploadhandler.MemoryFileUploadHandler',
@@ -291,6 +295,18 @@ FILE_UPLOAD_TEMP_DIR = None
 # you'd pass directly to os.chmod; see http://docs.python.org/lib/os-file-dir.html.
 FILE_UPLOAD_PERMISSIONS = None
 
+# The header used to hand the files of FileResponse objects over to the
+# front-end Web server, e.g. 'X-Sendfile' (Apache with mod_xsendfile,
+# lighttpd) or 'X-Accel-Redirect' (nginx). `None` means Django sends the
+# files itself.
+SENDFILE_HEADER = None
+
+# A dictionary mapping directories to the URL prefixes passed to the Web
+# server in SENDFILE_HEADER, e.g. {'/var/www/protected/': '/protected/'}.
+# Files outside of these directories are sent by Django. If empty, the
+# absolute path of every file is passed instead.
+SENDFILE_ROOTS = {}
+
 # Python module path where user will place custom format definition.
 # The directory where this setting is pointing should contain subdirectories
 # named as the locales, containing a formats.py file
@@ -421,6 +437,27 @@ MIDDLEWARE_CLASSES = (
 #     'django.middleware.gzip.GZipMiddleware',
 )
 
+# Whether to record the number of calls to, and the time spent in, each
+# middleware method. See django.core.handlers.instrumentation.
+MIDDLEWARE_INSTRUMENTATION = False
+
+# The fraction of the requests profiled by the profiling middleware, and the
+# directory it writes the profiles to.
+# See django.middleware.profiling.ProfilingMiddleware.
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_DIRECTORY = None
+
+# The zlib compression level (1-9) used by the GZip middleware.
+GZIP_COMPRESSION_LEVEL = 6
+
+# Responses shorter than this many bytes aren't compressed by the GZip
+# middleware.
+GZIP_MINIMUM_SIZE = 200
+
+# The MIME types the GZip middleware compresses, e.g. ('text/*',
+# 'application/json'). An empty tuple means every content type.
+GZIP_CONTENT_TYPES = ()
+
 ############
 # SESSIONS #
 ############
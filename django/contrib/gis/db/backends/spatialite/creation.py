@@ -7,7 +7,7 @@ from django.db.backends.sqlite3.creation import DatabaseCreation
 
 class SpatiaLiteCreation(DatabaseCreation):
 
-    def create_test_db(self, verbosity=1, autoclobber=False):
+    def create_test_db(self, verbosity=1, autoclobber=False, keepdb=False):
         """
         Creates a test database, prompting the user for confirmation if the
         database already exists. Returns the name of the test database created.
@@ -26,6 +26,20 @@ class SpatiaLiteCreation(DatabaseCreation):
                 test_db_repr = " ('%s')" % test_database_name
             print "Creating test database for alias '%s'%s..." % (self.connection.alias, test_db_repr)
 
+        keepdb = keepdb and self.can_keep_test_db()
+        if keepdb:
+            template_name = self._get_test_db_template_name()
+            if self._test_db_exists(template_name):
+                if verbosity >= 1:
+                    print "Cloning it from the template kept by a previous run..."
+                self.clone_test_db(template_name, test_database_name, verbosity, autoclobber)
+                self.connection.close()
+                self.connection.settings_dict["NAME"] = test_database_name
+                self.connection.features.confirm()
+                self.connection.cursor()
+                return test_database_name
+
+        old_database_name = self.connection.settings_dict["NAME"]
         self._create_test_db(verbosity, autoclobber)
 
         self.connection.close()
@@ -69,6 +83,9 @@ class SpatiaLiteCreation(DatabaseCreation):
         # the side effect of initializing the test database.
         cursor = self.connection.cursor()
 
+        if keepdb:
+            self._save_test_db_template(template_name, old_database_name, verbosity)
+
         return test_database_name
 
     def sql_indexes_for_field(self, model, f, style):
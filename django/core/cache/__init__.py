@@ -159,6 +159,7 @@ def get_cache(backend, **kwargs):
         })
 
     """
+    alias = backend
     try:
         if '://' in backend:
             # for backwards compatibility
@@ -176,7 +177,15 @@ def get_cache(backend, **kwargs):
     except (AttributeError, ImportError), e:
         raise InvalidCacheBackendError(
             "Could not find backend '%s': %s" % (backend, e))
-    return backend_cls(location, params)
+    cache = backend_cls(location, params)
+    if params.get('INSTRUMENTATION'):
+        from django.core.cache.instrumentation import InstrumentedCache
+        cache = InstrumentedCache(alias, cache,
+                                  measure_sizes=params.get('INSTRUMENTATION_SIZES', False))
+    if params.get('REQUEST_MEMO'):
+        from django.core.cache.memo import RequestMemoCache
+        cache = RequestMemoCache(alias, cache)
+    return cache
 
 cache = get_cache(DEFAULT_CACHE_ALIAS)
 
@@ -1,5 +1,6 @@
 "Base Cache class."
 
+import uuid
 import warnings
 
 from django.core.exceptions import ImproperlyConfigured, DjangoRuntimeWarning
@@ -15,6 +16,15 @@ class CacheKeyWarning(DjangoRuntimeWarning):
 # Memcached does not accept keys longer than this.
 MEMCACHE_MAX_KEY_LENGTH = 250
 
+# Tag versions are stored in the cache itself under this prefix, and kept
+# for this long (the longest relative timeout memcached accepts).
+TAG_KEY_PREFIX = 'django.cache.tag:'
+TAG_TIMEOUT = 60 * 60 * 24 * 30
+
+# How many times set_tagged() tries to use the version of a tag set up by
+# another client before setting its own.
+TAG_SETUP_ATTEMPTS = 3
+
 def default_key_func(key, key_prefix, version):
     """
     Default function to generate keys.
@@ -221,3 +231,61 @@ class BaseCache(object):
         the new version.
         """
         return self.incr_version(key, -delta, version)
+
+    def _get_tag_versions(self, tags):
+        """
+        Returns a dict mapping each of the given tags that is present in the
+        cache to its current version, using a single get_many() call.
+        """
+        tag_keys = dict((TAG_KEY_PREFIX + tag, tag) for tag in tags)
+        found = self.get_many(tag_keys.keys())
+        return dict((tag_keys[k], v) for k, v in found.items())
+
+    def set_tagged(self, key, value, tags, timeout=None, version=None):
+        """
+        Set a value in the cache, associated with the given list of tags.
+        The value is only returned by get_tagged() until one of its tags is
+        invalidated with invalidate_tags().
+        """
+        tag_versions = self._get_tag_versions(tags)
+        for tag in tags:
+            if tag not in tag_versions:
+                # First use of this tag (or its version was evicted). If
+                # another client initializes it concurrently, use theirs,
+                # unless it's gone again by the time it's read.
+                tag_version = uuid.uuid4().hex
+                for attempt in range(TAG_SETUP_ATTEMPTS):
+                    if self.add(TAG_KEY_PREFIX + tag, tag_version, TAG_TIMEOUT):
+                        break
+                    current = self.get(TAG_KEY_PREFIX + tag)
+                    if current is not None:
+                        tag_version = current
+                        break
+                else:
+                    # This at worst invalidates the values just stored by
+                    # other clients with this tag.
+                    self.set(TAG_KEY_PREFIX + tag, tag_version, TAG_TIMEOUT)
+                tag_versions[tag] = tag_version
+        self.set(key, (tag_versions, value), timeout, version=version)
+
+    def get_tagged(self, key, default=None, version=None):
+        """
+        Fetch a value stored with set_tagged(). If the key does not exist,
+        or any of its tags has been invalidated since it was set, return
+        default.
+        """
+        entry = self.get(key, version=version)
+        if entry is None:
+            return default
+        tag_versions, value = entry
+        if tag_versions and self._get_tag_versions(tag_versions) != tag_versions:
+            return default
+        return value
+
+    def invalidate_tags(self, tags):
+        """
+        Invalidate every value stored with any of the given tags. This costs
+        one write per tag, however many values carry the tag.
+        """
+        self.set_many(dict((TAG_KEY_PREFIX + tag, uuid.uuid4().hex) for tag in tags),
+                      TAG_TIMEOUT)
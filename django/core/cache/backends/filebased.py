@@ -1,22 +1,122 @@
 "File-based cache backend"
 
 import hashlib
+import mmap
 import os
 import shutil
+import struct
 import time
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 
 from django.core.cache.backends.base import BaseCache
+from django.core.files.move import create_temp_file, file_move_safe
+
+# Every cache file starts with its expiry time as a big-endian double, so
+# that a stale entry can be rejected without unpickling anything.
+_header = struct.Struct('>d')
+
+# Global in-process index of the number of entries (and their total size) in
+# each cache directory. Keyed by directory, so that every FileBasedCache
+# instance pointing at the same location shares the bookkeeping.
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+class _CacheIndex(object):
+    """
+    Running entry count and byte size of a cache directory.
+
+    The index is populated by a single walk of the directory the first time
+    it's needed and kept up to date by the writes and deletes made by this
+    process. Other processes sharing the directory aren't seen, so the index
+    is rebuilt from disk before any cull and whenever it's older than
+    ``max_age`` seconds.
+    """
+    max_age = 300
+
+    def __init__(self, dir):
+        self.dir = dir
+        self.lock = threading.Lock()
+        self.entries = None
+        self.size = 0
+        self.last_scan = 0
+
+    def rescan(self):
+        entries = size = 0
+        for root, _, files in os.walk(self.dir):
+            for f in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, f))
+                except OSError:
+                    continue
+                entries += 1
+        self.entries, self.size = entries, size
+        self.last_scan = time.time()
+
+    def get_entries(self):
+        self.lock.acquire()
+        try:
+            if self.entries is None or time.time() - self.last_scan > self.max_age:
+                self.rescan()
+            return self.entries
+        finally:
+            self.lock.release()
+
+    def added(self, size, replaced_size=None):
+        self.lock.acquire()
+        try:
+            if self.entries is None:
+                return
+            if replaced_size is None:
+                self.entries += 1
+            else:
+                self.size -= replaced_size
+            self.size += size
+        finally:
+            self.lock.release()
+
+    def removed(self, size):
+        self.lock.acquire()
+        try:
+            if self.entries is None:
+                return
+            self.entries = max(self.entries - 1, 0)
+            self.size = max(self.size - size, 0)
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        self.lock.acquire()
+        try:
+            self.entries, self.size = 0, 0
+            self.last_scan = time.time()
+        finally:
+            self.lock.release()
+
+def _get_index(dir):
+    _indexes_lock.acquire()
+    try:
+        return _indexes.setdefault(os.path.abspath(dir), _CacheIndex(dir))
+    finally:
+        _indexes_lock.release()
 
 class FileBasedCache(BaseCache):
+    # Values whose file is at least this many bytes are unpickled straight
+    # from a memory map of the file instead of being read into a string.
+    mmap_threshold = 256 * 1024
+
     def __init__(self, dir, params):
         BaseCache.__init__(self, params)
         self._dir = dir
         if not os.path.exists(self._dir):
             self._createdir()
+        self._index = _get_index(self._dir)
 
     def add(self, key, value, timeout=None, version=None):
         if self.has_key(key, version=version):
@@ -31,17 +131,16 @@ class FileBasedCache(BaseCache):
 
         fname = self._key_to_file(key)
         try:
-            f = open(fname, 'rb')
+            f = open(fname, 'rb', 0)
             try:
-                exp = pickle.load(f)
-                now = time.time()
-                if exp < now:
+                if self._is_expired(f):
                     self._delete(fname)
                 else:
-                    return pickle.load(f)
+                    return self._read_value(f)
             finally:
                 f.close()
-        except (IOError, OSError, EOFError, pickle.PickleError):
+        except (IOError, OSError, EOFError, ValueError, struct.error,
+                pickle.PickleError):
             pass
         return default
 
@@ -61,13 +160,28 @@ class FileBasedCache(BaseCache):
             if not os.path.exists(dirname):
                 os.makedirs(dirname)
 
-            f = open(fname, 'wb')
+            # Write to a temporary file in the same directory and move it
+            # into place, so readers never see a partially written entry.
+            fd, tmp_path = create_temp_file(dirname)
+            renamed = False
             try:
-                now = time.time()
-                pickle.dump(now + timeout, f, pickle.HIGHEST_PROTOCOL)
-                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+                f = os.fdopen(fd, 'wb')
+                try:
+                    f.write(_header.pack(time.time() + timeout))
+                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+                    size = f.tell()
+                finally:
+                    f.close()
+                try:
+                    replaced_size = os.path.getsize(fname)
+                except OSError:
+                    replaced_size = None
+                file_move_safe(tmp_path, fname, allow_overwrite=True)
+                renamed = True
+                self._index.added(size, replaced_size)
             finally:
-                f.close()
+                if not renamed:
+                    os.remove(tmp_path)
         except (IOError, OSError):
             pass
 
@@ -80,7 +194,9 @@ class FileBasedCache(BaseCache):
             pass
 
     def _delete(self, fname):
+        size = os.path.getsize(fname)
         os.remove(fname)
+        self._index.removed(size)
         try:
             # Remove the 2 subdirs if they're empty
             dirname = os.path.dirname(fname)
@@ -94,24 +210,56 @@ class FileBasedCache(BaseCache):
         self.validate_key(key)
         fname = self._key_to_file(key)
         try:
-            f = open(fname, 'rb')
+            f = open(fname, 'rb', 0)
             try:
-                exp = pickle.load(f)
-                now = time.time()
-                if exp < now:
+                if self._is_expired(f):
                     self._delete(fname)
                     return False
                 else:
                     return True
             finally:
                 f.close()
-        except (IOError, OSError, EOFError, pickle.PickleError):
+        except (IOError, OSError, struct.error):
             return False
 
+    def _is_expired(self, f):
+        """
+        Reads the expiry header from the start of the open cache file ``f``.
+        Returns True if the entry has expired.
+        """
+        exp, = _header.unpack(f.read(_header.size))
+        return exp < time.time()
+
+    def _read_value(self, f):
+        """
+        Unpickles the cached value following the header of the open cache
+        file ``f``. Large values are read through a memory map rather than
+        copied into an intermediate string.
+        """
+        size = os.fstat(f.fileno()).st_size
+        if size < self.mmap_threshold:
+            return pickle.loads(f.read())
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            m.seek(_header.size)
+            return pickle.load(m)
+        finally:
+            m.close()
+
     def _cull(self):
-        if int(self._num_entries) < self._max_entries:
+        if self._index.get_entries() < self._max_entries:
             return
 
+        # Other processes may have added or removed entries since the index
+        # was last built, so make sure a cull is really needed.
+        self._index.lock.acquire()
+        try:
+            self._index.rescan()
+            if self._index.entries < self._max_entries:
+                return
+        finally:
+            self._index.lock.release()
+
         try:
             filelist = sorted(os.listdir(self._dir))
         except (IOError, OSError):
@@ -150,17 +298,20 @@ class FileBasedCache(BaseCache):
         return os.path.join(self._dir, path)
 
     def _get_num_entries(self):
-        count = 0
-        for _,_,files in os.walk(self._dir):
-            count += len(files)
-        return count
+        return self._index.get_entries()
     _num_entries = property(_get_num_entries)
 
+    def _get_size(self):
+        self._index.get_entries()
+        return self._index.size
+    _size = property(_get_size)
+
     def clear(self):
         try:
             shutil.rmtree(self._dir)
         except (IOError, OSError):
             pass
+        self._index.reset()
 
 # For backwards compatibility
 class CacheClass(FileBasedCache):
@@ -1,10 +1,47 @@
 "Memcached cache backend"
 
+import bisect
+import hashlib
+import struct
 import time
 from threading import local
 
 from django.core.cache.backends.base import BaseCache, InvalidCacheBackendError
 
+class HashRing(object):
+    """
+    A consistent hash ring compatible with libketama.
+
+    Every server is placed at 160 points on a ring of 32-bit hashes, and a
+    key belongs to the first server point at or after the key's own hash.
+    Adding or removing a server therefore only moves the keys that fall
+    between its points and their predecessors -- roughly 1/N of the keys --
+    instead of remapping almost all of them, as modulo hashing does.
+    """
+    points_per_server = 160
+
+    def __init__(self, servers):
+        ring = {}
+        for index, server in enumerate(servers):
+            for i in range(self.points_per_server // 4):
+                for point in self._hashes('%s-%d' % (server, i)):
+                    ring[point] = index
+        self._points = sorted(ring)
+        self._nodes = [ring[point] for point in self._points]
+
+    def _hashes(self, value):
+        return struct.unpack('<4I', hashlib.md5(value).digest())
+
+    def get_node(self, key):
+        """
+        Returns the index (in the server list the ring was built from) of the
+        server responsible for ``key``.
+        """
+        pos = bisect.bisect_left(self._points, self._hashes(key)[0])
+        if pos == len(self._points):
+            pos = 0
+        return self._nodes[pos]
+
 class BaseMemcachedCache(BaseCache):
     def __init__(self, server, params, library, value_not_found_exception):
         super(BaseMemcachedCache, self).__init__(params)
@@ -22,6 +59,10 @@ class BaseMemcachedCache(BaseCache):
         self._lib = library
         self._options = params.get('OPTIONS', None)
 
+        self._ring = None
+        if self._options and self._options.get('CONSISTENT_HASHING'):
+            self._ring = HashRing(self._servers)
+
     @property
     def _cache(self):
         """
@@ -48,27 +89,37 @@ class BaseMemcachedCache(BaseCache):
             timeout += int(time.time())
         return int(timeout)
 
+    def _server_key(self, key):
+        """
+        Returns the key to hand to the client library. When consistent
+        hashing is enabled, this is a (server index, key) tuple, which the
+        client uses in place of its own modulo server selection.
+        """
+        if self._ring is None:
+            return key
+        return (self._ring.get_node(key), key)
+
     def add(self, key, value, timeout=0, version=None):
         key = self.make_key(key, version=version)
-        return self._cache.add(key, value, self._get_memcache_timeout(timeout))
+        return self._cache.add(self._server_key(key), value, self._get_memcache_timeout(timeout))
 
     def get(self, key, default=None, version=None):
         key = self.make_key(key, version=version)
-        val = self._cache.get(key)
+        val = self._cache.get(self._server_key(key))
         if val is None:
             return default
         return val
 
     def set(self, key, value, timeout=0, version=None):
         key = self.make_key(key, version=version)
-        self._cache.set(key, value, self._get_memcache_timeout(timeout))
+        self._cache.set(self._server_key(key), value, self._get_memcache_timeout(timeout))
 
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
-        self._cache.delete(key)
+        self._cache.delete(self._server_key(key))
 
     def get_many(self, keys, version=None):
-        new_keys = map(lambda x: self.make_key(x, version=version), keys)
+        new_keys = map(lambda x: self._server_key(self.make_key(x, version=version)), keys)
         ret = self._cache.get_multi(new_keys)
         if ret:
             _ = {}
@@ -84,7 +135,7 @@ class BaseMemcachedCache(BaseCache):
     def incr(self, key, delta=1, version=None):
         key = self.make_key(key, version=version)
         try:
-            val = self._cache.incr(key, delta)
+            val = self._cache.incr(self._server_key(key), delta)
 
         # python-memcache responds to incr on non-existent keys by
         # raising a ValueError, pylibmc by raising a pylibmc.NotFound
@@ -99,7 +150,7 @@ class BaseMemcachedCache(BaseCache):
     def decr(self, key, delta=1, version=None):
         key = self.make_key(key, version=version)
         try:
-            val = self._cache.decr(key, delta)
+            val = self._cache.decr(self._server_key(key), delta)
 
         # python-memcache responds to incr on non-existent keys by
         # raising a ValueError, pylibmc by raising a pylibmc.NotFound
@@ -114,12 +165,12 @@ class BaseMemcachedCache(BaseCache):
     def set_many(self, data, timeout=0, version=None):
         safe_data = {}
         for key, value in data.items():
-            key = self.make_key(key, version=version)
+            key = self._server_key(self.make_key(key, version=version))
             safe_data[key] = value
         self._cache.set_multi(safe_data, self._get_memcache_timeout(timeout))
 
     def delete_many(self, keys, version=None):
-        l = lambda x: self.make_key(x, version=version)
+        l = lambda x: self._server_key(self.make_key(x, version=version))
         self._cache.delete_multi(map(l, keys))
 
     def clear(self):
@@ -158,6 +209,8 @@ class PyLibMCCache(BaseMemcachedCache):
         super(PyLibMCCache, self).__init__(server, params,
                                            library=pylibmc,
                                            value_not_found_exception=pylibmc.NotFound)
+        # libmemcached implements ketama hashing itself; see _cache below.
+        self._ring = None
 
     @property
     def _cache(self):
@@ -170,7 +223,10 @@ class PyLibMCCache(BaseMemcachedCache):
 
         client = self._lib.Client(self._servers)
         if self._options:
-            client.behaviors = self._options
+            behaviors = dict(self._options)
+            if behaviors.pop('CONSISTENT_HASHING', False):
+                behaviors['ketama'] = True
+            client.behaviors = behaviors
 
         self._local.client = client
 
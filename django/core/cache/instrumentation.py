@@ -0,0 +1,344 @@
+"""
+Cache instrumentation.
+
+Wraps a cache backend to count hits, misses, writes and deletes, optionally
+the bytes transferred, and to record a latency histogram, for the whole cache
+alias and for each key prefix (the part of the key before the first colon).
+
+Counters for the current process are available from get_stats(). Each
+process also periodically merges its counters into a record stored in the
+instrumented cache itself, which is what the ``cachestats`` management
+command reports, so that statistics from every process sharing a cache can
+be inspected in one place.
+"""
+import time
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.signals import cache_operation
+from django.utils.encoding import smart_str
+
+# Upper bounds, in seconds, of the latency histogram buckets. A final bucket
+# collects everything slower than the last bound.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+# The key under which the statistics of all processes are accumulated in the
+# instrumented cache, and how long they're kept there.
+STATS_KEY = 'django.cache.stats'
+STATS_TIMEOUT = 60 * 60 * 24 * 30
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+class CacheStats(object):
+    """
+    Counters for the operations on a cache alias, or on the keys with a given
+    prefix in that cache.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.deletes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.prefixes = {}
+
+    def __repr__(self):
+        return '<CacheStats: %d hits, %d misses, %d sets, %d deletes>' % (
+            self.hits, self.misses, self.sets, self.deletes)
+
+    def _get_hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return None
+        return float(self.hits) / lookups
+    hit_rate = property(_get_hit_rate)
+
+    def add_latency(self, duration):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.latency[i] += 1
+
+    def merge(self, other):
+        """
+        Adds the counters of another CacheStats instance to this one.
+        """
+        for attr in ('hits', 'misses', 'sets', 'deletes', 'bytes_read', 'bytes_written'):
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        for prefix, stats in other.prefixes.items():
+            self.get_prefix_stats(prefix).merge(stats)
+
+    def count(self, counter, size=0):
+        """
+        Counts an operation on a key, ``counter`` being 'hits', 'misses',
+        'sets' or 'deletes', and the size of the value read or written.
+        """
+        setattr(self, counter, getattr(self, counter) + 1)
+        if counter == 'hits':
+            self.bytes_read += size
+        elif counter == 'sets':
+            self.bytes_written += size
+
+    def get_prefix_stats(self, prefix):
+        prefix_stats = self.prefixes.get(prefix)
+        if prefix_stats is None:
+            prefix_stats = self.prefixes[prefix] = CacheStats()
+        return prefix_stats
+
+class _Recorder(object):
+    """
+    The statistics of one cache alias in this process: the running totals,
+    and the part of them not yet merged into the shared record.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+        self.pending = CacheStats()
+        self.last_flush = time.time()
+
+def _get_recorder(alias):
+    _recorders_lock.acquire()
+    try:
+        return _recorders.setdefault(alias, _Recorder())
+    finally:
+        _recorders_lock.release()
+
+def get_stats(alias=None):
+    """
+    Returns the CacheStats of the given cache alias for the current process,
+    or a dictionary of them keyed by alias if no alias is given.
+    """
+    if alias is not None:
+        return _get_recorder(alias).stats
+    return dict((alias, recorder.stats) for alias, recorder in _recorders.items())
+
+def reset_stats():
+    """
+    Discards all the statistics collected by the current process.
+    """
+    for recorder in _recorders.values():
+        recorder.lock.acquire()
+        try:
+            recorder.stats = CacheStats()
+            recorder.pending = CacheStats()
+        finally:
+            recorder.lock.release()
+
+def key_prefix(key):
+    """
+    Returns the prefix statistics for ``key`` are grouped under: the part of
+    the key before the first colon, or an empty string if it has none.
+    """
+    key = smart_str(key)
+    if ':' in key:
+        return key.split(':', 1)[0]
+    return ''
+
+def _size(value):
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PickleError, TypeError):
+        return 0
+
+# Returned by the wrapped backend on a miss, so that a stored value equal to
+# the caller's default is still counted as a hit.
+_missing = object()
+
+class InstrumentedCache(BaseCache):
+    """
+    A cache backend wrapper that records statistics for every operation and
+    sends the ``cache_operation`` signal. Enabled for a cache alias with the
+    ``INSTRUMENTATION`` setting.
+    """
+    # How often, in seconds, a process merges its statistics into the record
+    # stored in the cache.
+    flush_interval = 60
+
+    def __init__(self, alias, cache, measure_sizes=False):
+        self.alias = alias
+        self._wrapped = cache
+        self._recorder = _get_recorder(alias)
+        # Measuring the values that aren't strings means pickling them once
+        # more, so it's only done if the INSTRUMENTATION_SIZES setting is on.
+        self.measure_sizes = measure_sizes
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def _record(self, operation, start, hits=(), misses=(), sets=(), deletes=()):
+        """
+        Records an operation that started at ``start``. ``hits`` and ``sets``
+        are lists of (key, value) pairs, ``misses`` and ``deletes`` lists of
+        keys.
+        """
+        duration = time.time() - start
+        # The prefixes and sizes are computed before taking the lock.
+        counts = []
+        for counter, entries in (('hits', hits), ('sets', sets)):
+            for key, value in entries:
+                size = 0
+                if self.measure_sizes:
+                    size = _size(value)
+                counts.append((counter, key_prefix(key), size))
+        for counter, keys in (('misses', misses), ('deletes', deletes)):
+            for key in keys:
+                counts.append((counter, key_prefix(key), 0))
+        prefixes = set([prefix for counter, prefix, size in counts])
+
+        recorder = self._recorder
+        recorder.lock.acquire()
+        try:
+            for stats in (recorder.stats, recorder.pending):
+                stats.add_latency(duration)
+                for prefix in prefixes:
+                    stats.get_prefix_stats(prefix).add_latency(duration)
+                for counter, prefix, size in counts:
+                    stats.count(counter, size)
+                    stats.get_prefix_stats(prefix).count(counter, size)
+            flush = time.time() - recorder.last_flush >= self.flush_interval
+        finally:
+            recorder.lock.release()
+
+        cache_operation.send(sender=self.__class__, alias=self.alias,
+            operation=operation,
+            keys=[k for k, v in hits] + list(misses) + [k for k, v in sets] + list(deletes),
+            hits=len(hits), misses=len(misses), duration=duration)
+
+        if flush:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """
+        Merges the statistics collected since the last flush into the record
+        shared by all processes using this cache. Updates from concurrent
+        flushes may occasionally be lost, so the shared record is approximate.
+        """
+        recorder = self._recorder
+        recorder.lock.acquire()
+        try:
+            pending, recorder.pending = recorder.pending, CacheStats()
+            recorder.last_flush = time.time()
+        finally:
+            recorder.lock.release()
+        try:
+            shared = self._wrapped.get(STATS_KEY)
+            if not isinstance(shared, CacheStats):
+                shared = CacheStats()
+            shared.merge(pending)
+            self._wrapped.set(STATS_KEY, shared, STATS_TIMEOUT)
+        except Exception:
+            # Statistics must never break the application.
+            pass
+
+    def get_shared_stats(self):
+        """
+        Returns the CacheStats accumulated by all the processes using this
+        cache, including this one's unflushed statistics.
+        """
+        self.flush_stats()
+        return self._wrapped.get(STATS_KEY) or CacheStats()
+
+    def reset_shared_stats(self):
+        self._wrapped.delete(STATS_KEY)
+
+    def make_key(self, key, version=None):
+        return self._wrapped.make_key(key, version=version)
+
+    def validate_key(self, key):
+        return self._wrapped.validate_key(key)
+
+    def add(self, key, value, timeout=None, version=None):
+        start = time.time()
+        result = self._wrapped.add(key, value, timeout, version=version)
+        if result:
+            self._record('add', start, sets=[(key, value)])
+        else:
+            self._record('add', start)
+        return result
+
+    def get(self, key, default=None, version=None):
+        start = time.time()
+        value = self._wrapped.get(key, _missing, version=version)
+        if value is _missing:
+            self._record('get', start, misses=[key])
+            return default
+        self._record('get', start, hits=[(key, value)])
+        return value
+
+    def set(self, key, value, timeout=None, version=None):
+        start = time.time()
+        self._wrapped.set(key, value, timeout, version=version)
+        self._record('set', start, sets=[(key, value)])
+
+    def delete(self, key, version=None):
+        start = time.time()
+        self._wrapped.delete(key, version=version)
+        self._record('delete', start, deletes=[key])
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        start = time.time()
+        result = self._wrapped.get_many(keys, version=version)
+        self._record('get_many', start, hits=result.items(),
+                     misses=[k for k in keys if k not in result])
+        return result
+
+    def has_key(self, key, version=None):
+        start = time.time()
+        result = self._wrapped.has_key(key, version=version)
+        if result:
+            self._record('has_key', start, hits=[(key, '')])
+        else:
+            self._record('has_key', start, misses=[key])
+        return result
+
+    def incr(self, key, delta=1, version=None):
+        start = time.time()
+        try:
+            value = self._wrapped.incr(key, delta, version=version)
+        except ValueError:
+            self._record('incr', start, misses=[key])
+            raise
+        self._record('incr', start, sets=[(key, value)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        start = time.time()
+        try:
+            value = self._wrapped.decr(key, delta, version=version)
+        except ValueError:
+            self._record('decr', start, misses=[key])
+            raise
+        self._record('decr', start, sets=[(key, value)])
+        return value
+
+    def set_many(self, data, timeout=None, version=None):
+        start = time.time()
+        self._wrapped.set_many(data, timeout, version=version)
+        self._record('set_many', start, sets=data.items())
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        start = time.time()
+        self._wrapped.delete_many(keys, version=version)
+        self._record('delete_many', start, deletes=keys)
+
+    def clear(self):
+        start = time.time()
+        self._wrapped.clear()
+        self._record('clear', start)
@@ -0,0 +1,163 @@
+"""
+Request-scoped memoization of cache lookups.
+
+Wraps a cache backend so that, while a request is being handled, every value
+read from or written to the cache is also kept in a per-thread dictionary.
+Further reads of the same key during that request are answered from the
+dictionary without contacting the backend. The dictionary is discarded when
+the request finishes; outside of requests, the wrapper simply passes every
+call through to the backend.
+"""
+from threading import local
+
+from django.core import signals
+from django.core.cache.backends.base import BaseCache
+
+_state = local()
+
+def _start_memo(**kwargs):
+    _state.memos = {}
+
+def _end_memo(**kwargs):
+    _state.memos = None
+
+signals.request_started.connect(_start_memo)
+signals.request_finished.connect(_end_memo)
+
+# Memoized for keys known to be missing from the cache.
+_missing = object()
+
+class RequestMemoCache(BaseCache):
+    """
+    A cache backend wrapper that memoizes reads and writes for the duration
+    of a request. Enabled for a cache alias with the ``REQUEST_MEMO`` setting.
+
+    Values are memoized as they are, without being pickled, so the same object
+    is returned to every reader within a request.
+    """
+    def __init__(self, alias, cache):
+        self.alias = alias
+        self._wrapped = cache
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def _get_memo(self):
+        """
+        Returns the memo dictionary of this cache alias for the request being
+        handled by the current thread, or None outside of a request.
+        """
+        memos = getattr(_state, 'memos', None)
+        if memos is None:
+            return None
+        return memos.setdefault(self.alias, {})
+    _memo = property(_get_memo)
+
+    def make_key(self, key, version=None):
+        return self._wrapped.make_key(key, version=version)
+
+    def validate_key(self, key):
+        return self._wrapped.validate_key(key)
+
+    def add(self, key, value, timeout=None, version=None):
+        result = self._wrapped.add(key, value, timeout, version=version)
+        memo = self._memo
+        if memo is not None:
+            if result:
+                memo[self.make_key(key, version=version)] = value
+            else:
+                # Somebody else's value is in the cache; we don't know it.
+                memo.pop(self.make_key(key, version=version), None)
+        return result
+
+    def get(self, key, default=None, version=None):
+        memo = self._memo
+        if memo is None:
+            return self._wrapped.get(key, default, version=version)
+        memo_key = self.make_key(key, version=version)
+        try:
+            value = memo[memo_key]
+        except KeyError:
+            value = memo[memo_key] = self._wrapped.get(key, _missing, version=version)
+        if value is _missing:
+            return default
+        return value
+
+    def set(self, key, value, timeout=None, version=None):
+        self._wrapped.set(key, value, timeout, version=version)
+        memo = self._memo
+        if memo is not None:
+            memo[self.make_key(key, version=version)] = value
+
+    def delete(self, key, version=None):
+        self._wrapped.delete(key, version=version)
+        memo = self._memo
+        if memo is not None:
+            memo[self.make_key(key, version=version)] = _missing
+
+    def get_many(self, keys, version=None):
+        memo = self._memo
+        if memo is None:
+            return self._wrapped.get_many(keys, version=version)
+        result = {}
+        unknown = {}
+        for key in keys:
+            memo_key = self.make_key(key, version=version)
+            value = memo.get(memo_key)
+            if value is None:
+                unknown[key] = memo_key
+            elif value is not _missing:
+                result[key] = value
+        if unknown:
+            found = self._wrapped.get_many(unknown.keys(), version=version)
+            for key, memo_key in unknown.items():
+                memo[memo_key] = found.get(key, _missing)
+            result.update(found)
+        return result
+
+    def has_key(self, key, version=None):
+        memo = self._memo
+        if memo is not None:
+            value = memo.get(self.make_key(key, version=version))
+            if value is not None:
+                return value is not _missing
+        return self._wrapped.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._update_counter(self._wrapped.incr, key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        return self._update_counter(self._wrapped.decr, key, delta, version)
+
+    def _update_counter(self, func, key, delta, version):
+        memo = self._memo
+        try:
+            value = func(key, delta, version=version)
+        except ValueError:
+            if memo is not None:
+                memo[self.make_key(key, version=version)] = _missing
+            raise
+        if memo is not None:
+            memo[self.make_key(key, version=version)] = value
+        return value
+
+    def set_many(self, data, timeout=None, version=None):
+        self._wrapped.set_many(data, timeout, version=version)
+        memo = self._memo
+        if memo is not None:
+            for key, value in data.items():
+                memo[self.make_key(key, version=version)] = value
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._wrapped.delete_many(keys, version=version)
+        memo = self._memo
+        if memo is not None:
+            for key in keys:
+                memo[self.make_key(key, version=version)] = _missing
+
+    def clear(self):
+        self._wrapped.clear()
+        memo = self._memo
+        if memo is not None:
+            memo.clear()
@@ -5,6 +5,8 @@ Move a file in the safest way possible::
     >>> file_move_safe("/tmp/old_file", "/tmp/new_file")
 """
 
+import binascii
+import errno
 import os
 from django.core.files import locks
 
@@ -21,7 +23,7 @@ except ImportError:
         if hasattr(os, 'chmod'):
             os.chmod(dst, mode)
 
-__all__ = ['file_move_safe']
+__all__ = ['file_move_safe', 'create_temp_file']
 
 def _samefile(src, dst):
     # Macintosh, Unix.
@@ -86,3 +88,23 @@ def file_move_safe(old_file_name, new_file_name, chunk_size = 1024*64, allow_ove
         # on close anyway.)
         if getattr(e, 'winerror', 0) != 32 and getattr(e, 'errno', 0) != 13:
             raise
+
+def create_temp_file(dirname, prefix='tmp', suffix=''):
+    """
+    Creates a new file in dirname, named prefix, a random part and suffix,
+    and returns its file descriptor, open for writing, and its path.
+
+    Unlike tempfile.mkstemp(), the file gets the permissions allowed by the
+    umask, like open(), so that files moved into place with file_move_safe()
+    can be shared by processes running as different users.
+    """
+    while True:
+        path = os.path.join(dirname, prefix + binascii.hexlify(os.urandom(8)) + suffix)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+                         getattr(os, 'O_BINARY', 0), 0666)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        else:
+            return fd, path
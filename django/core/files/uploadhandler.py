@@ -14,7 +14,7 @@ from django.utils import importlib
 
 __all__ = ['UploadFileException','StopUpload', 'SkipFile', 'FileUploadHandler',
            'TemporaryFileUploadHandler', 'MemoryFileUploadHandler',
-           'load_handler', 'StopFutureHandlers']
+           'SpooledFileUploadHandler', 'load_handler', 'StopFutureHandlers']
 
 class UploadFileException(Exception):
     """
@@ -190,6 +190,54 @@ class MemoryFileUploadHandler(FileUploadHandler):
             charset = self.charset
         )
 
+class SpooledFileUploadHandler(FileUploadHandler):
+    """
+    File upload handler that keeps each file in memory until it grows larger
+    than FILE_UPLOAD_MAX_MEMORY_SIZE, and then moves it to a temporary file.
+
+    Unlike MemoryFileUploadHandler, which is only used when the whole request
+    is small, the choice is made for each file, so the small files of a large
+    request stay in memory.
+    """
+    def new_file(self, *args, **kwargs):
+        super(SpooledFileUploadHandler, self).new_file(*args, **kwargs)
+        self.file = StringIO()
+        self.spooled = False
+        # Skip the copy for files announced as large (the announced length
+        # can't be trusted, so it's never used to keep a file in memory).
+        if (self.content_length is not None and
+                self.content_length > settings.FILE_UPLOAD_MAX_MEMORY_SIZE):
+            self._spool()
+        raise StopFutureHandlers()
+
+    def _spool(self):
+        """
+        Moves the data received so far to a temporary file.
+        """
+        temp_file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset)
+        temp_file.write(self.file.getvalue())
+        self.file = temp_file
+        self.spooled = True
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.spooled and start + len(raw_data) > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            self._spool()
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        if self.spooled:
+            self.file.size = file_size
+            return self.file
+        return InMemoryUploadedFile(
+            file = self.file,
+            field_name = self.field_name,
+            name = self.file_name,
+            content_type = self.content_type,
+            size = file_size,
+            charset = self.charset
+        )
+
 
 def load_handler(path, *args, **kwargs):
     """
@@ -13,6 +13,8 @@ class BaseHandler(object):
     # Changes that are always applied to a response (in this order).
     response_fixes = [
         http.fix_location_header,
+        http.sendfile_file_response,
+        http.file_response_range,
         http.conditional_content_removal,
         http.fix_IE_for_attach,
         http.fix_IE_for_vary,
@@ -27,9 +29,13 @@ class BaseHandler(object):
         Populate middleware lists from settings.MIDDLEWARE_CLASSES.
 
         Must be called after the environment is fixed (see __call__ in subclasses).
+        If settings.MIDDLEWARE_INSTRUMENTATION is True, the methods are wrapped
+        to record the time spent in each of them (see
+        django.core.handlers.instrumentation).
         """
         from django.conf import settings
         from django.core import exceptions
+        from django.core.handlers.instrumentation import instrument
         self._view_middleware = []
         self._template_response_middleware = []
         self._response_middleware = []
@@ -54,16 +60,24 @@ class BaseHandler(object):
             except exceptions.MiddlewareNotUsed:
                 continue
 
-            if hasattr(mw_instance, 'process_request'):
-                request_middleware.append(mw_instance.process_request)
-            if hasattr(mw_instance, 'process_view'):
-                self._view_middleware.append(mw_instance.process_view)
-            if hasattr(mw_instance, 'process_template_response'):
-                self._template_response_middleware.insert(0, mw_instance.process_template_response)
-            if hasattr(mw_instance, 'process_response'):
-                self._response_middleware.insert(0, mw_instance.process_response)
-            if hasattr(mw_instance, 'process_exception'):
-                self._exception_middleware.insert(0, mw_instance.process_exception)
+            methods = {}
+            for name in ('process_request', 'process_view', 'process_template_response',
+                         'process_response', 'process_exception'):
+                if hasattr(mw_instance, name):
+                    methods[name] = getattr(mw_instance, name)
+                    if settings.MIDDLEWARE_INSTRUMENTATION:
+                        methods[name] = instrument(middleware_path, methods[name])
+
+            if 'process_request' in methods:
+                request_middleware.append(methods['process_request'])
+            if 'process_view' in methods:
+                self._view_middleware.append(methods['process_view'])
+            if 'process_template_response' in methods:
+                self._template_response_middleware.insert(0, methods['process_template_response'])
+            if 'process_response' in methods:
+                self._response_middleware.insert(0, methods['process_response'])
+            if 'process_exception' in methods:
+                self._exception_middleware.insert(0, methods['process_exception'])
 
         # We only assign to this when initialization is complete as it is used
         # as a flag for initialization being complete.
@@ -81,7 +95,7 @@ class BaseHandler(object):
             # resolver is set
             urlconf = settings.ROOT_URLCONF
             urlresolvers.set_urlconf(urlconf)
-            resolver = urlresolvers.RegexURLResolver(r'^/', urlconf)
+            resolver = urlresolvers.get_resolver(urlconf)
             try:
                 response = None
                 # Apply request middleware
@@ -95,7 +109,12 @@ class BaseHandler(object):
                         # Reset url resolver with a custom urlconf.
                         urlconf = request.urlconf
                         urlresolvers.set_urlconf(urlconf)
-                        resolver = urlresolvers.RegexURLResolver(r'^/', urlconf)
+                        if urlconf is None:
+                            # get_resolver() would fall back to ROOT_URLCONF,
+                            # let the resolver complain instead.
+                            resolver = urlresolvers.RegexURLResolver(r'^/', urlconf)
+                        else:
+                            resolver = urlresolvers.get_resolver(urlconf)
 
                     callback, callback_args, callback_kwargs = resolver.resolve(
                             request.path_info)
@@ -0,0 +1,85 @@
+"""
+Middleware instrumentation.
+
+When the ``MIDDLEWARE_INSTRUMENTATION`` setting is True, the request
+handlers wrap every middleware method they call so that the number of calls
+and the time spent in each method are recorded. Statistics for the current
+process are available from get_stats().
+"""
+import time
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+class MiddlewareStats(object):
+    """
+    Counters for one method of a middleware, e.g. the ``process_request``
+    method of ``django.middleware.common.CommonMiddleware``.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def __repr__(self):
+        return '<MiddlewareStats: %d calls, %.6fs>' % (self.calls, self.total_time)
+
+    def _get_mean_time(self):
+        if not self.calls:
+            return None
+        return self.total_time / self.calls
+    mean_time = property(_get_mean_time)
+
+    def add(self, duration):
+        self.calls += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+def get_stats():
+    """
+    Returns a dictionary of the MiddlewareStats recorded by the current
+    process, keyed by (middleware path, method name) tuples.
+    """
+    _stats_lock.acquire()
+    try:
+        return _stats.copy()
+    finally:
+        _stats_lock.release()
+
+def reset_stats():
+    """
+    Discards all the statistics collected by the current process.
+    """
+    _stats_lock.acquire()
+    try:
+        _stats.clear()
+    finally:
+        _stats_lock.release()
+
+def instrument(middleware_path, method):
+    """
+    Returns a function calling the given bound middleware method and
+    recording the time it takes, exceptions included.
+    """
+    key = (middleware_path, method.__name__)
+    def timed(*args, **kwargs):
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            duration = time.time() - start
+            _stats_lock.acquire()
+            try:
+                stats = _stats.get(key)
+                if stats is None:
+                    stats = _stats[key] = MiddlewareStats()
+                stats.add(duration)
+            finally:
+                _stats_lock.release()
+    timed.__name__ = method.__name__
+    return timed
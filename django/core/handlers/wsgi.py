@@ -227,6 +227,7 @@ class WSGIHandler(base.BaseHandler):
 
         set_script_prefix(base.get_script_name(environ))
         signals.request_started.send(sender=self.__class__)
+        response = None
         try:
             try:
                 request = self.request_class(environ)
@@ -241,7 +242,15 @@ class WSGIHandler(base.BaseHandler):
             else:
                 response = self.get_response(request)
         finally:
-            signals.request_finished.send(sender=self.__class__)
+            use_file_wrapper = (getattr(response, 'file_to_stream', None) is not None and
+                                environ.get('wsgi.file_wrapper'))
+            if getattr(response, 'streaming', False) and not use_file_wrapper:
+                # The content of a streaming response is generated while the
+                # server iterates over it, e.g. from a queryset, so the request
+                # only finishes when the server closes the response.
+                response._handler_class = self.__class__
+            else:
+                signals.request_finished.send(sender=self.__class__)
 
         try:
             status_text = STATUS_CODE_TEXT[response.status_code]
@@ -252,5 +261,9 @@ class WSGIHandler(base.BaseHandler):
         for c in response.cookies.values():
             response_headers.append(('Set-Cookie', str(c.output(header=''))))
         start_response(status, response_headers)
+        if use_file_wrapper:
+            # Let the server send the file itself, possibly with sendfile().
+            response = environ['wsgi.file_wrapper'](response.file_to_stream,
+                                                    response.block_size)
         return response
 
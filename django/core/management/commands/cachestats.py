@@ -0,0 +1,66 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--reset', action='store_true', dest='reset', default=False,
+            help='Discards the statistics after displaying them.'),
+        make_option('--prefixes', action='store_true', dest='prefixes', default=False,
+            help='Also displays the statistics of each key prefix.'),
+    )
+    help = ("Displays the hit, miss, write and latency statistics collected "
+            "for the given cache aliases (by default, every instrumented "
+            "cache in the CACHES setting).")
+    args = '[alias ...]'
+
+    requires_model_validation = False
+
+    def handle(self, *aliases, **options):
+        from django.core.cache import get_cache
+        from django.core.cache.instrumentation import (InstrumentedCache,
+            LATENCY_BUCKETS)
+
+        if aliases:
+            for alias in aliases:
+                if alias not in settings.CACHES:
+                    raise CommandError("Unknown cache alias '%s'." % alias)
+        else:
+            aliases = sorted(alias for alias, conf in settings.CACHES.items()
+                             if conf.get('INSTRUMENTATION'))
+            if not aliases:
+                raise CommandError("No cache has INSTRUMENTATION enabled.")
+
+        bounds = ['<=%gms' % (b * 1000) for b in LATENCY_BUCKETS]
+        bounds.append('>%gms' % (LATENCY_BUCKETS[-1] * 1000))
+
+        for alias in aliases:
+            cache = get_cache(alias)
+            if not isinstance(cache, InstrumentedCache):
+                raise CommandError("Cache '%s' doesn't have INSTRUMENTATION enabled." % alias)
+            stats = cache.get_shared_stats()
+            self.stdout.write("%s:\n" % alias)
+            self.write_stats(stats, bounds, '  ')
+            if options.get('prefixes'):
+                for prefix in sorted(stats.prefixes):
+                    self.stdout.write("  prefix '%s':\n" % prefix)
+                    self.write_stats(stats.prefixes[prefix], bounds, '    ')
+            if options.get('reset'):
+                cache.reset_shared_stats()
+
+    def write_stats(self, stats, bounds, indent):
+        hit_rate = stats.hit_rate
+        if hit_rate is None:
+            hit_rate = 'n/a'
+        else:
+            hit_rate = '%.1f%%' % (hit_rate * 100)
+        self.stdout.write("%shits: %d, misses: %d (hit rate: %s)\n" % (
+            indent, stats.hits, stats.misses, hit_rate))
+        self.stdout.write("%ssets: %d, deletes: %d\n" % (
+            indent, stats.sets, stats.deletes))
+        self.stdout.write("%sbytes read: %d, bytes written: %d\n" % (
+            indent, stats.bytes_read, stats.bytes_written))
+        self.stdout.write("%slatency: %s\n" % (indent, ', '.join(
+            '%s: %d' % (bound, count) for bound, count in zip(bounds, stats.latency))))
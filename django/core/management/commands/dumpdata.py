@@ -1,11 +1,27 @@
+import bz2
+import gzip
+import os
+
 from django.core.exceptions import ImproperlyConfigured
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.parallel import create_pool
 from django.core import serializers
-from django.db import router, DEFAULT_DB_ALIAS
+from django.db import connections, router, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.fields import FieldDoesNotExist
 from django.utils.datastructures import SortedDict
 
 from optparse import make_option
 
+# Number of objects fetched from the database at once.
+CHUNK_SIZE = 2000
+
+# Functions opening the output file, by extension.
+compression_types = {
+    '.gz': gzip.GzipFile,
+    '.bz2': bz2.BZ2File,
+}
+
 class Command(BaseCommand):
     option_list = BaseCommand.option_list + (
         make_option('--format', default='json', dest='format',
@@ -21,6 +37,12 @@ class Command(BaseCommand):
             help='Use natural keys if they are available.'),
         make_option('-a', '--all', action='store_true', dest='use_base_manager', default=False,
             help="Use Django's base manager to dump all models stored in the database, including those that would otherwise be filtered or modified by a custom manager."),
+        make_option('-o', '--output', default=None, dest='output',
+            help='Specifies file to which the output is written, compressed '
+                 'with gzip or bzip2 if its name ends with .gz or .bz2.'),
+        make_option('--parallel', default=1, dest='parallel', type='int',
+            help='Dumps the models in up to this number of processes. Each '
+                 'model is written to its own file in the --output directory.'),
     )
     help = ("Output the contents of the database as a fixture of the given "
             "format (using each model's default manager unless --all is "
@@ -37,6 +59,8 @@ class Command(BaseCommand):
         show_traceback = options.get('traceback', False)
         use_natural_keys = options.get('use_natural_keys', False)
         use_base_manager = options.get('use_base_manager', False)
+        output = options.get('output')
+        parallel = options.get('parallel', 1)
 
         excluded_apps = set()
         excluded_models = set()
@@ -97,24 +121,236 @@ class Command(BaseCommand):
         except KeyError:
             raise CommandError("Unknown serialization format: %s" % format)
 
-        # Now collate the objects to be serialized.
-        objects = []
-        for model in sort_dependencies(app_list.items()):
-            if model in excluded_models:
-                continue
-            if not model._meta.proxy and router.allow_syncdb(using, model):
-                if use_base_manager:
-                    objects.extend(model._base_manager.using(using).all())
-                else:
-                    objects.extend(model._default_manager.using(using).all())
+        models = [model for model in sort_dependencies(app_list.items())
+                  if model not in excluded_models and not model._meta.proxy
+                  and router.allow_syncdb(using, model)]
+
+        if parallel > 1:
+            if not output:
+                raise CommandError("The --parallel option requires an --output directory.")
+            self.dump_in_parallel(models, output, parallel, using, format=format,
+                indent=indent, use_natural_keys=use_natural_keys,
+                use_base_manager=use_base_manager)
+            return
+
+        def get_objects():
+            # Collate the objects to be serialized, one chunk at a time.
+            for model in models:
+                queryset = get_queryset(model, using, use_base_manager)
+                for obj in iterate_in_chunks(queryset):
+                    yield obj
+
+        if output:
+            for ext, open_file in compression_types.items():
+                if output.endswith(ext):
+                    break
+            else:
+                open_file = open
+            try:
+                stream = open_file(output, 'wb')
+            except IOError, e:
+                raise CommandError("Unable to open %s: %s" % (output, e))
+        else:
+            stream = self.stdout
+        try:
+            try:
+                serializers.serialize(format, get_objects(), indent=indent,
+                        use_natural_keys=use_natural_keys, stream=stream)
+            except Exception, e:
+                if show_traceback:
+                    raise
+                raise CommandError("Unable to serialize database: %s" % e)
+        finally:
+            if output:
+                stream.close()
+
+    def dump_in_parallel(self, models, directory, processes, using, **options):
+        """
+        Writes the objects of each model to its own fixture file in the given
+        directory, named after the model (e.g. "auth.user.json"), using a
+        pool of worker processes.
+
+        If the database supports it, the workers share the snapshot of the
+        data seen by this process, so that the fixtures are consistent.
+        """
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError, e:
+                raise CommandError("Unable to create directory %s: %s" % (directory, e))
+        pool = create_pool(processes, using)
+        connection = connections[using]
+        transaction.enter_transaction_management(using=using)
+        transaction.managed(True, using=using)
+        try:
+            snapshot = None
+            # The backend may need to be connected to tell whether it can
+            # share snapshots.
+            cursor = connection.cursor()
+            sql = connection.ops.export_snapshot_sql()
+            if sql:
+                cursor.execute(sql)
+                snapshot = cursor.fetchone()[0]
+            tasks = []
+            for model in models:
+                file_name = '%s.%s.%s' % (model._meta.app_label,
+                    model._meta.object_name.lower(), options['format'])
+                tasks.append(dict(options,
+                    model='%s.%s' % (model._meta.app_label, model._meta.object_name),
+                    path=os.path.join(directory, file_name),
+                    using=using, snapshot=snapshot))
+            errors = [error for error in pool.map(dump_model, tasks) if error]
+        finally:
+            pool.close()
+            pool.join()
+            transaction.rollback(using=using)
+            transaction.leave_transaction_management(using=using)
+        if errors:
+            raise CommandError("\n".join(errors))
+
+def get_queryset(model, using, use_base_manager=False):
+    """
+    Returns the queryset of the objects of the model to dump.
+    """
+    if use_base_manager:
+        return model._base_manager.using(using).all()
+    return model._default_manager.using(using).all()
+
+def dump_model(task):
+    """
+    Writes the objects of a model to a fixture file, in a worker process of
+    dumpdata --parallel. Returns an error message if this fails.
+    """
+    from django.db.models import get_model
 
+    using = task['using']
+    connection = connections[using]
+    transaction.enter_transaction_management(using=using)
+    transaction.managed(True, using=using)
+    try:
         try:
-            return serializers.serialize(format, objects, indent=indent,
-                        use_natural_keys=use_natural_keys)
+            if task['snapshot'] is not None:
+                # Setting up the connection may have started a transaction,
+                # the snapshot must be imported by a new one.
+                connection.cursor()
+                transaction.commit(using=using)
+                cursor = connection.cursor()
+                for sql in connection.ops.import_snapshot_sql(task['snapshot']):
+                    cursor.execute(sql)
+            model = get_model(*task['model'].split('.'))
+            queryset = get_queryset(model, using, task['use_base_manager'])
+            objects = Counter(iterate_in_chunks(queryset))
+            stream = open(task['path'], 'wb')
+            try:
+                serializers.serialize(task['format'], objects,
+                    indent=task['indent'], use_natural_keys=task['use_natural_keys'],
+                    stream=stream)
+            finally:
+                stream.close()
+            if not objects.count:
+                # loaddata complains about empty fixtures.
+                os.remove(task['path'])
         except Exception, e:
-            if show_traceback:
-                raise
-            raise CommandError("Unable to serialize database: %s" % e)
+            return "Unable to dump %s: %s" % (task['model'], e)
+    finally:
+        transaction.rollback(using=using)
+        transaction.leave_transaction_management(using=using)
+
+class Counter(object):
+    """
+    Wraps an iterable, counting the items it yields.
+    """
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for item in self.iterable:
+            self.count += 1
+            yield item
+
+def get_keyset_ordering(queryset):
+    """
+    Returns the ordering of a queryset as a list of (name, field, descending)
+    triples ending with the primary key, or None if the position of an object
+    in that ordering can't be expressed with filters on its own fields.
+    """
+    query = queryset.query
+    opts = queryset.model._meta
+    if query.extra_order_by:
+        return None
+    if query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = opts.ordering
+    else:
+        ordering = ()
+    keys = []
+    for name in ordering:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if name == 'pk':
+            field = opts.pk
+        else:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            # Nullable fields can't be compared with lt/gt and ordering by a
+            # relation follows the ordering of the related model.
+            if field.null or field.rel:
+                return None
+        if field.primary_key:
+            keys.append(('pk', opts.pk, descending))
+            return keys
+        keys.append((name, field, descending))
+    keys.append(('pk', opts.pk, False))
+    return keys
+
+def iterate_in_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yields the objects of a queryset, fetching at most chunk_size objects at a
+    time from the database.
+
+    Each chunk starts after the last object of the previous one in the
+    queryset's ordering, with the primary key breaking ties, so that huge
+    tables can be dumped without the database driver buffering them.
+    Querysets ordered by nullable fields, relations or extra() are walked in
+    primary key order instead.
+    """
+    keys = get_keyset_ordering(queryset)
+    if keys is None:
+        keys = [('pk', queryset.model._meta.pk, False)]
+    queryset = queryset.order_by(*[
+        (descending and '-' or '') + name for name, field, descending in keys])
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        for obj in chunk:
+            yield obj
+        if len(chunk) < chunk_size:
+            break
+        chunk = list(queryset.filter(after_object(chunk[-1], keys))[:chunk_size])
+
+def after_object(obj, keys):
+    """
+    Returns a Q object matching the objects that come after obj when ordered
+    by keys, as returned by get_keyset_ordering().
+    """
+    condition = None
+    equal = {}
+    for name, field, descending in keys:
+        if name == 'pk':
+            value = obj.pk
+        else:
+            value = getattr(obj, field.attname)
+        lookup = {'%s__%s' % (name, descending and 'lt' or 'gt'): value}
+        lookup.update(equal)
+        if condition is None:
+            condition = Q(**lookup)
+        else:
+            condition |= Q(**lookup)
+        equal[name] = value
+    return condition
 
 def sort_dependencies(app_list):
     """Sort a list of app,modellist pairs into a single list of models.
@@ -5,16 +5,20 @@ from __future__ import with_statement
 import sys
 import os
 import gzip
+import time
 import zipfile
 from optparse import make_option
+from StringIO import StringIO
 
 from django.conf import settings
 from django.core import serializers
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.core.management.color import no_style
+from django.core.management.parallel import create_pool
 from django.db import (connections, router, transaction, DEFAULT_DB_ALIAS,
       IntegrityError, DatabaseError)
-from django.db.models import get_apps
+from django.db.models import get_apps, get_model, AutoField
+from django.utils.datastructures import SortedDict
 from django.utils.itercompat import product
 
 try:
@@ -23,6 +27,55 @@ try:
 except ImportError:
     has_bz2 = False
 
+# Maximum number of objects of a model inserted at once by the --bulk option.
+BULK_BATCH_SIZE = 500
+
+# The names of the files in the fixture directories, with the modification
+# time of the directory when it was listed, by directory.
+_fixture_dir_listings = {}
+
+def list_fixture_dir(directory):
+    """
+    Returns the set of the names of the files in a fixture directory, or an
+    empty set if it doesn't exist, so that the candidate fixture files can be
+    looked up without trying to open each of them. The listing is cached
+    until the directory is modified.
+
+    The names are folded with fold_fixture_name(), since the filesystem may
+    ignore case; a candidate matching only in another case is still opened
+    to find out whether it exists.
+    """
+    directory = os.path.abspath(directory)
+    try:
+        mtime = os.stat(directory).st_mtime
+    except OSError:
+        return set()
+    listing = _fixture_dir_listings.get(directory)
+    if listing is not None and listing[0] == mtime:
+        return listing[1]
+    try:
+        names = set(fold_fixture_name(name) for name in os.listdir(directory))
+    except OSError:
+        return set()
+    # A directory modified within the resolution of its modification time
+    # could be modified again without changing it, so its listing isn't
+    # cached yet.
+    if time.time() - mtime > 2:
+        _fixture_dir_listings[directory] = (mtime, names)
+    return names
+
+def fold_fixture_name(name):
+    """
+    Returns the form of a file name compared with the names returned by
+    list_fixture_dir().
+
+    Byte strings, e.g. the names listed in a directory given as a byte
+    string, are decoded so that they can be compared with unicode labels.
+    """
+    if isinstance(name, str):
+        name = name.decode(sys.getfilesystemencoding() or 'utf-8', 'replace')
+    return os.path.normcase(name).lower()
+
 class Command(BaseCommand):
     help = 'Installs the named fixture(s) in the database.'
     args = "fixture [fixture ...]"
@@ -31,6 +84,13 @@ class Command(BaseCommand):
         make_option('--database', action='store', dest='database',
             default=DEFAULT_DB_ALIAS, help='Nominates a specific database to load '
                 'fixtures into. Defaults to the "default" database.'),
+        make_option('--bulk', action='store_true', dest='bulk', default=False,
+            help='Inserts the objects of each model in batches, with multi-row '
+                'INSERT statements. No signals are sent for these objects.'),
+        make_option('--parallel', default=1, dest='parallel', type='int',
+            help='Loads the fixtures in up to this number of processes. The '
+                'name of each fixture must start with the app label and the '
+                'name of the model of its objects, e.g. "auth.user.json".'),
     )
 
     def handle(self, *fixture_labels, **options):
@@ -41,6 +101,8 @@ class Command(BaseCommand):
 
         verbosity = int(options.get('verbosity', 1))
         show_traceback = options.get('traceback', False)
+        bulk = options.get('bulk', False)
+        parallel = options.get('parallel', 1)
 
         # commit is a stealth option - it isn't really useful as
         # a command line option, but it can be useful when invoking
@@ -50,6 +112,14 @@ class Command(BaseCommand):
         # the transaction in place when loaddata was invoked.
         commit = options.get('commit', True)
 
+        if parallel > 1:
+            if not commit:
+                raise CommandError("Fixtures loaded in parallel can't be part "
+                                   "of the current transaction.")
+            self.load_in_parallel(fixture_labels, parallel, using,
+                                  verbosity=verbosity, bulk=bulk)
+            return
+
         # Keep a count of the installed objects and fixtures
         fixture_count = 0
         loaded_object_count = 0
@@ -75,8 +145,14 @@ class Command(BaseCommand):
                 zipfile.ZipFile.__init__(self, *args, **kwargs)
                 if settings.DEBUG:
                     assert len(self.namelist()) == 1, "Zip-compressed fixtures must contain only one file."
-            def read(self):
-                return zipfile.ZipFile.read(self, self.namelist()[0])
+                self._data = None
+            def read(self, size=-1):
+                # Deserializers read the fixture in chunks; ZipFile.open()
+                # isn't available in Python 2.5, so the file is decompressed
+                # at once.
+                if self._data is None:
+                    self._data = StringIO(zipfile.ZipFile.read(self, self.namelist()[0]))
+                return self._data.read(size)
 
         compression_types = {
             None:   open,
@@ -137,6 +213,16 @@ class Command(BaseCommand):
                 if verbosity >= 2:
                     self.stdout.write("Checking %s for fixtures...\n" % humanize(fixture_dir))
 
+                # All the candidate files are in the same directory, and their
+                # names start with the name of the fixture.
+                directory, prefix = os.path.split(os.path.join(fixture_dir, fixture_name))
+                prefix = fold_fixture_name(prefix + '.')
+                fixture_files = set(name for name in list_fixture_dir(directory)
+                                    if name.startswith(prefix))
+                if not fixture_files and verbosity < 2:
+                    # There's nothing to load, nor to report.
+                    continue
+
                 label_found = False
                 for combo in product([using, None], formats, compression_formats):
                     database, format, compression_format = combo
@@ -151,6 +237,11 @@ class Command(BaseCommand):
                         self.stdout.write("Trying %s for %s fixture '%s'...\n" % \
                             (humanize(fixture_dir), file_name, fixture_name))
                     full_path = os.path.join(fixture_dir, file_name)
+                    if fold_fixture_name(os.path.basename(full_path)) not in fixture_files:
+                        if verbosity >= 2:
+                            self.stdout.write("No %s fixture '%s' in %s.\n" % \
+                                (format, fixture_name, humanize(fixture_dir)))
+                        continue
                     open_method = compression_types[compression_format]
                     try:
                         fixture = open_method(full_path, 'r')
@@ -171,6 +262,11 @@ class Command(BaseCommand):
                                     (format, fixture_name, humanize(fixture_dir)))
                             try:
                                 objects = serializers.deserialize(format, fixture, using=using)
+                                if bulk:
+                                    saver = BulkSaver(using)
+                                    save = saver.save
+                                else:
+                                    save = lambda obj: save_object(obj, using)
 
                                 with connection.constraint_checks_disabled():
                                     for obj in objects:
@@ -178,16 +274,9 @@ class Command(BaseCommand):
                                         if router.allow_syncdb(using, obj.object.__class__):
                                             loaded_objects_in_fixture += 1
                                             models.add(obj.object.__class__)
-                                            try:
-                                                obj.save(using=using)
-                                            except (DatabaseError, IntegrityError), e:
-                                                msg = "Could not load %(app_label)s.%(object_name)s(pk=%(pk)s): %(error_msg)s" % {
-                                                        'app_label': obj.object._meta.app_label,
-                                                        'object_name': obj.object._meta.object_name,
-                                                        'pk': obj.object.pk,
-                                                        'error_msg': e
-                                                    }
-                                                raise e.__class__, e.__class__(msg), sys.exc_info()[2]
+                                            save(obj)
+                                    if bulk:
+                                        saver.flush()
 
                                 # Since we disabled constraint checks, we must manually check for
                                 # any invalid keys that might have been added
@@ -263,3 +352,229 @@ class Command(BaseCommand):
         # incorrect results. See Django #7572, MySQL #37735.
         if commit:
             connection.close()
+
+
+    def load_in_parallel(self, fixture_labels, processes, using, **options):
+        """
+        Loads the fixtures using a pool of worker processes, each of them
+        loading the fixtures of a model in its own transaction.
+
+        The fixtures of a model are only loaded once the fixtures of the
+        models it depends on have been committed.
+        """
+        fixtures = SortedDict()
+        for fixture_label in fixture_labels:
+            model = get_fixture_model(fixture_label)
+            if model is None:
+                raise CommandError("Fixture '%s' can't be loaded in parallel, "
+                                   "its name doesn't start with the app label "
+                                   "and the name of a model." % fixture_label)
+            fixtures.setdefault(model, []).append(fixture_label)
+        levels = dependency_levels(fixtures.keys())
+        pool = create_pool(processes, using)
+        try:
+            for models in levels:
+                tasks = [dict(options, fixture_labels=fixtures[model], using=using)
+                         for model in models]
+                failed = False
+                for output, errors in pool.map(load_fixtures, tasks):
+                    self.stdout.write(output)
+                    if errors:
+                        self.stderr.write(self.style.ERROR(errors))
+                        failed = True
+                if failed:
+                    # The fixtures of the models depending on these would
+                    # fail too.
+                    return
+        finally:
+            pool.close()
+            pool.join()
+
+def get_fixture_model(fixture_label):
+    """
+    Returns the model a fixture is named after, e.g. the User model for
+    "auth.user.json", or None.
+    """
+    parts = os.path.basename(fixture_label).split('.')
+    if len(parts) < 2:
+        return None
+    return get_model(parts[0], parts[1])
+
+def dependency_levels(models):
+    """
+    Groups the models in levels, so that each model only depends (through
+    foreign keys, many-to-many relations or natural key dependencies) on the
+    models of the previous levels, or on models outside of the given ones.
+
+    Returns a list of lists of models.
+    """
+    models = set(models)
+    dependencies = {}
+    for model in models:
+        deps = set()
+        if hasattr(model, 'natural_key'):
+            for dep in getattr(model.natural_key, 'dependencies', []):
+                deps.add(get_model(*dep.split('.')))
+        for field in model._meta.fields + model._meta.many_to_many:
+            if field.rel:
+                deps.add(field.rel.to)
+        deps.discard(model)
+        dependencies[model] = deps & models
+
+    levels = []
+    done = set()
+    while dependencies:
+        level = [model for model, deps in dependencies.items() if deps <= done]
+        if not level:
+            raise CommandError("Can't resolve dependencies for %s, they can't be loaded in parallel." %
+                ', '.join(sorted('%s.%s' % (model._meta.app_label, model._meta.object_name)
+                                 for model in dependencies)))
+        level.sort(key=lambda model: (model._meta.app_label, model._meta.object_name))
+        for model in level:
+            del dependencies[model]
+        done.update(level)
+        levels.append(level)
+    return levels
+
+def load_fixtures(task):
+    """
+    Loads fixtures in a worker process of loaddata --parallel. Returns the
+    output and the error output of the loaddata command.
+    """
+    from django.core.management import call_command
+
+    stdout, stderr = StringIO(), StringIO()
+    try:
+        call_command('loaddata', *task['fixture_labels'], **{
+            'database': task['using'], 'verbosity': task['verbosity'],
+            'bulk': task['bulk'], 'stdout': stdout, 'stderr': stderr})
+    except Exception, e:
+        stderr.write("Problem installing fixtures %s: %s\n" % (
+            ', '.join(task['fixture_labels']), e))
+    return stdout.getvalue(), stderr.getvalue()
+
+def save_object(obj, using):
+    """
+    Saves a deserialized object, adding the object to the message of the
+    database errors.
+    """
+    try:
+        obj.save(using=using)
+    except (DatabaseError, IntegrityError), e:
+        msg = "Could not load %(app_label)s.%(object_name)s(pk=%(pk)s): %(error_msg)s" % {
+                'app_label': obj.object._meta.app_label,
+                'object_name': obj.object._meta.object_name,
+                'pk': obj.object.pk,
+                'error_msg': e
+            }
+        raise e.__class__, e.__class__(msg), sys.exc_info()[2]
+
+class BulkSaver(object):
+    """
+    Saves deserialized objects in batches of up to BULK_BATCH_SIZE
+    consecutive objects of the same model.
+
+    The objects of a batch that don't exist in the database yet are inserted
+    with multi-row INSERT statements, and so are the rows of the
+    automatically created through tables of their many-to-many fields.
+    Existing objects are updated one at a time, like DeserializedObject.save()
+    does. If the batch insert fails, e.g. because of a conflicting row, it's
+    rolled back and the objects are saved one at a time instead.
+
+    The deserializers look up natural keys in the database while reading the
+    objects that follow, so the objects of models with natural keys are saved
+    right away, and so are objects without a primary key and objects of proxy
+    models or of models using multi-table inheritance.
+    """
+    def __init__(self, using):
+        self.using = using
+        self.model = None
+        self.batch = SortedDict()
+        self._can_batch = {}
+
+    def save(self, obj):
+        model = obj.object.__class__
+        if model is not self.model:
+            self.flush()
+        pk = obj.object.pk
+        if pk is None or not self.can_batch(model):
+            save_object(obj, self.using)
+            return
+        if pk in self.batch:
+            # The object appears twice; the second one updates the first.
+            self.flush()
+        self.model = model
+        self.batch[pk] = obj
+        if len(self.batch) >= BULK_BATCH_SIZE:
+            self.flush()
+
+    def can_batch(self, model):
+        if model not in self._can_batch:
+            opts = model._meta
+            self._can_batch[model] = not (opts.proxy or opts.parents or
+                hasattr(model._default_manager, 'get_by_natural_key'))
+        return self._can_batch[model]
+
+    def flush(self):
+        """
+        Saves the pending objects.
+        """
+        if self.batch:
+            self._save_batch(self.model, self.batch.values())
+        self.model = None
+        self.batch = SortedDict()
+
+    def _save_batch(self, model, objs):
+        existing = set(model._base_manager.using(self.using).filter(
+            pk__in=[obj.object.pk for obj in objs]).values_list('pk', flat=True))
+        new_objs = []
+        for obj in objs:
+            if obj.object.pk in existing:
+                save_object(obj, self.using)
+            else:
+                new_objs.append(obj)
+        if not new_objs:
+            return
+        sid = transaction.savepoint(using=self.using)
+        try:
+            self._insert(model, new_objs)
+        except (DatabaseError, IntegrityError):
+            transaction.savepoint_rollback(sid, using=self.using)
+            for obj in new_objs:
+                save_object(obj, self.using)
+        else:
+            transaction.savepoint_commit(sid, using=self.using)
+            for obj in new_objs:
+                obj.m2m_data = None
+
+    def _insert(self, model, objs):
+        self._bulk_insert(model, [obj.object for obj in objs],
+                          model._meta.local_fields)
+        through_rows = SortedDict()
+        for obj in objs:
+            for field_name, values in (obj.m2m_data or {}).items():
+                field = model._meta.get_field(field_name)
+                through = field.rel.through
+                if not through._meta.auto_created or field.rel.symmetrical:
+                    # The relations in the other direction have to be added
+                    # too, let the related manager do it.
+                    setattr(obj.object, field_name, values)
+                    continue
+                source = through._meta.get_field(field.m2m_field_name()).attname
+                target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+                rows = through_rows.setdefault(through, [])
+                seen = set()
+                for value in values:
+                    if value not in seen:
+                        seen.add(value)
+                        rows.append(through(**{source: obj.object.pk, target: value}))
+        for through, rows in through_rows.items():
+            self._bulk_insert(through, rows, [f for f in through._meta.local_fields
+                                              if not isinstance(f, AutoField)])
+
+    def _bulk_insert(self, model, objs, fields):
+        ops = connections[self.using].ops
+        batch_size = ops.bulk_batch_size(fields, objs)
+        for i in range(0, len(objs), batch_size):
+            model._base_manager._insert(objs[i:i + batch_size], fields=fields,
+                                        using=self.using, raw=True)
@@ -0,0 +1,76 @@
+import os
+import pstats
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--directory', dest='directory', default=None,
+            help='The directory holding the profiles. Defaults to the '
+                 'PROFILING_DIRECTORY setting.'),
+        make_option('--sort', dest='sort', default='cumulative',
+            help='The key used to sort the functions, e.g. "cumulative" '
+                 '(the default), "time" or "calls".'),
+        make_option('--limit', dest='limit', type='int', default=20,
+            help='The number of functions to display. Defaults to 20.'),
+        make_option('--clear', action='store_true', dest='clear', default=False,
+            help='Deletes the profiles after displaying them.'),
+    )
+    help = ("Summarizes the requests profiled by the ProfilingMiddleware, "
+            "by URL name, and displays the functions where they spent the "
+            "most time. Only the requests to the given URL names are "
+            "considered, if any.")
+    args = '[url_name ...]'
+
+    requires_model_validation = False
+
+    def handle(self, *url_names, **options):
+        from django.middleware.profiling import _Stats, load_profiles
+
+        directory = options.get('directory') or settings.PROFILING_DIRECTORY
+        if not directory:
+            raise CommandError("No directory given and the PROFILING_DIRECTORY "
+                               "setting isn't set.")
+        # The samples are added up into the profiles of their URL names, which
+        # are read one at a time; only their summaries are kept, to add up
+        # the stats of many URL names in little memory.
+        rows = []
+        files = []
+        stats = None
+        for profile in load_profiles(directory):
+            name = profile['url_name'] or '(unresolved)'
+            if url_names and name not in url_names:
+                continue
+            files.append(profile['file'])
+            rows.append((name, profile['requests'], profile['total_duration'],
+                         profile['max_duration'], profile['queries']))
+            profile_stats = pstats.Stats(_Stats(profile['stats']), stream=self.stdout)
+            if stats is None:
+                stats = profile_stats
+            else:
+                stats.add(profile_stats)
+        if stats is None:
+            self.stdout.write("No profiles found.\n")
+            return
+
+        self.stdout.write("%-40s %8s %10s %10s %8s\n" % (
+            'URL name', 'requests', 'mean (ms)', 'max (ms)', 'queries'))
+        rows.sort(key=lambda row: -row[1])
+        for name, requests, total_duration, max_duration, queries in rows:
+            self.stdout.write("%-40s %8d %10.1f %10.1f %8.1f\n" % (
+                name, requests, total_duration * 1000 / requests,
+                max_duration * 1000, float(queries) / requests))
+        self.stdout.write("\n")
+
+        try:
+            stats.sort_stats(options.get('sort'))
+        except KeyError:
+            raise CommandError("Unknown sort key '%s'." % options.get('sort'))
+        stats.print_stats(options.get('limit'))
+
+        if options.get('clear'):
+            for path in files:
+                os.remove(path)
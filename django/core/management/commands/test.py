@@ -10,6 +10,13 @@ class Command(BaseCommand):
             help='Tells Django to NOT prompt the user for input of any kind.'),
         make_option('--failfast', action='store_true', dest='failfast', default=False,
             help='Tells Django to stop running the test suite after first failed test.'),
+        make_option('--keepdb', action='store_true', dest='keepdb', default=False,
+            help='Keeps a template of the test database between runs, and clones '
+                 'it instead of creating the test database while the models '
+                 'don\'t change.'),
+        make_option('--parallel', action='store', dest='parallel', type='int', default=1,
+            help='Runs the tests in up to this number of processes, each using '
+                 'its own copy of the test databases.'),
         make_option('--testrunner', action='store', dest='testrunner',
             help='Tells Django to use specified test runner class instead of the one '+
                  'specified by the TEST_RUNNER setting.')
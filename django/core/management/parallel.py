@@ -0,0 +1,47 @@
+"""
+Helpers for the management commands that spread their work over several
+processes, such as ``dumpdata --parallel``, ``loaddata --parallel`` and
+``test --parallel``.
+"""
+try:
+    import multiprocessing
+except ImportError:
+    # Python 2.5
+    multiprocessing = None
+
+from django.core.management.base import CommandError
+from django.db import connections
+
+# The database connections inherited by a worker process. They're kept alive
+# because closing them would also close them in the parent process.
+_inherited_connections = []
+
+def detach_connections(aliases=None):
+    """
+    Makes the database connections open in the parent process unused by the
+    current (worker) process, so that it opens its own connections. Only the
+    connections of the given aliases are detached, if any are given.
+    """
+    if aliases is None:
+        aliases = list(connections)
+    for alias in aliases:
+        connection = connections[alias]
+        if connection.connection is not None:
+            _inherited_connections.append(connection.connection)
+            connection.connection = None
+
+def create_pool(processes, using):
+    """
+    Returns a multiprocessing.Pool of the given number of worker processes,
+    which use their own connections to the given database.
+    """
+    if multiprocessing is None:
+        raise CommandError("Running in parallel requires the multiprocessing "
+                           "module, which is only available in Python 2.6 "
+                           "and later.")
+    connection = connections[using]
+    if (connection.vendor == 'sqlite' and
+            connection.settings_dict['NAME'] in ('', ':memory:')):
+        raise CommandError("An in-memory SQLite database can't be used by "
+                           "several processes.")
+    return multiprocessing.Pool(processes, initializer=detach_connections)
@@ -25,6 +25,7 @@ BUILTIN_SERIALIZERS = {
     "xml"    : "django.core.serializers.xml_serializer",
     "python" : "django.core.serializers.python",
     "json"   : "django.core.serializers.json",
+    "binary" : "django.core.serializers.binary",
 }
 
 # Check for PyYaml and register the serializer if it's available.
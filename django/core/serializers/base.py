@@ -5,6 +5,7 @@ Module for abstract serializer/unserializer base classes.
 from StringIO import StringIO
 
 from django.db import models
+from django.db.models.query import ValuesQuerySet
 from django.utils.encoding import smart_unicode
 
 class SerializerDoesNotExist(KeyError):
@@ -38,25 +39,57 @@ class Serializer(object):
         self.selected_fields = options.pop("fields", None)
         self.use_natural_keys = options.pop("use_natural_keys", False)
 
+        if isinstance(queryset, ValuesQuerySet):
+            if self.use_natural_keys:
+                # The related objects aren't selected by values().
+                raise SerializationError("Natural keys can't be used to serialize "
+                                         "the rows of a values() queryset.")
+            queryset = values_objects(queryset)
+
+        # The fields to handle and their handlers, by model. They're only
+        # looked up once, for the first object of each model.
+        plans = {}
+
         self.start_serialization()
         for obj in queryset:
             self.start_object(obj)
-            for field in obj._meta.local_fields:
-                if field.serialize:
-                    if field.rel is None:
-                        if self.selected_fields is None or field.attname in self.selected_fields:
-                            self.handle_field(obj, field)
-                    else:
-                        if self.selected_fields is None or field.attname[:-3] in self.selected_fields:
-                            self.handle_fk_field(obj, field)
-            for field in obj._meta.many_to_many:
-                if field.serialize:
-                    if self.selected_fields is None or field.attname in self.selected_fields:
-                        self.handle_m2m_field(obj, field)
+            plan = plans.get(obj.__class__)
+            if plan is None:
+                plan = plans[obj.__class__] = self.get_field_plan(obj)
+            for handler, field in plan:
+                handler(obj, field)
             self.end_object(obj)
         self.end_serialization()
         return self.getvalue()
 
+    def get_field_plan(self, obj):
+        """
+        Returns the list of the (handler, field) pairs to call for each object
+        of the same class as the given object.
+        """
+        plan = []
+        if isinstance(obj, ValuesObject):
+            # Only the selected values can be serialized, and they don't
+            # include the many-to-many relations.
+            local_fields = [f for f in obj._meta.local_fields if f.attname in obj.__dict__]
+            many_to_many = []
+        else:
+            local_fields = obj._meta.local_fields
+            many_to_many = obj._meta.many_to_many
+        for field in local_fields:
+            if field.serialize:
+                if field.rel is None:
+                    if self.selected_fields is None or field.attname in self.selected_fields:
+                        plan.append((self.handle_field, field))
+                else:
+                    if self.selected_fields is None or field.attname[:-3] in self.selected_fields:
+                        plan.append((self.handle_fk_field, field))
+        for field in many_to_many:
+            if field.serialize:
+                if self.selected_fields is None or field.attname in self.selected_fields:
+                    plan.append((self.handle_m2m_field, field))
+        return plan
+
     def get_string_value(self, obj, field):
         """
         Convert a field's value to a string.
@@ -113,6 +146,33 @@ class Serializer(object):
         if callable(getattr(self.stream, 'getvalue', None)):
             return self.stream.getvalue()
 
+class ValuesObject(object):
+    """
+    Stands for a model instance in the serializers, holding a dictionary of
+    field values from a values() queryset, so that the queryset's rows can be
+    serialized without instantiating the model.
+    """
+    def __init__(self, opts, values):
+        self.__dict__.update(values)
+        self._meta = opts
+
+    def _get_pk_val(self):
+        return self.__dict__.get(self._meta.pk.attname)
+
+def values_objects(queryset):
+    """
+    Yields a ValuesObject for each row of a values() queryset.
+    """
+    opts = queryset.model._meta
+    # The foreign keys may be selected by their name rather than by their
+    # attname.
+    renames = [(f.name, f.attname) for f in opts.fields if f.name != f.attname]
+    for values in queryset:
+        for name, attname in renames:
+            if name in values:
+                values[attname] = values.pop(name)
+        yield ValuesObject(opts, values)
+
 class Deserializer(object):
     """
     Abstract base deserializer class.
@@ -173,3 +233,107 @@ class DeserializedObject(object):
         # prevent a second (possibly accidental) call to save() from saving
         # the m2m data twice.
         self.m2m_data = None
+
+class NaturalKeyResolver(object):
+    """
+    Looks up the objects referenced by natural keys during a
+    deserialization, remembering the objects found so that each natural key
+    is only looked up once.
+
+    The first time a natural key of a model is looked up, all the objects of
+    the model are fetched at once if there are at most PREFETCH_LIMIT of
+    them, which is checked by fetching at most PREFETCH_LIMIT + 1 primary
+    keys, e.g. the content types or the permissions. Natural keys shared by
+    several of these objects aren't remembered, so that looking them up still
+    raises MultipleObjectsReturned, and the keys that aren't found among
+    them are looked up with get_by_natural_key().
+
+    The deserializers call forget() once the objects of a model they yielded
+    may have been saved, since that may have added or changed natural keys.
+    The objects of a model are only fetched at once until then; afterwards
+    its keys are looked up one by one.
+    """
+    PREFETCH_LIMIT = 1000
+
+    def __init__(self, using):
+        self.using = using
+        self.objects = {}
+        self.prefetched = set()
+        self.changed = set()
+
+    def get(self, model, natural_key):
+        key = tuple(natural_key)
+        objects = self.objects.setdefault(model, {})
+        try:
+            obj = objects.get(key)
+        except TypeError:
+            # The natural key isn't hashable.
+            return self.lookup(model, natural_key)
+        if obj is None:
+            if model not in self.prefetched and model not in self.changed:
+                self.prefetch(model)
+                obj = objects.get(key)
+            if obj is None:
+                obj = objects[key] = self.lookup(model, natural_key)
+        return obj
+
+    def forget(self, model):
+        """
+        Forgets the objects found for the natural keys of model, and of the
+        models sharing tables with it through inheritance.
+        """
+        for other in self.objects.keys():
+            if issubclass(other, model) or issubclass(model, other):
+                del self.objects[other]
+                if other in self.prefetched:
+                    self.prefetched.discard(other)
+                    self.changed.add(other)
+
+    def lookup(self, model, natural_key):
+        manager = model._default_manager.db_manager(self.using)
+        return manager.get_by_natural_key(*natural_key)
+
+    def prefetch(self, model):
+        self.prefetched.add(model)
+        if not hasattr(model, 'natural_key'):
+            return
+        queryset = model._default_manager.db_manager(self.using).all()
+        # Tell large tables from the primary keys alone, rather than with the
+        # joins below, since each deserializer prefetches again.
+        pks = queryset.values_list('pk', flat=True)[:self.PREFETCH_LIMIT + 1]
+        if len(pks) > self.PREFETCH_LIMIT:
+            return
+        # natural_key() often uses the natural keys of related objects; fetch
+        # them in the same query, nullable foreign keys included.
+        related = self.related_fields(model)
+        if related:
+            queryset = queryset.select_related(*related)
+        objects = list(queryset)
+        found = {}
+        duplicates = set()
+        for obj in objects:
+            try:
+                key = tuple(obj.natural_key())
+                if key in found:
+                    duplicates.add(key)
+                found[key] = obj
+            except TypeError:
+                pass
+        for key in duplicates:
+            del found[key]
+        self.objects.setdefault(model, {}).update(found)
+
+    def related_fields(self, model, prefix='', seen=()):
+        """
+        Returns the select_related() lookups following the foreign keys of
+        model, and those of the related models having a natural key.
+        """
+        seen += (model,)
+        names = []
+        for field in model._meta.fields:
+            if field.rel and field.rel.to not in seen:
+                name = prefix + field.name
+                names.append(name)
+                if hasattr(field.rel.to, 'natural_key'):
+                    names.extend(self.related_fields(field.rel.to, name + '__', seen))
+        return names
@@ -0,0 +1,148 @@
+"""
+A compact binary serializer.
+
+The data is a sequence of records, each of them marshalled and prefixed by
+its length, so that it can be read one object at a time. The names of the
+serialized fields of a model are written once, in a header record; the
+records of its objects then only hold their primary key and the values of
+these fields, in the same order.
+
+Like pickle, marshal isn't meant to be secure against maliciously
+constructed data: only load binary fixtures from trusted sources.
+"""
+
+import marshal
+import struct
+from StringIO import StringIO
+
+from django.core.serializers import base
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.utils.encoding import smart_unicode
+
+# The data starts with this signature.
+SIGNATURE = 'DJBIN1\n'
+
+# Version 2 of the marshal format is available since Python 2.5.
+MARSHAL_VERSION = 2
+
+HEADER = 'H'
+OBJECT = 'O'
+
+# Values of exactly these types are written as they are, others are
+# converted to strings first: marshal doesn't handle subclasses, e.g. the
+# safe strings.
+NATIVE_TYPES = (bool, int, long, float, str, unicode)
+
+record_length = struct.Struct('>I')
+
+def native_value(value):
+    """
+    Returns a value that marshal can handle: the lists of many-to-many keys
+    and the natural keys are converted item by item, other values that
+    aren't of a native type are converted to strings.
+    """
+    if isinstance(value, (list, tuple)):
+        return type(value)([native_value(v) for v in value])
+    if value is None or type(value) in NATIVE_TYPES:
+        return value
+    return smart_unicode(value)
+
+class Serializer(PythonSerializer):
+    """
+    Convert a queryset to compact binary data.
+    """
+    internal_use_only = False
+
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        self.writer = Writer(self.stream)
+
+    def handle_field(self, obj, field):
+        value = field._get_val_from_obj(obj)
+        if value is not None and type(value) not in NATIVE_TYPES:
+            value = field.value_to_string(obj)
+        self._current[field.name] = value
+
+    def end_object(self, obj):
+        self.writer.write(self.get_dump_object(obj))
+        self._current = None
+
+    def getvalue(self):
+        if callable(getattr(self.stream, 'getvalue', None)):
+            return self.stream.getvalue()
+
+class Writer(object):
+    """
+    Writes objects, as dictionaries like the ones of the Python serializer,
+    to a stream of binary data.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        # Indexes of the headers written so far, by model and field names.
+        self.headers = {}
+        self.stream.write(SIGNATURE)
+
+    def write(self, data):
+        fields = data["fields"]
+        names = tuple(sorted(fields))
+        index = self.headers.get((data["model"], names))
+        if index is None:
+            index = self.headers[data["model"], names] = len(self.headers)
+            self.write_record((HEADER, index, data["model"], names))
+        self.write_record((OBJECT, index, native_value(data["pk"]),
+                           tuple([native_value(fields[name]) for name in names])))
+
+    def write_record(self, record):
+        try:
+            data = marshal.dumps(record, MARSHAL_VERSION)
+        except ValueError, e:
+            raise base.SerializationError("Unable to serialize %r: %s" % (record, e))
+        self.stream.write(record_length.pack(len(data)))
+        self.stream.write(data)
+
+def Deserializer(stream_or_string, **options):
+    """
+    Deserialize a stream or string of binary data.
+    """
+    if isinstance(stream_or_string, basestring):
+        stream = StringIO(stream_or_string)
+    else:
+        stream = stream_or_string
+    for obj in PythonDeserializer(read_objects(stream), **options):
+        yield obj
+
+def read_objects(stream):
+    """
+    Yields the objects read from a stream of binary data, as dictionaries
+    like the ones of the Python serializer.
+    """
+    if stream.read(len(SIGNATURE)) != SIGNATURE:
+        raise base.DeserializationError("Invalid binary data signature.")
+    headers = {}
+    while True:
+        data = stream.read(record_length.size)
+        if not data:
+            return
+        if len(data) < record_length.size:
+            raise base.DeserializationError("Truncated binary data.")
+        length = record_length.unpack(data)[0]
+        data = stream.read(length)
+        if len(data) < length:
+            raise base.DeserializationError("Truncated binary data.")
+        try:
+            record = marshal.loads(data)
+        except (EOFError, ValueError, TypeError), e:
+            raise base.DeserializationError("Invalid binary record: %s" % e)
+        if record[0] == HEADER:
+            index, model, names = record[1:]
+            headers[index] = (model, names)
+        elif record[0] == OBJECT:
+            index, pk, values = record[1:]
+            try:
+                model, names = headers[index]
+            except KeyError:
+                raise base.DeserializationError("Binary record of unknown model %r." % index)
+            yield {"model": model, "pk": pk, "fields": dict(zip(names, values))}
+        else:
+            raise base.DeserializationError("Unknown binary record type %r." % record[0])
@@ -4,6 +4,7 @@ Serialize data to/from JSON
 
 import datetime
 import decimal
+import re
 from StringIO import StringIO
 
 from django.core.serializers.python import Serializer as PythonSerializer
@@ -11,14 +12,46 @@ from django.core.serializers.python import Deserializer as PythonDeserializer
 from django.utils import datetime_safe
 from django.utils import simplejson
 
+# Number of bytes read from a stream at once while deserializing.
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
 class Serializer(PythonSerializer):
     """
     Convert a queryset to JSON.
+
+    Each object is written to the stream as soon as it has been serialized,
+    so that querysets of any size can be serialized without holding all of
+    them in memory. The output is the same as dumping the whole list at once.
     """
     internal_use_only = False
 
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        self._first = True
+        self._indent = self.options.get('indent')
+        self._encoder = DjangoJSONEncoder(**self.options)
+        self.stream.write("[")
+
+    def end_object(self, obj):
+        data = self._encoder.encode(self.get_dump_object(obj))
+        if self._first:
+            self._first = False
+        else:
+            self.stream.write(self._encoder.item_separator)
+        if self._indent is not None:
+            # Nest the object in the list.
+            newline = '\n' + ' ' * self._indent
+            self.stream.write(newline)
+            data = data.replace('\n', newline)
+        self.stream.write(data)
+        self._current = None
+
     def end_serialization(self):
-        simplejson.dump(self.objects, self.stream, cls=DjangoJSONEncoder, **self.options)
+        if self._indent is not None and not self._first:
+            self.stream.write("\n")
+        self.stream.write("]")
 
     def getvalue(self):
         if callable(getattr(self.stream, 'getvalue', None)):
@@ -27,14 +60,106 @@ class Serializer(PythonSerializer):
 def Deserializer(stream_or_string, **options):
     """
     Deserialize a stream or string of JSON data.
+
+    The objects are parsed one at a time as the stream is read, so that
+    fixtures of any size can be loaded without holding all of them in memory.
     """
     if isinstance(stream_or_string, basestring):
         stream = StringIO(stream_or_string)
     else:
         stream = stream_or_string
-    for obj in PythonDeserializer(simplejson.load(stream), **options):
+    for obj in PythonDeserializer(iterload(stream), **options):
         yield obj
 
+def iterload(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yields the items of the JSON array read from stream one at a time,
+    reading the stream chunk_size bytes at a time.
+
+    If the document isn't an array, it's loaded at once and its items (or
+    keys) are yielded, like iterating over the result of simplejson.load().
+    """
+    decoder = simplejson.JSONDecoder()
+    reader = _ChunkReader(stream, chunk_size)
+    pos = reader.skip_whitespace(0)
+    if reader.buffer[pos:pos + 1] != '[':
+        for item in simplejson.loads(reader.buffer + stream.read()):
+            yield item
+        return
+    pos = reader.skip_whitespace(pos + 1)
+    if reader.buffer[pos:pos + 1] == ']':
+        return
+    while True:
+        try:
+            # A value must be followed by a delimiter, otherwise it may be
+            # a truncated number.
+            item, end = decoder.raw_decode(reader.buffer, pos)
+            if end == len(reader.buffer) and not reader.eof:
+                raise ValueError
+        except ValueError:
+            if reader.eof:
+                raise
+            # Reading as much as has been buffered keeps parsing linear
+            # even for items larger than a chunk.
+            reader.read(len(reader.buffer) - pos)
+            continue
+        yield item
+        pos = reader.skip_whitespace(end)
+        delimiter = reader.buffer[pos:pos + 1]
+        if delimiter == ']':
+            return
+        elif delimiter != ',':
+            raise ValueError("Expecting , delimiter at byte %d" % (reader.offset + pos))
+        pos = reader.skip_whitespace(pos + 1)
+        pos = reader.discard(pos)
+
+class _ChunkReader(object):
+    """
+    A buffer over a stream, filled chunk by chunk as a parser needs more data.
+    """
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        # Position of the start of the buffer in the stream.
+        self.offset = 0
+        self.eof = False
+        self.read()
+
+    def read(self, size=0):
+        """
+        Appends at least a chunk to the buffer, unless the stream is
+        exhausted.
+        """
+        data = self.stream.read(max(size, self.chunk_size))
+        if data:
+            self.buffer += data
+        else:
+            self.eof = True
+
+    def skip_whitespace(self, pos):
+        """
+        Returns the position of the first non-whitespace character at or
+        after pos, reading more data if necessary.
+        """
+        while True:
+            match = WHITESPACE.match(self.buffer, pos)
+            pos = match.end()
+            if pos < len(self.buffer) or self.eof:
+                return pos
+            self.read()
+
+    def discard(self, pos):
+        """
+        Drops the part of the buffer before pos once it gets larger than a
+        chunk, and returns the position corresponding to pos afterwards.
+        """
+        if pos < self.chunk_size:
+            return pos
+        self.buffer = self.buffer[pos:]
+        self.offset += pos
+        return 0
+
 class DjangoJSONEncoder(simplejson.JSONEncoder):
     """
     JSONEncoder subclass that knows how to encode date/time and decimal types.
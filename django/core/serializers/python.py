@@ -27,12 +27,19 @@ class Serializer(base.Serializer):
         self._current = {}
 
     def end_object(self, obj):
-        self.objects.append({
+        self.objects.append(self.get_dump_object(obj))
+        self._current = None
+
+    def get_dump_object(self, obj):
+        """
+        Returns the Python representation of an object, once its fields have
+        been handled.
+        """
+        return {
             "model"  : smart_unicode(obj._meta),
             "pk"     : smart_unicode(obj._get_pk_val(), strings_only=True),
             "fields" : self._current
-        })
-        self._current = None
+        }
 
     def handle_field(self, obj, field):
         value = field._get_val_from_obj(obj)
@@ -45,17 +52,17 @@ class Serializer(base.Serializer):
             self._current[field.name] = field.value_to_string(obj)
 
     def handle_fk_field(self, obj, field):
-        related = getattr(obj, field.name)
-        if related is not None:
-            if self.use_natural_keys and hasattr(related, 'natural_key'):
+        if self.use_natural_keys and hasattr(field.rel.to, 'natural_key'):
+            related = getattr(obj, field.name)
+            if related is not None:
                 related = related.natural_key()
-            else:
-                if field.rel.field_name == related._meta.pk.name:
-                    # Related to remote object via primary key
-                    related = related._get_pk_val()
-                else:
-                    # Related to remote object via other field
-                    related = smart_unicode(getattr(related, field.rel.field_name), strings_only=True)
+        else:
+            # The key is read from the object itself, without fetching the
+            # related object.
+            related = getattr(obj, field.attname)
+            if related is not None and field.rel.field_name != field.rel.to._meta.pk.name:
+                # Related to remote object via other field
+                related = smart_unicode(related, strings_only=True)
         self._current[field.name] = related
 
     def handle_m2m_field(self, obj, field):
@@ -78,6 +85,7 @@ def Deserializer(object_list, **options):
     stream or a string) to the constructor
     """
     db = options.pop('using', DEFAULT_DB_ALIAS)
+    natural_keys = base.NaturalKeyResolver(db)
     models.get_apps()
     for d in object_list:
         # Look up the model and starting build a dict of data for it.
@@ -97,7 +105,7 @@ def Deserializer(object_list, **options):
                 if hasattr(field.rel.to._default_manager, 'get_by_natural_key'):
                     def m2m_convert(value):
                         if hasattr(value, '__iter__'):
-                            return field.rel.to._default_manager.db_manager(db).get_by_natural_key(*value).pk
+                            return natural_keys.get(field.rel.to, value).pk
                         else:
                             return smart_unicode(field.rel.to._meta.pk.to_python(value))
                 else:
@@ -109,7 +117,7 @@ def Deserializer(object_list, **options):
                 if field_value is not None:
                     if hasattr(field.rel.to._default_manager, 'get_by_natural_key'):
                         if hasattr(field_value, '__iter__'):
-                            obj = field.rel.to._default_manager.db_manager(db).get_by_natural_key(*field_value)
+                            obj = natural_keys.get(field.rel.to, field_value)
                             value = getattr(obj, field.rel.field_name)
                             # If this is a natural foreign key to an object that
                             # has a FK/O2O as the foreign key, use the FK value
@@ -128,6 +136,8 @@ def Deserializer(object_list, **options):
                 data[field.name] = field.to_python(field_value)
 
         yield base.DeserializedObject(Model(**data), m2m_data)
+        # The object may have been saved by now.
+        natural_keys.forget(Model)
 
 def _get_model(model_identifier):
     """
@@ -37,11 +37,24 @@ class Serializer(PythonSerializer):
         else:
             super(Serializer, self).handle_field(obj, field)
 
+    def start_serialization(self):
+        super(Serializer, self).start_serialization()
+        self._empty = True
+
+    def end_object(self, obj):
+        # A sequence of one-item sequences dumped one after the other forms a
+        # single sequence, so each object is written as soon as it's ready.
+        yaml.dump([self.get_dump_object(obj)], self.stream, Dumper=DjangoSafeDumper, **self.options)
+        self._empty = False
+        self._current = None
+
     def end_serialization(self):
-        yaml.dump(self.objects, self.stream, Dumper=DjangoSafeDumper, **self.options)
+        if self._empty:
+            yaml.dump([], self.stream, Dumper=DjangoSafeDumper, **self.options)
 
     def getvalue(self):
-        return self.stream.getvalue()
+        # Grand-parent super
+        return super(PythonSerializer, self).getvalue()
 
 def Deserializer(stream_or_string, **options):
     """
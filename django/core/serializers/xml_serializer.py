@@ -85,7 +85,12 @@ class Serializer(base.Serializer):
         differently from regular fields).
         """
         self._start_relational_field(field)
-        related = getattr(obj, field.name)
+        if self.use_natural_keys and hasattr(field.rel.to, 'natural_key'):
+            related = getattr(obj, field.name)
+        else:
+            # The key is read from the object itself, without fetching the
+            # related object.
+            related = getattr(obj, field.attname)
         if related is not None:
             if self.use_natural_keys and hasattr(related, 'natural_key'):
                 # If related object has a natural key, use it
@@ -96,12 +101,6 @@ class Serializer(base.Serializer):
                     self.xml.characters(smart_unicode(key_value))
                     self.xml.endElement("natural")
             else:
-                if field.rel.field_name == related._meta.pk.name:
-                    # Related to remote object via primary key
-                    related = related._get_pk_val()
-                else:
-                    # Related to remote object via other field
-                    related = getattr(related, field.rel.field_name)
                 self.xml.characters(smart_unicode(related))
         else:
             self.xml.addQuickElement("None")
@@ -156,12 +155,26 @@ class Deserializer(base.Deserializer):
         super(Deserializer, self).__init__(stream_or_string, **options)
         self.event_stream = pulldom.parse(self.stream)
         self.db = options.pop('using', DEFAULT_DB_ALIAS)
+        self.natural_keys = base.NaturalKeyResolver(self.db)
+        self.last_model = None
 
     def next(self):
+        if self.last_model is not None:
+            # The last object returned may have been saved by now.
+            self.natural_keys.forget(self.last_model)
+            self.last_model = None
         for event, node in self.event_stream:
             if event == "START_ELEMENT" and node.nodeName == "object":
                 self.event_stream.expandNode(node)
-                return self._handle_object(node)
+                try:
+                    obj = self._handle_object(node)
+                    self.last_model = obj.object.__class__
+                    return obj
+                finally:
+                    # Only one <object> is built at a time; break its
+                    # reference cycles so that it's freed right away rather
+                    # than piling up until the next garbage collection.
+                    node.unlink()
         raise StopIteration
 
     def _handle_object(self, node):
@@ -226,7 +239,7 @@ class Deserializer(base.Deserializer):
                 if keys:
                     # If there are 'natural' subelements, it must be a natural key
                     field_value = [getInnerText(k).strip() for k in keys]
-                    obj = field.rel.to._default_manager.db_manager(self.db).get_by_natural_key(*field_value)
+                    obj = self.natural_keys.get(field.rel.to, field_value)
                     obj_pk = getattr(obj, field.rel.field_name)
                     # If this is a natural foreign key to an object that
                     # has a FK/O2O as the foreign key, use the FK value
@@ -251,7 +264,7 @@ class Deserializer(base.Deserializer):
                 if keys:
                     # If there are 'natural' subelements, it must be a natural key
                     field_value = [getInnerText(k).strip() for k in keys]
-                    obj_pk = field.rel.to._default_manager.db_manager(self.db).get_by_natural_key(*field_value).pk
+                    obj_pk = self.natural_keys.get(field.rel.to, field_value).pk
                 else:
                     # Otherwise, treat like a normal PK value.
                     obj_pk = field.rel.to._meta.pk.to_python(n.getAttribute('pk'))
@@ -24,6 +24,14 @@ from django.utils.translation import get_language
 _resolver_cache = {} # Maps URLconf modules to RegexURLResolver instances.
 _ns_resolver_cache = {} # Maps namespaces to RegexURLResolver instances.
 _callable_cache = {} # Maps view and url pattern names to their view functions.
+_reverse_cache = {} # Maps reverse() arguments to the URLs they produced.
+
+# The maximum number of entries in _reverse_cache; it's emptied when full.
+REVERSE_CACHE_SIZE = 1000
+
+# reverse() results are only cached for arguments of these types, whose
+# equality implies that they're converted to the same URL fragment.
+_cacheable_arg_types = (str, unicode, int, long)
 
 # SCRIPT_NAME prefixes for each thread are stored here. If there's no entry for
 # the current thread (which is the only one we ever access), it is assumed to
@@ -136,6 +144,41 @@ def get_mod_func(callback):
         return callback, ''
     return callback[:dot], callback[dot+1:]
 
+# Characters that end the literal prefix of a regular expression.
+_special_chars = frozenset('.^$*+?{}[]\\|()')
+_quantifier_chars = frozenset('*+?{')
+_inline_flags_re = re.compile(r'\(\?[iLmsux]+\)')
+
+def literal_prefix(regex):
+    """
+    Returns the literal string that every string matched by the regular
+    expression ``regex`` (as searched by the URL resolvers) must start with.
+
+    Only patterns anchored with '^' have a prefix; for anything the prefix
+    can't safely be determined for, an empty string is returned.
+    """
+    if not regex.startswith('^') or '|' in regex or _inline_flags_re.search(regex):
+        return ''
+    prefix = []
+    i, end = 1, len(regex)
+    while i < end:
+        char = regex[i]
+        if char == '\\':
+            if i + 1 == end or regex[i + 1].isalnum():
+                # A character class, anchor or backreference such as \d.
+                break
+            char = regex[i + 1]
+            i += 2
+        elif char in _special_chars:
+            break
+        else:
+            i += 1
+        if i < end and regex[i] in _quantifier_chars:
+            # The character is optional or repeated.
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
 class LocaleRegexProvider(object):
     """
     A mixin to provide a default regex property which can vary by active
@@ -230,6 +273,8 @@ class RegexURLResolver(LocaleRegexProvider):
         self._reverse_dict = {}
         self._namespace_dict = {}
         self._app_dict = {}
+        self._dispatch_dict = {}
+        self._builder_dict = {}
 
     def __repr__(self):
         return smart_str(u'<%s %s (%s:%s) %s>' % (self.__class__.__name__, self.urlconf_name, self.app_name, self.namespace, self.regex.pattern))
@@ -290,7 +335,86 @@ class RegexURLResolver(LocaleRegexProvider):
             self._populate()
         return self._app_dict[language_code]
 
+    def _build_dispatch(self, patterns):
+        """
+        Builds a character trie of the literal prefixes of the given patterns.
+        Each trie node maps characters to child nodes, and None to the indices
+        of the patterns whose prefix ends at that node. Also returns the
+        indices of the patterns that have no literal prefix.
+        """
+        trie = {}
+        unprefixed = []
+        for index, pattern in enumerate(patterns):
+            prefix = ''
+            if _has_standard_resolve(pattern):
+                prefix = literal_prefix(pattern.regex.pattern)
+            if not prefix:
+                unprefixed.append(index)
+                continue
+            node = trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(index)
+        return trie, unprefixed
+
+    def _candidates(self, patterns, path):
+        """
+        Returns, in order, the indices of the patterns that may match path:
+        those whose literal prefix path starts with, and those without one.
+        """
+        language_code = get_language()
+        dispatch = self._dispatch_dict.get(language_code)
+        if dispatch is None or dispatch[0] is not patterns or dispatch[1] != len(patterns):
+            dispatch = (patterns, len(patterns)) + self._build_dispatch(patterns)
+            self._dispatch_dict[language_code] = dispatch
+        node, candidates = dispatch[2], dispatch[3]
+        if not node:
+            return candidates
+        candidates = list(candidates)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            candidates.extend(node.get(None, ()))
+        candidates.sort()
+        return candidates
+
+    def _resolve_fast(self, path):
+        """
+        Resolves path like resolve(), but only tries the patterns whose
+        literal prefix matches, and returns None instead of raising
+        Resolver404 (so that no list of tried patterns is built).
+        """
+        match = self.regex.search(path)
+        if match:
+            new_path = path[match.end():]
+            patterns = self.url_patterns
+            for index in self._candidates(patterns, new_path):
+                pattern = patterns[index]
+                if isinstance(pattern, RegexURLResolver) and _has_standard_resolve(pattern):
+                    sub_match = pattern._resolve_fast(new_path)
+                else:
+                    try:
+                        sub_match = pattern.resolve(new_path)
+                    except Resolver404:
+                        continue
+                if sub_match:
+                    return self._build_match(match, sub_match)
+        return None
+
+    def _build_match(self, match, sub_match):
+        sub_match_dict = dict([(smart_str(k), v) for k, v in match.groupdict().items()])
+        sub_match_dict.update(self.default_kwargs)
+        for k, v in sub_match.kwargs.iteritems():
+            sub_match_dict[smart_str(k)] = v
+        return ResolverMatch(sub_match.func, sub_match.args, sub_match_dict, sub_match.url_name, self.app_name or sub_match.app_name, [self.namespace] + sub_match.namespaces)
+
     def resolve(self, path):
+        resolver_match = self._resolve_fast(path)
+        if resolver_match is not None:
+            return resolver_match
+        # No match: try every pattern to build the list of tried patterns
+        # shown on the debug 404 page.
         tried = []
         match = self.regex.search(path)
         if match:
@@ -306,11 +430,7 @@ class RegexURLResolver(LocaleRegexProvider):
                         tried.append([pattern])
                 else:
                     if sub_match:
-                        sub_match_dict = dict([(smart_str(k), v) for k, v in match.groupdict().items()])
-                        sub_match_dict.update(self.default_kwargs)
-                        for k, v in sub_match.kwargs.iteritems():
-                            sub_match_dict[smart_str(k)] = v
-                        return ResolverMatch(sub_match.func, sub_match.args, sub_match_dict, sub_match.url_name, self.app_name or sub_match.app_name, [self.namespace] + sub_match.namespaces)
+                        return self._build_match(match, sub_match)
                     tried.append([pattern])
             raise Resolver404({'tried': tried, 'path': new_path})
         raise Resolver404({'path' : path})
@@ -350,6 +470,37 @@ class RegexURLResolver(LocaleRegexProvider):
     def resolve500(self):
         return self._resolve_special('500')
 
+    def _get_builders(self, lookup_view, args, kwargs):
+        """
+        Returns the URL builders for lookup_view that accept arguments of the
+        same shape (number of positional arguments, or names of keyword
+        arguments) as args and kwargs. Each builder is a (format string,
+        parameter names, default kwargs, compiled pattern) tuple.
+        """
+        if args:
+            shape = len(args)
+        else:
+            shape = frozenset(kwargs)
+        builders_dict = self._builder_dict.setdefault(get_language(), {})
+        try:
+            return builders_dict[lookup_view, shape]
+        except KeyError:
+            pass
+        builders = []
+        for possibility, pattern, defaults in self.reverse_dict.getlist(lookup_view):
+            regex = None
+            for result, params in possibility:
+                if args:
+                    if len(args) != len(params):
+                        continue
+                elif set(kwargs.keys() + defaults.keys()) != set(params + defaults.keys()):
+                    continue
+                if regex is None:
+                    regex = re.compile(u'^%s' % pattern, re.UNICODE)
+                builders.append((result, params, defaults, regex))
+        builders_dict[lookup_view, shape] = builders
+        return builders
+
     def reverse(self, lookup_view, *args, **kwargs):
         if args and kwargs:
             raise ValueError("Don't mix *args and **kwargs in call to reverse()!")
@@ -357,28 +508,22 @@ class RegexURLResolver(LocaleRegexProvider):
             lookup_view = get_callable(lookup_view, True)
         except (ImportError, AttributeError), e:
             raise NoReverseMatch("Error importing '%s': %s." % (lookup_view, e))
-        possibilities = self.reverse_dict.getlist(lookup_view)
-        for possibility, pattern, defaults in possibilities:
-            for result, params in possibility:
-                if args:
-                    if len(args) != len(params):
-                        continue
-                    unicode_args = [force_unicode(val) for val in args]
-                    candidate =  result % dict(zip(params, unicode_args))
-                else:
-                    if set(kwargs.keys() + defaults.keys()) != set(params + defaults.keys()):
-                        continue
-                    matches = True
-                    for k, v in defaults.items():
-                        if kwargs.get(k, v) != v:
-                            matches = False
-                            break
-                    if not matches:
-                        continue
-                    unicode_kwargs = dict([(k, force_unicode(v)) for (k, v) in kwargs.items()])
-                    candidate = result % unicode_kwargs
-                if re.search(u'^%s' % pattern, candidate, re.UNICODE):
-                    return candidate
+        for result, params, defaults, regex in self._get_builders(lookup_view, args, kwargs):
+            if args:
+                unicode_args = [force_unicode(val) for val in args]
+                candidate =  result % dict(zip(params, unicode_args))
+            else:
+                matches = True
+                for k, v in defaults.items():
+                    if kwargs.get(k, v) != v:
+                        matches = False
+                        break
+                if not matches:
+                    continue
+                unicode_kwargs = dict([(k, force_unicode(v)) for (k, v) in kwargs.items()])
+                candidate = result % unicode_kwargs
+            if regex.search(candidate):
+                return candidate
         # lookup_view can be URL label, or dotted path, or callable, Any of
         # these can be passed in at the top, but callables are not friendly in
         # error messages.
@@ -410,11 +555,40 @@ class LocaleRegexURLResolver(RegexURLResolver):
             self._regex_dict[language_code] = regex_compiled
         return self._regex_dict[language_code]
 
+def _has_standard_resolve(pattern):
+    """
+    Returns True if pattern matches paths with the resolve() method of
+    RegexURLPattern or RegexURLResolver, i.e. by searching its regex.
+    """
+    resolve = getattr(pattern.__class__, 'resolve', None)
+    resolve = getattr(resolve, 'im_func', None)
+    return resolve is RegexURLPattern.resolve.im_func or resolve is RegexURLResolver.resolve.im_func
+
 def resolve(path, urlconf=None):
     if urlconf is None:
         urlconf = get_urlconf()
     return get_resolver(urlconf).resolve(path)
 
+def _reverse_cache_key(resolver, viewname, args, kwargs, prefix, current_app):
+    """
+    Returns the key under which the result of reverse() is cached, or None if
+    it can't be cached.
+    """
+    for value in args:
+        if not isinstance(value, _cacheable_arg_types):
+            return None
+    for value in kwargs.itervalues():
+        if not isinstance(value, _cacheable_arg_types):
+            return None
+    try:
+        return (resolver, viewname,
+                tuple([(type(v), v) for v in args]),
+                tuple(sorted([(k, type(v), v) for k, v in kwargs.items()])),
+                prefix, current_app, get_language())
+    except TypeError:
+        # viewname isn't hashable.
+        return None
+
 def reverse(viewname, urlconf=None, args=None, kwargs=None, prefix=None, current_app=None):
     if urlconf is None:
         urlconf = get_urlconf()
@@ -425,6 +599,13 @@ def reverse(viewname, urlconf=None, args=None, kwargs=None, prefix=None, current
     if prefix is None:
         prefix = get_script_prefix()
 
+    cache_key = _reverse_cache_key(resolver, viewname, args, kwargs, prefix, current_app)
+    if cache_key is not None:
+        try:
+            return _reverse_cache[cache_key]
+        except KeyError:
+            pass
+
     if not isinstance(viewname, basestring):
         view = viewname
     else:
@@ -469,8 +650,12 @@ def reverse(viewname, urlconf=None, args=None, kwargs=None, prefix=None, current
         if ns_pattern:
             resolver = get_ns_resolver(ns_pattern, resolver)
 
-    return iri_to_uri(u'%s%s' %
-                      (prefix, resolver.reverse(view, *args, **kwargs)))
+    url = iri_to_uri(u'%s%s' % (prefix, resolver.reverse(view, *args, **kwargs)))
+    if cache_key is not None:
+        if len(_reverse_cache) >= REVERSE_CACHE_SIZE:
+            _reverse_cache.clear()
+        _reverse_cache[cache_key] = url
+    return url
 
 reverse_lazy = lazy(reverse, str)
 
@@ -478,9 +663,11 @@ def clear_url_caches():
     global _resolver_cache
     global _ns_resolver_cache
     global _callable_cache
+    global _reverse_cache
     _resolver_cache.clear()
     _ns_resolver_cache.clear()
     _callable_cache.clear()
+    _reverse_cache.clear()
 
 def set_script_prefix(prefix):
     """
@@ -317,6 +317,13 @@ class BaseDatabaseFeatures(object):
     # Usually an indication that the test database is in-memory
     test_db_allows_multiple_connections = True
 
+    # Can a test database be created as a copy of another one?
+    can_clone_databases = False
+
+    # Can transactions of other connections see the snapshot of the data of
+    # a transaction? See DatabaseOperations.export_snapshot_sql().
+    can_share_snapshots = False
+
     # Can an object be saved without an explicit primary key?
     supports_unspecified_pk = False
 
@@ -434,6 +441,13 @@ class BaseDatabaseOperations(object):
         """
         return None
 
+    def bulk_batch_size(self, fields, objs):
+        """
+        Returns the maximum number of objects, out of objs, that can be
+        inserted with the given fields in a single multi-row INSERT.
+        """
+        return len(objs)
+
     def date_extract_sql(self, lookup_type, field_name):
         """
         Given a lookup_type of 'year', 'month' or 'day', returns the SQL that
@@ -484,6 +498,15 @@ class BaseDatabaseOperations(object):
         """
         return None
 
+    def export_snapshot_sql(self):
+        """
+        Returns the SQL returning an identifier of the snapshot of the data
+        seen by the current transaction, which transactions of other
+        connections can then use with import_snapshot_sql(), or None if the
+        backend doesn't support sharing snapshots.
+        """
+        return None
+
     def fetch_returned_insert_id(self, cursor):
         """
         Given a cursor object that has just performed an INSERT...RETURNING
@@ -526,6 +549,15 @@ class BaseDatabaseOperations(object):
         """
         raise NotImplementedError('Full-text search is not implemented for this database backend')
 
+    def import_snapshot_sql(self, snapshot):
+        """
+        Returns the list of SQL statements making a new transaction see the
+        data of the snapshot identified by the given value, as returned by the
+        query of export_snapshot_sql(). They must be executed before any other
+        statement of the transaction.
+        """
+        raise NotImplementedError
+
     def last_executed_query(self, cursor, sql, params):
         """
         Returns a string of the query last executed by the given cursor, with
@@ -1,7 +1,10 @@
+import hashlib
+import os
 import sys
 import time
 
 from django.conf import settings
+from django.utils.encoding import force_unicode
 
 # The prefix to put on the default database name when creating
 # the test database.
@@ -205,10 +208,15 @@ class BaseDatabaseCreation(object):
         del references_to_delete[model]
         return output
 
-    def create_test_db(self, verbosity=1, autoclobber=False):
+    def create_test_db(self, verbosity=1, autoclobber=False, keepdb=False):
         """
         Creates a test database, prompting the user for confirmation if the
         database already exists. Returns the name of the test database created.
+
+        If keepdb is True and the backend can clone databases, the test
+        database is cloned from a template kept by a previous run, as long as
+        the models haven't changed since. Otherwise, a template is kept for
+        the next runs once the test database has been created.
         """
         # Don't import django.core.management if it isn't needed.
         from django.core.management import call_command
@@ -221,6 +229,20 @@ class BaseDatabaseCreation(object):
                 test_db_repr = " ('%s')" % test_database_name
             print "Creating test database for alias '%s'%s..." % (self.connection.alias, test_db_repr)
 
+        keepdb = keepdb and self.can_keep_test_db()
+        if keepdb:
+            template_name = self._get_test_db_template_name()
+            if self._test_db_exists(template_name):
+                if verbosity >= 1:
+                    print "Cloning it from the template kept by a previous run..."
+                self.clone_test_db(template_name, test_database_name, verbosity, autoclobber)
+                self.connection.close()
+                self.connection.settings_dict["NAME"] = test_database_name
+                self.connection.features.confirm()
+                self.connection.cursor()
+                return test_database_name
+
+        old_database_name = self.connection.settings_dict["NAME"]
         self._create_test_db(verbosity, autoclobber)
 
         self.connection.close()
@@ -261,8 +283,164 @@ class BaseDatabaseCreation(object):
         # the side effect of initializing the test database.
         self.connection.cursor()
 
+        if keepdb:
+            self._save_test_db_template(template_name, old_database_name, verbosity)
+
         return test_database_name
 
+    def can_keep_test_db(self):
+        """
+        Tells whether the test database can be kept as a template between
+        test runs.
+        """
+        return self.connection.features.can_clone_databases
+
+    def test_db_fingerprint(self):
+        """
+        Returns a hash of what the test database is built from: the SQL
+        creating the tables of the installed models, with the custom SQL of
+        the apps, the initial data fixtures and the cache tables.
+
+        The options of the models that the post_syncdb handlers build rows
+        from, like the content types and the permissions, are hashed too:
+        proxy models and custom permissions don't change the SQL.
+        """
+        # Don't import django.core.management if it isn't needed.
+        from django.core.management.color import no_style
+        from django.core.management.sql import custom_sql_for_model
+        from django.db import models
+
+        style = no_style()
+        fingerprint = hashlib.sha1()
+        # Like syncdb, only consider the models of the installed apps. The
+        # SQL doesn't depend on the tables that already exist, unlike the
+        # output of sqlall.
+        all_models = []
+        for app in models.get_apps():
+            all_models.extend(models.get_models(app, include_auto_created=True))
+        known_models = set(all_models)
+        for model in all_models:
+            statements = (self.sql_create_model(model, style, known_models)[0] +
+                          self.sql_indexes_for_model(model, style) +
+                          custom_sql_for_model(model, style, self.connection))
+            for statement in statements:
+                fingerprint.update(statement.encode('utf-8'))
+            opts = model._meta
+            permissions = [(codename, force_unicode(name))
+                           for codename, name in opts.permissions]
+            fingerprint.update(repr((opts.app_label, opts.object_name, opts.proxy,
+                                     opts.verbose_name_raw, permissions)))
+
+        fixture_dirs = list(settings.FIXTURE_DIRS)
+        for app in models.get_apps():
+            # The fixtures are next to the models.py module or to the models/
+            # subpackage, like loaddata looks for them.
+            for path in getattr(app, '__path__', [app.__file__]):
+                fixture_dirs.append(os.path.join(os.path.dirname(path), 'fixtures'))
+        for fixture_dir in fixture_dirs:
+            if not os.path.isdir(fixture_dir):
+                continue
+            for name in sorted(os.listdir(fixture_dir)):
+                if name.startswith('initial_data.'):
+                    f = open(os.path.join(fixture_dir, name), 'rb')
+                    try:
+                        fingerprint.update(f.read())
+                    finally:
+                        f.close()
+        fingerprint.update(repr(sorted(settings.CACHES.items())))
+        return fingerprint.hexdigest()
+
+    def _get_test_db_template_name(self):
+        """
+        Internal implementation - returns the name of the template of the
+        test database, which depends on the models.
+        """
+        return '%s_template_%s' % (self._get_test_db_name(), self.test_db_fingerprint()[:12])
+
+    def _save_test_db_template(self, template_name, old_database_name, verbosity):
+        """
+        Internal implementation - clones the newly created test database as
+        the template of the next test runs, and destroys the templates built
+        for other versions of the models.
+        """
+        test_database_name = self.connection.settings_dict["NAME"]
+        if verbosity >= 1:
+            print "Keeping a template of the test database for alias '%s'..." % self.connection.alias
+        # Databases can't be cloned while connected to them.
+        self.connection.close()
+        self.connection.settings_dict["NAME"] = old_database_name
+        try:
+            for name in self._get_test_db_templates():
+                if name != template_name:
+                    self._destroy_test_db(name, verbosity)
+            self.clone_test_db(test_database_name, template_name, verbosity, autoclobber=True)
+        finally:
+            self.connection.close()
+            self.connection.settings_dict["NAME"] = test_database_name
+
+    def clone_test_db(self, source_database_name, target_database_name,
+                      verbosity=1, autoclobber=False):
+        """
+        Creates a database as a copy of a test database, which mustn't be in
+        use, prompting the user for confirmation if the database already
+        exists. Only available if the can_clone_databases feature of the
+        backend is True.
+        """
+        raise NotImplementedError
+
+    def create_worker_test_dbs(self, processes, old_database_name, verbosity=1,
+                               autoclobber=False):
+        """
+        Clones the test database for each of the worker processes running the
+        tests in parallel, and returns the names of the clones. Only available
+        if the can_clone_databases feature of the backend is True.
+        """
+        test_database_name = self.connection.settings_dict["NAME"]
+        if verbosity >= 1:
+            print "Cloning test database for alias '%s' for %d processes..." % (
+                self.connection.alias, processes)
+        names = ['%s_%d' % (test_database_name, index) for index in range(1, processes + 1)]
+        # Databases can't be cloned while connected to them.
+        self.connection.close()
+        self.connection.settings_dict["NAME"] = old_database_name
+        try:
+            for name in names:
+                self.clone_test_db(test_database_name, name, verbosity, autoclobber)
+        finally:
+            self.connection.close()
+            self.connection.settings_dict["NAME"] = test_database_name
+        return names
+
+    def destroy_worker_test_dbs(self, names, old_database_name, verbosity=1):
+        """
+        Destroys the clones of the test database made by
+        create_worker_test_dbs().
+        """
+        test_database_name = self.connection.settings_dict["NAME"]
+        if verbosity >= 1:
+            print "Destroying the clones of the test database for alias '%s'..." % self.connection.alias
+        self.connection.close()
+        self.connection.settings_dict["NAME"] = old_database_name
+        try:
+            for name in names:
+                self._destroy_test_db(name, verbosity)
+        finally:
+            self.connection.close()
+            self.connection.settings_dict["NAME"] = test_database_name
+
+    def _test_db_exists(self, database_name):
+        """
+        Internal implementation - tells whether a test database exists.
+        """
+        raise NotImplementedError
+
+    def _get_test_db_templates(self):
+        """
+        Internal implementation - returns the names of the existing templates
+        of the test database, for any version of the models.
+        """
+        raise NotImplementedError
+
     def _get_test_db_name(self):
         """
         Internal implementation - returns the name of the test DB that will be
@@ -282,13 +460,26 @@ class BaseDatabaseCreation(object):
 
         qn = self.connection.ops.quote_name
 
+        self._execute_create_test_db("CREATE DATABASE %s %s" % (qn(test_database_name), suffix),
+                                     test_database_name, verbosity, autoclobber)
+
+        return test_database_name
+
+    def _execute_create_test_db(self, sql, test_database_name, verbosity, autoclobber):
+        """
+        Internal implementation - executes the SQL creating a test database,
+        prompting the user for confirmation to destroy the database first if
+        it already exists.
+        """
+        qn = self.connection.ops.quote_name
+
         # Create the test database and connect to it. We need to autocommit
         # if the database supports it because PostgreSQL doesn't allow
         # CREATE/DROP DATABASE statements within transactions.
         cursor = self.connection.cursor()
         self._prepare_for_test_db_ddl()
         try:
-            cursor.execute("CREATE DATABASE %s %s" % (qn(test_database_name), suffix))
+            cursor.execute(sql)
         except Exception, e:
             sys.stderr.write("Got an error creating the test database: %s\n" % e)
             if not autoclobber:
@@ -298,7 +489,7 @@ class BaseDatabaseCreation(object):
                     if verbosity >= 1:
                         print "Destroying old test database '%s'..." % self.connection.alias
                     cursor.execute("DROP DATABASE %s" % qn(test_database_name))
-                    cursor.execute("CREATE DATABASE %s %s" % (qn(test_database_name), suffix))
+                    cursor.execute(sql)
                 except Exception, e:
                     sys.stderr.write("Got an error recreating the test database: %s\n" % e)
                     sys.exit(2)
@@ -306,8 +497,6 @@ class BaseDatabaseCreation(object):
                 print "Tests cancelled."
                 sys.exit(1)
 
-        return test_database_name
-
     def destroy_test_db(self, old_database_name, verbosity=1):
         """
         Destroy a test database, prompting the user for confirmation if the
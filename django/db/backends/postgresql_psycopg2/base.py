@@ -73,9 +73,15 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     has_real_datatype = True
     can_defer_constraint_checks = True
     has_select_for_update = True
+    can_clone_databases = True
     has_select_for_update_nowait = True
     has_bulk_insert = True
 
+    def _can_share_snapshots(self):
+        # Exporting snapshots requires PostgreSQL 9.2.
+        return self.connection.pg_version >= 90200
+    can_share_snapshots = property(_can_share_snapshots)
+
 
 class DatabaseWrapper(BaseDatabaseWrapper):
     vendor = 'postgresql'
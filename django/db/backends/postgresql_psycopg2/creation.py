@@ -77,6 +77,25 @@ class DatabaseCreation(BaseDatabaseCreation):
             output = []
         return output
 
+    def clone_test_db(self, source_database_name, target_database_name,
+                      verbosity=1, autoclobber=False):
+        qn = self.connection.ops.quote_name
+        self._execute_create_test_db("CREATE DATABASE %s WITH TEMPLATE %s" % (
+            qn(target_database_name), qn(source_database_name)),
+            target_database_name, verbosity, autoclobber)
+
+    def _test_db_exists(self, database_name):
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s",
+                       [database_name])
+        return cursor.fetchone() is not None
+
+    def _get_test_db_templates(self):
+        prefix = self._get_test_db_name() + '_template_'
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT datname FROM pg_catalog.pg_database")
+        return [row[0] for row in cursor.fetchall() if row[0].startswith(prefix)]
+
     def set_autocommit(self):
         self._prepare_for_test_db_ddl()
 
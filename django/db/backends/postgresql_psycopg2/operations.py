@@ -51,11 +51,22 @@ class DatabaseOperations(BaseDatabaseOperations):
 
         return lookup
 
+    def export_snapshot_sql(self):
+        if self.connection.features.can_share_snapshots:
+            return "SELECT pg_export_snapshot()"
+        return None
+
     def field_cast_sql(self, db_type):
         if db_type == 'inet':
             return 'HOST(%s)'
         return '%s'
 
+    def import_snapshot_sql(self, snapshot):
+        return [
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ",
+            "SET TRANSACTION SNAPSHOT '%s'" % snapshot,
+        ]
+
     def last_insert_id(self, cursor, table_name, pk_name):
         # Use pg_get_serial_sequence to get the underlying sequence name
         # from the table name and column name (available since PostgreSQL 8)
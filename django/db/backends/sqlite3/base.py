@@ -55,6 +55,7 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     # go.
     can_use_chunked_reads = False
     test_db_allows_multiple_connections = False
+    can_clone_databases = True
     supports_unspecified_pk = True
     supports_1000_query_parameters = False
     supports_mixed_date_datetime_comparisons = False
@@ -164,6 +165,13 @@ class DatabaseOperations(BaseDatabaseOperations):
         res.extend(["UNION SELECT %s" % ", ".join(["%s"] * len(fields))] * (num_values - 1))
         return " ".join(res)
 
+    def bulk_batch_size(self, fields, objs):
+        """
+        SQLite limits a compound SELECT to 500 terms and a query to 999
+        parameters.
+        """
+        return max(1, min(500, 999 // max(len(fields), 1)))
+
 class DatabaseWrapper(BaseDatabaseWrapper):
     vendor = 'sqlite'
     # SQLite requires LIKE statements to include an ESCAPE clause if the value
@@ -1,4 +1,5 @@
 import os
+import shutil
 import sys
 from django.db.backends.creation import BaseDatabaseCreation
 
@@ -49,22 +50,58 @@ class DatabaseCreation(BaseDatabaseCreation):
         test_database_name = self._get_test_db_name()
         if test_database_name != ':memory:':
             # Erase the old test database
-            if verbosity >= 1:
-                print "Destroying old test database '%s'..." % self.connection.alias
-            if os.access(test_database_name, os.F_OK):
-                if not autoclobber:
-                    confirm = raw_input("Type 'yes' if you would like to try deleting the test database '%s', or 'no' to cancel: " % test_database_name)
-                if autoclobber or confirm == 'yes':
-                  try:
-                      os.remove(test_database_name)
-                  except Exception, e:
-                      sys.stderr.write("Got an error deleting the old test database: %s\n" % e)
-                      sys.exit(2)
-                else:
-                    print "Tests cancelled."
-                    sys.exit(1)
+            self._erase_test_db(test_database_name, verbosity, autoclobber)
         return test_database_name
 
+    def _erase_test_db(self, test_database_name, verbosity, autoclobber):
+        if verbosity >= 1:
+            print "Destroying old test database '%s'..." % self.connection.alias
+        if os.access(test_database_name, os.F_OK):
+            if not autoclobber:
+                confirm = raw_input("Type 'yes' if you would like to try deleting the test database '%s', or 'no' to cancel: " % test_database_name)
+            if autoclobber or confirm == 'yes':
+              try:
+                  os.remove(test_database_name)
+              except Exception, e:
+                  sys.stderr.write("Got an error deleting the old test database: %s\n" % e)
+                  sys.exit(2)
+            else:
+                print "Tests cancelled."
+                sys.exit(1)
+
+    def can_keep_test_db(self):
+        # There's nothing to keep of an in-memory database.
+        return (super(DatabaseCreation, self).can_keep_test_db() and
+                self._get_test_db_name() != ':memory:')
+
+    def clone_test_db(self, source_database_name, target_database_name,
+                      verbosity=1, autoclobber=False):
+        if os.access(target_database_name, os.F_OK):
+            self._erase_test_db(target_database_name, verbosity, autoclobber)
+        shutil.copyfile(source_database_name, target_database_name)
+
+    def create_worker_test_dbs(self, processes, old_database_name, verbosity=1,
+                               autoclobber=False):
+        if self.connection.settings_dict['NAME'] == ':memory:':
+            # The worker processes are forked with a copy of the in-memory
+            # database, and keep using the connection to it.
+            return [':memory:'] * processes
+        return super(DatabaseCreation, self).create_worker_test_dbs(
+            processes, old_database_name, verbosity, autoclobber)
+
+    def destroy_worker_test_dbs(self, names, old_database_name, verbosity=1):
+        if self.connection.settings_dict['NAME'] != ':memory:':
+            super(DatabaseCreation, self).destroy_worker_test_dbs(
+                names, old_database_name, verbosity)
+
+    def _test_db_exists(self, database_name):
+        return os.access(database_name, os.F_OK)
+
+    def _get_test_db_templates(self):
+        directory, prefix = os.path.split(self._get_test_db_name() + '_template_')
+        return [os.path.join(directory, name) for name in os.listdir(directory or os.curdir)
+                if name.startswith(prefix)]
+
     def _destroy_test_db(self, test_database_name, verbosity):
         if test_database_name and test_database_name != ":memory:":
             # Remove the SQLite database file
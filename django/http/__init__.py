@@ -1,24 +1,16 @@
 import datetime
+import itertools
 import os
 import re
+import stat
 import time
 from pprint import pformat
-from urllib import urlencode, quote
+from urllib import urlencode, quote, unquote
 from urlparse import urljoin
 try:
     from cStringIO import StringIO
 except ImportError:
     from StringIO import StringIO
-try:
-    # The mod_python version is more efficient, so try importing it first.
-    from mod_python.util import parse_qsl
-except ImportError:
-    try:
-        # Python 2.6 and greater
-        from urlparse import parse_qsl
-    except ImportError:
-        # Python 2.5.  Works on Python 2.6 but raises PendingDeprecationWarning
-        from cgi import parse_qsl
 
 import Cookie
 # httponly support exists in Python 2.6's Cookie library,
@@ -114,7 +106,8 @@ from django.utils.encoding import smart_str, iri_to_uri, force_unicode
 from django.utils.http import cookie_date
 from django.http.multipartparser import MultiPartParser
 from django.conf import settings
-from django.core import signing
+from django.core import signals, signing
+from django.core.exceptions import SuspiciousOperation
 from django.core.files import uploadhandler
 from utils import *
 
@@ -369,29 +362,108 @@ class HttpRequest(object):
     def readlines(self):
         return list(iter(self))
 
+_ascii_compatible = {}
+
+def _is_ascii_compatible(encoding):
+    """
+    Returns True if ASCII text is encoded to the same bytes in the given
+    encoding, in which case query strings made only of ASCII characters can
+    be decoded without going through the codec.
+    """
+    try:
+        return _ascii_compatible[encoding]
+    except KeyError:
+        try:
+            result = u'%&;=+az09'.encode(encoding) == '%&;=+az09'
+        except LookupError:
+            result = False
+        _ascii_compatible[encoding] = result
+        return result
+
 class QueryDict(MultiValueDict):
     """
     A specialized MultiValueDict that takes a query string when initialized.
     This is immutable unless you create a copy of it.
 
     Values retrieved from this class are converted from the given encoding
-    (DEFAULT_CHARSET by default) to unicode.
+    (DEFAULT_CHARSET by default) to unicode. Keys are decoded when the query
+    string is parsed, but the values of a key are only decoded the first time
+    they are accessed.
     """
     # These are both reset in __init__, but is specified here at the class
     # level so that unpickling will have valid values
     _mutable = True
     _encoding = None
+    # Keys whose values haven't been decoded yet.
+    _undecoded = frozenset()
 
     def __init__(self, query_string, mutable=False, encoding=None):
         MultiValueDict.__init__(self)
         if not encoding:
             encoding = settings.DEFAULT_CHARSET
         self.encoding = encoding
-        for key, value in parse_qsl((query_string or ''), True): # keep_blank_values=True
-            self.appendlist(force_unicode(key, encoding, errors='replace'),
-                            force_unicode(value, encoding, errors='replace'))
+        query_string = query_string or ''
+        decoded = None
+        if '%' not in query_string:
+            decoded = self._decode_ascii(query_string, encoding)
+        if decoded is not None:
+            # Nothing needs to be unquoted and every character is ASCII, so
+            # the whole query string is decoded at once.
+            query_string = decoded.replace(u'+', u' ')
+        pairs = [pair for pairs in query_string.split('&')
+                      for pair in pairs.split(';') if pair]
+        max_fields = settings.DATA_UPLOAD_MAX_NUMBER_FIELDS
+        if max_fields is not None and len(pairs) > max_fields:
+            raise SuspiciousOperation(
+                "The number of GET/POST parameters exceeded "
+                "settings.DATA_UPLOAD_MAX_NUMBER_FIELDS (%d)." % max_fields)
+        lists = {}
+        if decoded is not None:
+            for pair in pairs:
+                key, _, value = pair.partition('=')
+                lists.setdefault(key, []).append(value)
+        else:
+            for pair in pairs:
+                key, _, value = pair.partition('=')
+                key = force_unicode(unquote(key.replace('+', ' ')), encoding, errors='replace')
+                lists.setdefault(key, []).append(value)
+            self._undecoded = set(lists)
+        dict.update(self, lists)
         self._mutable = mutable
 
+    def _decode_ascii(self, query_string, encoding):
+        """
+        Returns query_string as unicode if it can be decoded as plain ASCII,
+        None otherwise.
+        """
+        if isinstance(query_string, unicode):
+            return query_string
+        if not _is_ascii_compatible(encoding):
+            return None
+        try:
+            return query_string.decode('ascii')
+        except UnicodeDecodeError:
+            return None
+
+    def _decode(self, key):
+        """
+        Decodes the raw values stored for key, if that hasn't been done yet.
+        """
+        if key in self._undecoded:
+            encoding = self.encoding
+            dict.__setitem__(self, key, [
+                force_unicode(unquote(value.replace('+', ' ')), encoding, errors='replace')
+                for value in dict.__getitem__(self, key)])
+            self._undecoded.discard(key)
+
+    def _decode_all(self):
+        for key in list(self._undecoded):
+            self._decode(key)
+
+    def __getstate__(self):
+        self._decode_all()
+        return MultiValueDict.__getstate__(self)
+
     def _get_encoding(self):
         if self._encoding is None:
             self._encoding = settings.DEFAULT_CHARSET
@@ -406,17 +478,39 @@ class QueryDict(MultiValueDict):
         if not self._mutable:
             raise AttributeError("This QueryDict instance is immutable")
 
+    def __repr__(self):
+        self._decode_all()
+        return MultiValueDict.__repr__(self)
+
+    def __getitem__(self, key):
+        self._decode(key)
+        return MultiValueDict.__getitem__(self, key)
+
+    def __eq__(self, other):
+        self._decode_all()
+        if isinstance(other, QueryDict):
+            other._decode_all()
+        return MultiValueDict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
     def __setitem__(self, key, value):
         self._assert_mutable()
         key = str_to_unicode(key, self.encoding)
         value = str_to_unicode(value, self.encoding)
+        if self._undecoded:
+            self._undecoded.discard(key)
         MultiValueDict.__setitem__(self, key, value)
 
     def __delitem__(self, key):
         self._assert_mutable()
         super(QueryDict, self).__delitem__(key)
+        if self._undecoded:
+            self._undecoded.discard(key)
 
     def __copy__(self):
+        self._decode_all()
         result = self.__class__('', mutable=True, encoding=self.encoding)
         for key, value in dict.items(self):
             dict.__setitem__(result, key, value)
@@ -424,6 +518,7 @@ class QueryDict(MultiValueDict):
 
     def __deepcopy__(self, memo):
         import copy
+        self._decode_all()
         result = self.__class__('', mutable=True, encoding=self.encoding)
         memo[id(self)] = result
         for key, value in dict.items(self):
@@ -434,13 +529,15 @@ class QueryDict(MultiValueDict):
         self._assert_mutable()
         key = str_to_unicode(key, self.encoding)
         list_ = [str_to_unicode(elt, self.encoding) for elt in list_]
+        if self._undecoded:
+            self._undecoded.discard(key)
         MultiValueDict.setlist(self, key, list_)
 
     def setlistdefault(self, key, default_list=()):
         self._assert_mutable()
         if key not in self:
             self.setlist(key, default_list)
-        return MultiValueDict.getlist(self, key)
+        return self.getlist(key)
 
     def appendlist(self, key, value):
         self._assert_mutable()
@@ -461,15 +558,18 @@ class QueryDict(MultiValueDict):
 
     def pop(self, key, *args):
         self._assert_mutable()
+        self._decode(key)
         return MultiValueDict.pop(self, key, *args)
 
     def popitem(self):
         self._assert_mutable()
+        self._decode_all()
         return MultiValueDict.popitem(self)
 
     def clear(self):
         self._assert_mutable()
         MultiValueDict.clear(self)
+        self._undecoded = frozenset()
 
     def setdefault(self, key, default=None):
         self._assert_mutable()
@@ -477,6 +577,18 @@ class QueryDict(MultiValueDict):
         default = str_to_unicode(default, self.encoding)
         return MultiValueDict.setdefault(self, key, default)
 
+    def getlist(self, key, default=None):
+        self._decode(key)
+        return MultiValueDict.getlist(self, key, default)
+
+    def lists(self):
+        self._decode_all()
+        return MultiValueDict.lists(self)
+
+    def iterlists(self):
+        self._decode_all()
+        return MultiValueDict.iterlists(self)
+
     def copy(self):
         """Returns a mutable copy of this object."""
         return self.__deepcopy__({})
@@ -531,6 +643,7 @@ class HttpResponse(object):
     """A basic HTTP response, with content and dictionary-accessed headers."""
 
     status_code = 200
+    streaming = False
 
     def __init__(self, content='', mimetype=None, status=None,
             content_type=None):
@@ -544,7 +657,10 @@ class HttpResponse(object):
         if not content_type:
             content_type = "%s; charset=%s" % (settings.DEFAULT_CONTENT_TYPE,
                     self._charset)
-        self.content = content
+        if self.streaming:
+            self.streaming_content = content
+        else:
+            self.content = content
         self.cookies = SimpleCookie()
         if status:
             self.status_code = status
@@ -662,7 +778,9 @@ class HttpResponse(object):
         return self
 
     def next(self):
-        chunk = self._iterator.next()
+        return self._make_str(self._iterator.next())
+
+    def _make_str(self, chunk):
         if isinstance(chunk, unicode):
             chunk = chunk.encode(self._charset)
         return str(chunk)
@@ -686,6 +804,132 @@ class HttpResponse(object):
             raise Exception("This %s instance cannot tell its position" % self.__class__)
         return sum([len(str(chunk)) for chunk in self._container])
 
+class StreamingHttpResponse(HttpResponse):
+    """
+    An HTTP response whose content is an iterator that is consumed only once,
+    as the response is sent to the client.
+
+    The content is never materialized in memory by Django: it has no
+    ``content`` attribute and can't be written to. Middleware may replace the
+    iterator with one that wraps it through ``streaming_content``.
+    """
+    streaming = True
+
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        self._closable_objects = []
+        # Set by the handler, which leaves sending the request_finished
+        # signal to close().
+        self._handler_class = None
+        super(StreamingHttpResponse, self).__init__(streaming_content, *args, **kwargs)
+
+    def __str__(self):
+        """HTTP headers only; the content can't be read without consuming it."""
+        return '\n'.join(['%s: %s' % (key, value)
+            for key, value in self._headers.values()]) + '\n\n'
+
+    def _get_content(self):
+        raise AttributeError("This %s instance has no `content` attribute. "
+            "Use `streaming_content` instead." % self.__class__.__name__)
+
+    content = property(_get_content)
+
+    def _get_streaming_content(self):
+        return itertools.imap(self._make_str, self._iterator)
+
+    def _set_streaming_content(self, value):
+        # Whatever is assigned is iterated over at most once.
+        self._iterator = iter(value)
+        if hasattr(value, 'close'):
+            self._closable_objects.append(value)
+
+    streaming_content = property(_get_streaming_content, _set_streaming_content)
+
+    def __iter__(self):
+        return self.streaming_content
+
+    def close(self):
+        try:
+            for closable in self._closable_objects:
+                closable.close()
+        finally:
+            if self._handler_class is not None:
+                handler_class, self._handler_class = self._handler_class, None
+                signals.request_finished.send(sender=handler_class)
+
+    def write(self, content):
+        raise Exception("This %s instance is not writable" % self.__class__)
+
+    def tell(self):
+        raise Exception("This %s instance cannot tell its position" % self.__class__)
+
+class FileResponse(StreamingHttpResponse):
+    """
+    A streaming response for the content of a file object, which is read in
+    blocks of ``block_size`` bytes.
+
+    Under a WSGI server providing ``wsgi.file_wrapper``, the file object is
+    handed to the server instead, which may send it with the operating
+    system's sendfile() call. Requests for a single byte range of a regular
+    file are answered with that part of the file, and the file can also be
+    handed to the front-end Web server (see the SENDFILE_HEADER setting).
+    """
+    block_size = 64 * 1024
+
+    def __init__(self, file_to_stream=(), *args, **kwargs):
+        super(FileResponse, self).__init__(file_to_stream, *args, **kwargs)
+        # The size of the file, if it's a regular file read from its start.
+        self.file_size = None
+        if self.file_to_stream is not None:
+            try:
+                if self.file_to_stream.tell() == 0:
+                    st = os.fstat(self.file_to_stream.fileno())
+                    # Pipes, sockets and devices have no meaningful size.
+                    if stat.S_ISREG(st.st_mode):
+                        self.file_size = st.st_size
+            except (AttributeError, EnvironmentError, ValueError):
+                pass
+        if self.file_size is not None:
+            self['Accept-Ranges'] = 'bytes'
+            if not self.has_header('Content-Length'):
+                self['Content-Length'] = str(self.file_size)
+
+    def _read_blocks(self, filelike, length=None):
+        while length is None or length > 0:
+            if length is None:
+                block = filelike.read(self.block_size)
+            else:
+                block = filelike.read(min(self.block_size, length))
+                length -= len(block)
+            if not block:
+                break
+            yield block
+
+    def _set_streaming_content(self, value):
+        # file_to_stream is only set while the file is the content, unaltered.
+        if hasattr(value, 'read'):
+            self.file_to_stream = value
+            self._closable_objects.append(value)
+            value = self._read_blocks(value)
+        else:
+            self.file_to_stream = None
+        super(FileResponse, self)._set_streaming_content(value)
+
+    streaming_content = property(StreamingHttpResponse._get_streaming_content,
+                                 _set_streaming_content)
+
+    def set_range(self, start, stop):
+        """
+        Restricts the content to the bytes from ``start`` up to, but not
+        including, ``stop`` and turns the response into a 206 Partial Content
+        one.
+        """
+        filelike = self.file_to_stream
+        filelike.seek(start)
+        self.streaming_content = self._read_blocks(filelike, stop - start)
+        self.status_code = 206
+        self['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, self.file_size)
+        self['Content-Length'] = str(stop - start)
+
 class HttpResponseRedirect(HttpResponse):
     status_code = 302
 
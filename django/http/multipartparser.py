@@ -129,6 +129,10 @@ class MultiPartParser(object):
         old_field_name = None
         counters = [0] * len(handlers)
 
+        # Number of POST fields seen so far, see DATA_UPLOAD_MAX_NUMBER_FIELDS.
+        num_fields = 0
+        max_fields = settings.DATA_UPLOAD_MAX_NUMBER_FIELDS
+
         try:
             for item_type, meta_data, field_stream in Parser(stream, self._boundary):
                 if old_field_name:
@@ -150,6 +154,12 @@ class MultiPartParser(object):
                 field_name = force_unicode(field_name, encoding, errors='replace')
 
                 if item_type == FIELD:
+                    num_fields += 1
+                    if max_fields is not None and num_fields > max_fields:
+                        raise SuspiciousOperation(
+                            "The number of GET/POST parameters exceeded "
+                            "settings.DATA_UPLOAD_MAX_NUMBER_FIELDS (%d)." % max_fields)
+
                     # This is a post field, we can just set it in the post
                     if transfer_encoding == 'base64':
                         raw_data = field_stream.read()
@@ -341,7 +351,10 @@ class LazyStream(object):
             return
         self._update_unget_history(len(bytes))
         self.position -= len(bytes)
-        self._leftover = ''.join([bytes, self._leftover])
+        if self._leftover:
+            self._leftover = ''.join([bytes, self._leftover])
+        else:
+            self._leftover = bytes
 
     def _update_unget_history(self, num_bytes):
         """
@@ -444,39 +457,45 @@ class BoundaryIter(object):
         stream = self._stream
         rollback = self._rollback
 
-        bytes_read = 0
-        chunks = []
-        for bytes in stream:
-            bytes_read += len(bytes)
-            chunks.append(bytes)
-            if bytes_read > rollback:
-                break
-            if not bytes:
-                break
-        else:
+        chunk = self._next_chunk()
+        if not chunk:
             self._done = True
-
-        if not chunks:
             raise StopIteration()
 
-        chunk = ''.join(chunks)
-        boundary = self._find_boundary(chunk, len(chunk) < self._rollback)
-
-        if boundary:
-            end, next = boundary
-            stream.unget(chunk[next:])
-            self._done = True
-            return chunk[:end]
-        else:
-            # make sure we dont treat a partial boundary (and
-            # its separators) as data
-            if not chunk[:-rollback]:# and len(chunk) >= (len(self._boundary) + 6):
-                # There's nothing left, we should just return and mark as done.
+        if self._fs(chunk) < 0:
+            following = self._next_chunk()
+            if not following:
+                # The stream ended without a boundary.
                 self._done = True
                 return chunk
-            else:
-                stream.unget(chunk[-rollback:])
-                return chunk[:-rollback]
+            while len(following) < rollback:
+                more = self._next_chunk()
+                if not more:
+                    break
+                following = ''.join([following, more])
+            # A boundary (with its preceding CRLF) may straddle both chunks;
+            # one starting later lies entirely within the following chunk.
+            junction = chunk[-rollback:] + following[:rollback]
+            if self._fs(junction) < 0:
+                # The whole chunk is data: pass it on without copying it.
+                stream.unget(following)
+                return chunk
+            chunk = ''.join([chunk, following])
+
+        end, next = self._find_boundary(chunk)
+        stream.unget(chunk[next:])
+        self._done = True
+        return chunk[:end]
+
+    def _next_chunk(self):
+        """
+        Returns the next chunk of the stream, or an empty string once it's
+        exhausted.
+        """
+        try:
+            return self._stream.next()
+        except StopIteration:
+            return ''
 
     def _find_boundary(self, data, eof = False):
         """
@@ -8,6 +8,14 @@ Functions that modify an HTTP request or response in some way.
 # it's a little fiddly to override this behavior, so they should be truly
 # universally applicable.
 
+import os
+import re
+
+from django.conf import settings
+from django.utils.encoding import smart_str
+
+range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
 def fix_location_header(request, response):
     """
     Ensures that we always use an absolute URI in any location header in the
@@ -20,18 +28,95 @@ def fix_location_header(request, response):
         response['Location'] = request.build_absolute_uri(response['Location'])
     return response
 
+def sendfile_file_response(request, response):
+    """
+    Hands the file of a FileResponse over to the front-end Web server, by
+    setting the header named by the SENDFILE_HEADER setting to the file's
+    path, or to the URL it's mapped to by the SENDFILE_ROOTS setting, and
+    discarding the content.
+    """
+    if not settings.SENDFILE_HEADER or response.status_code != 200:
+        return response
+    filename = getattr(getattr(response, 'file_to_stream', None), 'name', None)
+    if not isinstance(filename, basestring) or not os.path.isabs(filename):
+        return response
+    if settings.SENDFILE_ROOTS:
+        for root, url in settings.SENDFILE_ROOTS.items():
+            root = os.path.join(os.path.abspath(root), '')
+            if filename.startswith(root):
+                location = '%s/%s' % (url.rstrip('/'),
+                    filename[len(root):].replace(os.sep, '/'))
+                break
+        else:
+            return response
+    else:
+        location = filename
+    response[settings.SENDFILE_HEADER] = smart_str(location)
+    response.streaming_content = []
+    # The Web server computes these for the file it sends.
+    del response['Content-Length']
+    del response['Accept-Ranges']
+    return response
+
+def file_response_range(request, response):
+    """
+    Answers a request for a single byte range of the file of a FileResponse
+    with that part of the file, as described in RFC 2616, section 14.35.
+    Requests for several ranges are answered with the whole file.
+    """
+    if (getattr(response, 'file_to_stream', None) is None or
+            response.file_size is None or response.status_code != 200 or
+            response.has_header('Content-Encoding') or
+            request.method not in ('GET', 'HEAD')):
+        return response
+    match = range_re.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match:
+        return response
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (response.get('ETag'), response.get('Last-Modified')):
+        return response
+    first, last = match.groups()
+    size = response.file_size
+    if first:
+        start, stop = int(first), size
+        if last:
+            if int(last) < start:
+                # Syntactically invalid, so the header is ignored.
+                return response
+            stop = min(int(last) + 1, size)
+    elif last:
+        # A suffix range: the last bytes of the file.
+        start, stop = max(size - int(last), 0), size
+    else:
+        return response
+    if start >= stop:
+        response.status_code = 416
+        response.streaming_content = []
+        response['Content-Range'] = 'bytes */%d' % size
+        response['Content-Length'] = 0
+        return response
+    response.set_range(start, stop)
+    return response
+
 def conditional_content_removal(request, response):
     """
     Removes the content of responses for HEAD requests, 1xx, 204 and 304
     responses. Ensures compliance with RFC 2616, section 4.3.
     """
     if 100 <= response.status_code < 200 or response.status_code in (204, 304):
-       response.content = ''
-       response['Content-Length'] = 0
+        _remove_content(response)
+        response['Content-Length'] = 0
     if request.method == 'HEAD':
-        response.content = ''
+        _remove_content(response)
     return response
 
+def _remove_content(response):
+    if response.streaming:
+        response.streaming_content = []
+    else:
+        response.content = ''
+
+
 def fix_IE_for_attach(request, response):
     """
     This function will prevent Django from serving a Content-Disposition header
@@ -95,6 +95,9 @@ class UpdateCacheMiddleware(object):
             return response
         if not response.status_code == 200:
             return response
+        # Streaming responses can't be stored without consuming their content.
+        if response.streaming:
+            return response
         # Try to get the timeout from the "max-age" section of the "Cache-
         # Control" header before reverting to using the default cache_timeout
         # length.
@@ -108,8 +108,9 @@ class CommonMiddleware(object):
                                   fail_silently=True)
                 return response
 
-        # Use ETags, if requested.
-        if settings.USE_ETAGS:
+        # Use ETags, if requested. The content of streaming responses isn't
+        # available to be hashed.
+        if settings.USE_ETAGS and (response.has_header('ETag') or not response.streaming):
             if response.has_header('ETag'):
                 etag = response['ETag']
             else:
@@ -1,6 +1,7 @@
 import re
 
-from django.utils.text import compress_string
+from django.conf import settings
+from django.utils.text import compress_sequence, compress_string
 from django.utils.cache import patch_vary_headers
 
 re_accepts_gzip = re.compile(r'\bgzip\b')
@@ -10,10 +11,20 @@ class GZipMiddleware(object):
     This middleware compresses content if the browser allows gzip compression.
     It sets the Vary header accordingly, so that caches will base their storage
     on the Accept-Encoding header.
+
+    The compression level, the minimum size of the content worth compressing
+    and the content types to compress are set by the GZIP_COMPRESSION_LEVEL,
+    GZIP_MINIMUM_SIZE and GZIP_CONTENT_TYPES settings.
     """
     def process_response(self, request, response):
+        if response.status_code == 200 and not response.streaming and \
+                response._base_content_is_iter:
+            # Reading the content of an iterator consumes it: keep it as a
+            # string, so that the middleware below can read it again.
+            response.content = response.content
+
         # It's not worth compressing non-OK or really short responses.
-        if response.status_code != 200 or len(response.content) < 200:
+        if response.status_code != 200 or self._is_too_short(response):
             return response
 
         patch_vary_headers(response, ('Accept-Encoding',))
@@ -22,9 +33,12 @@ class GZipMiddleware(object):
         if response.has_header('Content-Encoding'):
             return response
 
+        ctype = response.get('Content-Type', '').lower()
+        if not content_type_allowed(ctype, settings.GZIP_CONTENT_TYPES):
+            return response
+
         # MSIE have issues with gzipped response of various content types.
         if "msie" in request.META.get('HTTP_USER_AGENT', '').lower():
-            ctype = response.get('Content-Type', '').lower()
             if not ctype.startswith("text/") or "javascript" in ctype:
                 return response
 
@@ -32,7 +46,43 @@ class GZipMiddleware(object):
         if not re_accepts_gzip.search(ae):
             return response
 
-        response.content = compress_string(response.content)
+        level = settings.GZIP_COMPRESSION_LEVEL
+        if response.streaming:
+            # Compress the content as it's sent, without buffering it.
+            response.streaming_content = compress_sequence(
+                response.streaming_content, level)
+            del response['Content-Length']
+        else:
+            response.content = compress_string(response.content, level)
+            response['Content-Length'] = str(len(response.content))
         response['Content-Encoding'] = 'gzip'
-        response['Content-Length'] = str(len(response.content))
         return response
+
+    def _is_too_short(self, response):
+        """
+        Returns True if the response content is known to be shorter than
+        GZIP_MINIMUM_SIZE. The length of streaming content is only known
+        from its Content-Length header, if any.
+        """
+        if response.streaming:
+            length = response.get('Content-Length')
+            if length is None or not length.isdigit():
+                return False
+            return int(length) < settings.GZIP_MINIMUM_SIZE
+        return len(response.content) < settings.GZIP_MINIMUM_SIZE
+
+def content_type_allowed(content_type, allowed_types):
+    """
+    Returns True if the MIME type of ``content_type`` (a Content-Type header
+    value) matches one of ``allowed_types``, which may contain wildcards such
+    as 'text/*'. An empty ``allowed_types`` allows every content type.
+    """
+    if not allowed_types:
+        return True
+    mime_type = content_type.split(';')[0].strip().lower()
+    for allowed in allowed_types:
+        allowed = allowed.lower()
+        if allowed == mime_type or (allowed.endswith('/*') and
+                mime_type.startswith(allowed[:-1])):
+            return True
+    return False
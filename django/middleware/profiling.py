@@ -0,0 +1,269 @@
+import cProfile
+import hashlib
+import os
+import pstats
+import random
+import sys
+import time
+from threading import local
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files import locks
+from django.core.files.move import create_temp_file, file_move_safe
+from django.core.urlresolvers import resolve, Resolver404
+from django.db import connections
+from django.utils.encoding import smart_str
+from django.utils.log import getLogger
+
+logger = getLogger('django.request')
+
+# The profiler enabled in the current thread, if any.
+_state = local()
+
+class ProfilingMiddleware(object):
+    """
+    Profiles a random sample of the requests with cProfile.
+
+    A fraction PROFILING_SAMPLE_RATE of the requests is profiled, from this
+    middleware's process_request() to its process_response(), so it should
+    come first in MIDDLEWARE_CLASSES to profile the other middleware too.
+    The profile of each sampled request is saved to its own file in
+    PROFILING_DIRECTORY, with its duration and its number of SQL queries.
+    The ``profilestats`` management command adds them up by URL name and
+    summarizes them.
+    """
+    def __init__(self):
+        if not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        if not settings.PROFILING_DIRECTORY:
+            raise ImproperlyConfigured("The ProfilingMiddleware requires the "
+                                       "PROFILING_DIRECTORY setting.")
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.directory = settings.PROFILING_DIRECTORY
+
+    def process_request(self, request):
+        # process_response() isn't called if the response middleware below
+        # this one raises an exception; don't keep profiling in that case.
+        stale = getattr(_state, 'profiler', None)
+        if stale is not None:
+            stale.disable()
+            _state.profiler = None
+        if random.random() >= self.sample_rate:
+            return None
+        # Queries are only recorded by debug cursors.
+        request._profiling_queries = []
+        for connection in connections.all():
+            request._profiling_queries.append(
+                (connection, connection.use_debug_cursor, len(connection.queries)))
+            connection.use_debug_cursor = True
+        request._profiling_start = time.time()
+        request._profiler = _state.profiler = cProfile.Profile()
+        request._profiler.enable()
+
+    def process_response(self, request, response):
+        # An earlier middleware may have returned a response before
+        # process_request() was called.
+        profiler = getattr(request, '_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        del request._profiler
+        _state.profiler = None
+        duration = time.time() - request._profiling_start
+        queries = 0
+        for connection, use_debug_cursor, count in request._profiling_queries:
+            queries += max(len(connection.queries) - count, 0)
+            connection.use_debug_cursor = use_debug_cursor
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            url_name = view = None
+        else:
+            url_name = match.url_name
+            view = '%s.%s' % (match.func.__module__,
+                              getattr(match.func, '__name__', match.func.__class__.__name__))
+        profiler.create_stats()
+        try:
+            save_sample(self.directory, {
+                'url_name': url_name or view,
+                'view': view,
+                'time': request._profiling_start,
+                'duration': duration,
+                'queries': queries,
+                'stats': profiler.stats,
+            })
+        except Exception:
+            # Losing a sample, e.g. because the disk is full, mustn't turn
+            # the response into an error.
+            logger.warning('Unable to save the profile of %s' % request.path,
+                exc_info=sys.exc_info(),
+                extra={
+                    'request': request,
+                }
+            )
+        return response
+
+class _Stats(object):
+    """
+    Feeds saved cProfile stats to pstats.Stats, which accepts any object
+    with a create_stats() method and a ``stats`` attribute.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def merge_stats(stats, other):
+    """
+    Returns the cProfile stats of two profiles added together.
+    """
+    # pstats refuses empty stats.
+    if not stats:
+        return other
+    merged = pstats.Stats(_Stats(stats))
+    merged.add(pstats.Stats(_Stats(other)))
+    return merged.stats
+
+def _url_hash(url_name):
+    # URL names may contain characters that aren't allowed in file names.
+    return hashlib.md5(smart_str(url_name)).hexdigest()
+
+def _write_pickle(directory, prefix, suffix, obj):
+    """
+    Pickles obj to a new file named prefix, a random part and suffix in the
+    given directory, and returns its path. The file is written under a
+    temporary name first, so that it never appears partially written.
+    """
+    fd, tmp_path = create_temp_file(directory, prefix + '.', '.tmp')
+    renamed = False
+    try:
+        f = os.fdopen(fd, 'wb')
+        try:
+            pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+        path = tmp_path[:-len('.tmp')] + suffix
+        file_move_safe(tmp_path, path, allow_overwrite=True)
+        renamed = True
+    finally:
+        if not renamed:
+            os.remove(tmp_path)
+    return path
+
+def _read_pickle(path):
+    f = open(path, 'rb')
+    try:
+        return pickle.load(f)
+    finally:
+        f.close()
+
+def save_sample(directory, sample):
+    """
+    Saves the profile of a request (a dictionary of its URL name, view, start
+    time, duration, number of SQL queries and the stats of a cProfile.Profile
+    object) to its own file in the given directory.
+
+    Samples don't wait for each other: they're only added up by
+    load_profiles(), outside of the requests.
+    """
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Created by another process in the meantime.
+            if not os.path.isdir(directory):
+                raise
+    _write_pickle(directory, _url_hash(sample['url_name']), '.sample', sample)
+
+def _merge_samples(directory, url_hash, sample_names):
+    """
+    Adds the given samples of a URL name to its profile, saved as a single
+    file, and returns the profile.
+    """
+    path = os.path.join(directory, '%s.profile' % url_hash)
+    profile = None
+    if os.path.exists(path):
+        try:
+            profile = _read_pickle(path)
+        except Exception:
+            # An unreadable profile is started over rather than blocking
+            # the new samples.
+            pass
+    # A crash may have left the samples merged by the last run in place.
+    merged = profile and profile.get('merged') or ()
+    for name in sample_names:
+        if name in merged:
+            continue
+        try:
+            sample = _read_pickle(os.path.join(directory, name))
+        except Exception:
+            continue
+        if profile is None:
+            profile = {
+                'url_name': sample['url_name'],
+                'requests': 0,
+                'first_time': sample['time'],
+                'total_duration': 0.0,
+                'max_duration': 0.0,
+                'queries': 0,
+                'stats': {},
+            }
+        profile['view'] = sample['view']
+        profile['requests'] += 1
+        profile['first_time'] = min(profile['first_time'], sample['time'])
+        profile['last_time'] = max(profile.get('last_time', sample['time']), sample['time'])
+        profile['total_duration'] += sample['duration']
+        profile['max_duration'] = max(profile['max_duration'], sample['duration'])
+        profile['queries'] += sample['queries']
+        profile['stats'] = merge_stats(profile['stats'], sample['stats'])
+    if profile is None:
+        return None
+    # The samples are only deleted once the profile including them has been
+    # saved, and it remembers them in case they can't all be deleted.
+    profile['merged'] = frozenset(sample_names)
+    tmp_path = _write_pickle(directory, url_hash, '.new', profile)
+    file_move_safe(tmp_path, path, allow_overwrite=True)
+    for name in sample_names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+    return profile
+
+def load_profiles(directory):
+    """
+    Adds the samples saved in the given directory up by URL name, into a
+    single file per URL name, and yields the resulting profiles as
+    dictionaries, one at a time.
+    """
+    if not os.path.isdir(directory):
+        return
+    url_hashes = {}
+    for name in os.listdir(directory):
+        url_hash, ext = os.path.splitext(name)
+        if ext == '.sample':
+            url_hashes.setdefault(url_hash.split('.')[0], []).append(name)
+        elif ext == '.profile':
+            url_hashes.setdefault(url_hash, [])
+    for url_hash in sorted(url_hashes):
+        # Only one process at a time merges the samples of a URL name.
+        f = open(os.path.join(directory, '.lock'), 'ab')
+        try:
+            locks.lock(f, locks.LOCK_EX)
+            # Another process may have merged some samples in the meantime.
+            sample_names = [name for name in url_hashes[url_hash]
+                            if os.path.exists(os.path.join(directory, name))]
+            profile = _merge_samples(directory, url_hash, sample_names)
+        finally:
+            locks.unlock(f)
+            f.close()
+        if profile is None:
+            continue
+        profile['file'] = os.path.join(directory, '%s.profile' % url_hash)
+        yield profile
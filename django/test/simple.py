@@ -1,4 +1,11 @@
+import os
+import select
 import unittest as real_unittest
+try:
+    import multiprocessing
+except ImportError:
+    # Python 2.5
+    multiprocessing = None
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -10,7 +17,7 @@ from django.utils import unittest
 from django.utils.importlib import import_module
 from django.utils.module_loading import module_has_submodule
 
-__all__ = ('DjangoTestRunner', 'DjangoTestSuiteRunner')
+__all__ = ('DjangoTestRunner', 'DjangoTestSuiteRunner', 'ParallelTestSuite')
 
 # The module name for tests outside models.py
 TEST_MODULE = 'tests'
@@ -185,6 +192,265 @@ def reorder_suite(suite, classes):
         bins[0].addTests(bins[i+1])
     return bins[0]
 
+def partition_suite_by_case(suite):
+    """
+    Partitions a test suite into suites of the consecutive tests of the same
+    TestCase class, which must run in the same process. Each doctest gets
+    its own suite.
+    """
+    subsuites = []
+    previous = None
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            subsuites.extend(partition_suite_by_case(test))
+            previous = None
+            continue
+        key = test.__class__
+        if isinstance(test, doctest.DocTestCase):
+            key = test
+        if key is not previous:
+            subsuites.append(unittest.TestSuite())
+            previous = key
+        subsuites[-1].addTest(test)
+    return subsuites
+
+class RemoteTestError(Exception):
+    """
+    An error or failure of a test run by a worker process, with the
+    formatted traceback of the original exception.
+    """
+
+class RemoteTestResult(unittest.TestResult):
+    """
+    Records the outcomes of the tests of a suite run by a worker process, to
+    report them to the result of the parent process.
+    """
+    def __init__(self, subsuite):
+        super(RemoteTestResult, self).__init__()
+        self.indexes = dict((id(test), index) for index, test in enumerate(subsuite))
+        self.events = []
+
+    def _add_event(self, name, test, *args):
+        # The tests are sent back as their index in the suite, unless they
+        # were created by the suite, e.g. for the errors of setUpClass().
+        self.events.append((name, self.indexes.get(id(test), test), args))
+
+    def startTest(self, test):
+        super(RemoteTestResult, self).startTest(test)
+        self._add_event('startTest', test)
+
+    def stopTest(self, test):
+        super(RemoteTestResult, self).stopTest(test)
+        self._add_event('stopTest', test)
+
+    def addError(self, test, err):
+        super(RemoteTestResult, self).addError(test, err)
+        self._add_event('addError', test, self.errors[-1][1])
+
+    def addFailure(self, test, err):
+        super(RemoteTestResult, self).addFailure(test, err)
+        self._add_event('addFailure', test, self.failures[-1][1])
+
+    def addSuccess(self, test):
+        super(RemoteTestResult, self).addSuccess(test)
+        self._add_event('addSuccess', test)
+
+    def addSkip(self, test, reason):
+        super(RemoteTestResult, self).addSkip(test, reason)
+        self._add_event('addSkip', test, reason)
+
+    def addExpectedFailure(self, test, err):
+        super(RemoteTestResult, self).addExpectedFailure(test, err)
+        self._add_event('addExpectedFailure', test, self.expectedFailures[-1][1])
+
+    def addUnexpectedSuccess(self, test):
+        super(RemoteTestResult, self).addUnexpectedSuccess(test)
+        self._add_event('addUnexpectedSuccess', test)
+
+def _init_worker(index, test_databases):
+    """
+    Sets up a worker process of a ParallelTestSuite: points the connections
+    to the copies of the test databases reserved for the index-th worker.
+    """
+    from django.core.management.parallel import detach_connections
+    from django.db import connections
+
+    # The tests may start processes of their own, which daemonic processes
+    # can't do.
+    multiprocessing.current_process().daemon = False
+    aliases = []
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        names = test_databases.get(settings_dict['NAME'])
+        if names and names[index] != settings_dict['NAME']:
+            settings_dict['NAME'] = names[index]
+            aliases.append(alias)
+    detach_connections(aliases)
+
+def _run_worker(index, conn, subsuites, test_databases):
+    """
+    The main loop of a worker process of a ParallelTestSuite: runs the
+    suites whose indexes are received on conn, and sends back the outcomes
+    of their tests, until it receives None.
+    """
+    _init_worker(index, test_databases)
+    while True:
+        subsuite_index = conn.recv()
+        if subsuite_index is None:
+            break
+        subsuite = subsuites[subsuite_index]
+        result = RemoteTestResult(subsuite)
+        unittest.registerResult(result)
+        subsuite.run(result)
+        conn.send(result.events)
+
+class ParallelTestSuite(unittest.TestSuite):
+    """
+    Runs the tests of a suite in up to the given number of worker processes.
+
+    The tests of a TestCase class all run in the same process, in the order
+    of the suite, so that the order given by reorder_suite() holds in each
+    process. The workers use the copies of the test databases given by
+    test_databases, which maps the name of each test database to the names of
+    its copies, one per worker.
+
+    The workers are forked, so that they inherit the suite rather than
+    receiving it pickled. A worker that dies, e.g. because of a crash, is
+    reported as an error of the suite it was running and replaced.
+
+    The tests of the TestCase classes whose run_serially attribute is True,
+    e.g. because they write to shared files, are run by the main process once
+    the workers are done.
+    """
+    # How often the workers are checked for having died, in seconds, while
+    # waiting for their results.
+    poll_interval = 1
+
+    def __init__(self, suite, processes, test_databases):
+        self.subsuites = partition_suite_by_case(suite)
+        self.serial_indexes = [index for index, subsuite in enumerate(self.subsuites)
+                               if getattr(iter(subsuite).next(), 'run_serially', False)]
+        self.processes = min(processes, len(self.subsuites) - len(self.serial_indexes))
+        self.test_databases = test_databases
+        super(ParallelTestSuite, self).__init__(self.subsuites)
+
+    def start_worker(self, index):
+        """
+        Starts the index-th worker, returning the process and the parent's
+        end of the pipe connected to it.
+        """
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_run_worker,
+            args=(index, child_conn, self.subsuites, self.test_databases))
+        # Workers left behind by an interrupted run don't block the exit.
+        process.daemon = True
+        process.start()
+        # Only the worker holds its end of the pipe, so that reading from the
+        # pipe fails as soon as the worker dies.
+        child_conn.close()
+        return process, conn
+
+    def run(self, result):
+        serial_indexes = set(self.serial_indexes)
+        pending = [index for index in range(len(self.subsuites) - 1, -1, -1)
+                   if index not in serial_indexes]
+        if pending:
+            self.run_workers(result, pending)
+        for index in self.serial_indexes:
+            if result.shouldStop:
+                break
+            self.subsuites[index].run(result)
+        return result
+
+    def run_workers(self, result, pending):
+        """
+        Runs the suites whose indexes are in pending, which are popped from
+        its end, in the worker processes.
+        """
+        # The process, the pipe and the index of the suite being run, by
+        # worker index.
+        workers = {}
+        try:
+            for index in range(self.processes):
+                process, conn = self.start_worker(index)
+                workers[index] = [process, conn, pending.pop()]
+                self.send(conn, workers[index][2])
+            while workers and not result.shouldStop:
+                ready, _, _ = select.select([conn for process, conn, subsuite_index
+                                             in workers.values()],
+                                            [], [], self.poll_interval)
+                for index, worker in workers.items():
+                    process, conn, subsuite_index = worker
+                    if conn in ready:
+                        try:
+                            events = conn.recv()
+                        except (EOFError, IOError):
+                            events = None
+                    elif process.exitcode is not None:
+                        events = None
+                    else:
+                        continue
+                    if events is None:
+                        self.report_dead_worker(result, subsuite_index, process)
+                        conn.close()
+                        if pending:
+                            process, conn = self.start_worker(index)
+                    else:
+                        self.report_events(result, subsuite_index, events)
+                    if pending:
+                        worker[:] = [process, conn, pending.pop()]
+                        self.send(conn, worker[2])
+                    else:
+                        del workers[index]
+                        if events is not None:
+                            self.send(conn, None)
+                            process.join()
+                            conn.close()
+        finally:
+            # Stops the workers still running tests after a failure when
+            # failfast is set, or after an interruption.
+            for process, conn, subsuite_index in workers.values():
+                process.terminate()
+                process.join()
+                conn.close()
+
+    def send(self, conn, subsuite_index):
+        """
+        Sends the index of a suite to run, or None, to a worker.
+        """
+        try:
+            conn.send(subsuite_index)
+        except (IOError, OSError):
+            # The worker has died; this is found out when reading from it.
+            pass
+
+    def report_events(self, result, subsuite_index, events):
+        """
+        Replays on result the outcomes of the tests of a suite recorded by a
+        worker's RemoteTestResult.
+        """
+        tests = list(self.subsuites[subsuite_index])
+        for name, test, args in events:
+            if isinstance(test, int):
+                test = tests[test]
+            if name in ('addError', 'addFailure', 'addExpectedFailure'):
+                args = ((RemoteTestError, RemoteTestError(args[0]), None),)
+            getattr(result, name)(test, *args)
+
+    def report_dead_worker(self, result, subsuite_index, process):
+        """
+        Reports the death of the worker running a suite as an error of the
+        first test of the suite.
+        """
+        process.join()
+        tests = list(self.subsuites[subsuite_index])
+        message = ("The worker process died with exit code %s while running "
+                   "these tests:\n%s\n" % (process.exitcode,
+                   '\n'.join(test.id() for test in tests)))
+        result.startTest(tests[0])
+        result.addError(tests[0], (RemoteTestError, RemoteTestError(message), None))
+        result.stopTest(tests[0])
+
 def dependency_ordered(test_databases, dependencies):
     """Reorder test_databases into an order that honors the dependencies
     described in TEST_DEPENDENCIES.
@@ -221,10 +487,16 @@ def dependency_ordered(test_databases, dependencies):
     return ordered_test_databases
 
 class DjangoTestSuiteRunner(object):
-    def __init__(self, verbosity=1, interactive=True, failfast=True, **kwargs):
+    def __init__(self, verbosity=1, interactive=True, failfast=True, keepdb=False,
+                 parallel=1, **kwargs):
         self.verbosity = verbosity
         self.interactive = interactive
         self.failfast = failfast
+        self.keepdb = keepdb
+        self.parallel = parallel
+        # The names of the copies of each test database, by name, used by
+        # the worker processes when running the tests in parallel.
+        self.worker_test_databases = {}
 
     def setup_test_environment(self, **kwargs):
         setup_test_environment()
@@ -281,6 +553,27 @@ class DjangoTestSuiteRunner(object):
                     if alias != DEFAULT_DB_ALIAS:
                         dependencies[alias] = connection.settings_dict.get('TEST_DEPENDENCIES', [DEFAULT_DB_ALIAS])
 
+        if self.parallel > 1:
+            if multiprocessing is None:
+                raise ImproperlyConfigured("Running the tests in parallel requires "
+                                           "the multiprocessing module, which is "
+                                           "only available in Python 2.6 and later.")
+            if not hasattr(os, 'fork'):
+                raise ImproperlyConfigured("Running the tests in parallel requires "
+                                           "os.fork(), which isn't available on "
+                                           "this platform.")
+            for signature, (db_name, aliases) in test_databases.items():
+                if not connections[aliases[0]].features.can_clone_databases:
+                    raise ImproperlyConfigured("The tests can't run in parallel, "
+                                               "the test database for alias '%s' "
+                                               "can't be cloned." % aliases[0])
+
+        # keepdb is only passed when it's set, since the backends written
+        # before it was added don't accept it.
+        create_kwargs = {}
+        if self.keepdb:
+            create_kwargs['keepdb'] = True
+
         # Second pass -- actually create the databases.
         old_names = []
         mirrors = []
@@ -288,7 +581,8 @@ class DjangoTestSuiteRunner(object):
             # Actually create the database for the first connection
             connection = connections[aliases[0]]
             old_names.append((connection, db_name, True))
-            test_db_name = connection.creation.create_test_db(self.verbosity, autoclobber=not self.interactive)
+            test_db_name = connection.creation.create_test_db(self.verbosity,
+                autoclobber=not self.interactive, **create_kwargs)
             for alias in aliases[1:]:
                 connection = connections[alias]
                 if db_name:
@@ -299,15 +593,25 @@ class DjangoTestSuiteRunner(object):
                     # the name isn't important -- e.g., SQLite, which uses :memory:.
                     # Force create the database instead of assuming it's a duplicate.
                     old_names.append((connection, db_name, True))
-                    connection.creation.create_test_db(self.verbosity, autoclobber=not self.interactive)
+                    connection.creation.create_test_db(self.verbosity,
+                        autoclobber=not self.interactive, **create_kwargs)
 
         for alias, mirror_alias in mirrored_aliases.items():
             mirrors.append((alias, connections[alias].settings_dict['NAME']))
             connections[alias].settings_dict['NAME'] = connections[mirror_alias].settings_dict['NAME']
 
+        if self.parallel > 1:
+            for connection, old_name, destroy in old_names:
+                if destroy:
+                    self.worker_test_databases[connection.settings_dict['NAME']] = \
+                        connection.creation.create_worker_test_dbs(self.parallel,
+                            old_name, self.verbosity, autoclobber=not self.interactive)
+
         return old_names, mirrors
 
     def run_suite(self, suite, **kwargs):
+        if self.parallel > 1:
+            suite = ParallelTestSuite(suite, self.parallel, self.worker_test_databases)
         return unittest.TextTestRunner(verbosity=self.verbosity, failfast=self.failfast).run(suite)
 
     def teardown_databases(self, old_config, **kwargs):
@@ -319,6 +623,9 @@ class DjangoTestSuiteRunner(object):
         # Destroy all the non-mirror databases
         for connection, old_name, destroy in old_names:
             if destroy:
+                names = self.worker_test_databases.pop(connection.settings_dict['NAME'], None)
+                if names:
+                    connection.creation.destroy_worker_test_dbs(names, old_name, self.verbosity)
                 connection.creation.destroy_test_db(old_name, self.verbosity)
             else:
                 connection.settings_dict['NAME'] = old_name
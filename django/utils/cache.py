@@ -110,7 +110,7 @@ def patch_response_headers(response, cache_timeout=None):
         cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
     if cache_timeout < 0:
         cache_timeout = 0 # Can't have max-age negative
-    if settings.USE_ETAGS and not response.has_header('ETag'):
+    if settings.USE_ETAGS and not response.has_header('ETag') and not response.streaming:
         if hasattr(response, 'render') and callable(response.render):
             response.add_post_render_callback(_set_response_etag)
         else:
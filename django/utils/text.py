@@ -277,13 +277,60 @@ phone2numeric = allow_lazy(phone2numeric)
 
 # From http://www.xhaus.com/alan/python/httpcomp.html#gzip
 # Used with permission.
-def compress_string(s):
+def compress_string(s, compresslevel=6):
     zbuf = StringIO()
-    zfile = GzipFile(mode='wb', compresslevel=6, fileobj=zbuf)
+    zfile = GzipFile(mode='wb', compresslevel=compresslevel, fileobj=zbuf)
     zfile.write(s)
     zfile.close()
     return zbuf.getvalue()
 
+class StreamingBuffer(object):
+    """
+    A write-only file-like object whose contents are drained by read().
+    """
+    def __init__(self):
+        self.vals = []
+
+    def write(self, val):
+        self.vals.append(val)
+
+    def read(self):
+        ret = ''.join(self.vals)
+        self.vals = []
+        return ret
+
+    def flush(self):
+        return
+
+    def close(self):
+        return
+
+def compress_sequence(sequence, compresslevel=6, chunk_size=64 * 1024):
+    """
+    Incrementally gzips an iterable of strings, yielding the compressed data
+    as it becomes available, so the whole sequence is never held in memory.
+
+    The compressor is flushed once at least ``chunk_size`` bytes have been fed
+    to it since the last flush, which bounds how long data can be held back
+    without hurting the compression of sequences of many small items.
+    """
+    buf = StreamingBuffer()
+    zfile = GzipFile(mode='wb', compresslevel=compresslevel, fileobj=buf)
+    # Output the gzip header straight away.
+    yield buf.read()
+    pending = 0
+    for item in sequence:
+        zfile.write(item)
+        pending += len(item)
+        if pending >= chunk_size:
+            zfile.flush()
+            pending = 0
+        data = buf.read()
+        if data:
+            yield data
+    zfile.close()
+    yield buf.read()
+
 ustring_re = re.compile(u"([\u0080-\uffff])")
 
 def javascript_quote(s, quote_double_quotes=False):
@@ -2,10 +2,18 @@
 Decorators for views based on HTTP headers.
 """
 
+from __future__ import with_statement
+
+import hashlib
 from calendar import timegm
 from functools import wraps
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 
 from django.utils.decorators import decorator_from_middleware, available_attrs
+from django.utils.encoding import smart_str
 from django.utils.http import http_date, parse_http_date_safe, parse_etags, quote_etag
 from django.utils.log import getLogger
 from django.middleware.http import ConditionalGetMiddleware
@@ -163,3 +171,152 @@ def etag(etag_func):
 def last_modified(last_modified_func):
     return condition(last_modified_func=last_modified_func)
 
+def model_last_modified(queryset, field_name, timeout=None):
+    """
+    Returns a function usable as the ``last_modified_func`` of condition(),
+    which returns the latest value of the DateTimeField ``field_name`` among
+    the objects of ``queryset`` (a model, a manager or a QuerySet). Usage::
+
+        @condition(last_modified_func=model_last_modified(Entry, 'updated_at'))
+        def entry_list(request):
+            ...
+
+    The value is kept in the default cache, for ``timeout`` seconds at most,
+    until an instance of the model, of one of its proxies, of its parents or of
+    its children is saved or deleted. Changes made with
+    QuerySet.update() aren't noticed.
+
+    The signals invalidating the value may be sent before the change is
+    committed, letting a concurrent request cache the old value again. The
+    value is thus invalidated again once the request that made the change
+    has finished, after its transaction has been committed. Changes made
+    outside of requests, e.g. by management commands, aren't invalidated
+    again; a short ``timeout`` bounds how long the old value may be served.
+    """
+    def last_modified(request, *args, **kwargs):
+        return _latest_value(queryset, field_name, timeout)
+    return last_modified
+
+def _latest_value(queryset, field_name, timeout=None):
+    """
+    Returns the maximum value of ``field_name`` among the objects of
+    ``queryset``, cached as described in model_last_modified().
+    """
+    from django.core.cache import cache
+    from django.db.models import Max
+    from django.db.models.sql.datastructures import EmptyResultSet
+    from django.shortcuts import _get_queryset
+
+    queryset = _get_queryset(queryset)
+    _watch_model(queryset.model)
+    tag = _model_tag(queryset.model)
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    key = 'views.decorators.http.model_last_modified.%s' % hashlib.md5(
+        smart_str('%s|%s|%s|%r' % (queryset.db, field_name, sql, params))).hexdigest()
+    # The value is wrapped in a tuple to tell an empty table from a miss.
+    value = cache.get_tagged(key)
+    if value is None:
+        value = (queryset.aggregate(latest=Max(field_name))['latest'],)
+        cache.set_tagged(key, value, [tag], timeout)
+    return value[0]
+
+# The concrete models whose changes invalidate the values cached by
+# _latest_value(). It's replaced rather than modified, under _watch_lock, so
+# that _invalidate_model() can iterate over it without locking.
+_watched_models = frozenset()
+_watch_lock = threading.Lock()
+
+# The tags invalidated by the current thread, to invalidate again once the
+# current request has finished.
+_pending = threading.local()
+
+def _concrete_model(model):
+    """
+    Returns the model whose table holds the objects of model, following
+    proxies.
+    """
+    while model._meta.proxy_for_model is not None:
+        model = model._meta.proxy_for_model
+    return model
+
+def _model_tag(model):
+    """
+    Returns the cache tag of the values computed from the objects of model.
+    Proxies share the tag of their concrete model.
+    """
+    opts = _concrete_model(model)._meta
+    return 'model_last_modified.%s.%s' % (opts.app_label, opts.object_name.lower())
+
+def _watch_model(model):
+    """
+    Makes sure the values computed from the objects of model are invalidated
+    whenever an instance of it, of one of its proxies, of its parents or of
+    its children is saved or deleted.
+    """
+    from django.core.signals import request_finished
+    from django.db.models import signals
+
+    global _watched_models
+    model = _concrete_model(model)
+    if model in _watched_models:
+        return
+    with _watch_lock:
+        if model in _watched_models:
+            return
+        if not _watched_models:
+            # The sender of the signals is the class of the instance, which
+            # may be a proxy or a subclass of the watched models.
+            request_finished.connect(_invalidate_pending, weak=False,
+                                     dispatch_uid='model_last_modified')
+            signals.post_save.connect(_invalidate_model, weak=False,
+                                      dispatch_uid='model_last_modified')
+            signals.post_delete.connect(_invalidate_model, weak=False,
+                                        dispatch_uid='model_last_modified')
+        _watched_models = _watched_models | frozenset([model])
+
+def _unwatch_models():
+    """
+    Disconnects the receivers connected by _watch_model(), e.g. at the end of
+    a test.
+    """
+    from django.core.signals import request_finished
+    from django.db.models import signals
+
+    global _watched_models
+    with _watch_lock:
+        signals.post_save.disconnect(dispatch_uid='model_last_modified')
+        signals.post_delete.disconnect(dispatch_uid='model_last_modified')
+        request_finished.disconnect(dispatch_uid='model_last_modified')
+        _watched_models = frozenset()
+    _pending.tags = set()
+
+def _invalidate_model(sender, **kwargs):
+    from django.core.cache import cache
+    watched = _watched_models
+    model = _concrete_model(sender)
+    parents = model._meta.get_parent_list()
+    # Saving a child changes the tables of its parents, and saving a parent
+    # changes the rows its children are made of.
+    tags = [_model_tag(m) for m in watched
+            if m is model or m in parents or model in m._meta.get_parent_list()]
+    if not tags:
+        return
+    cache.invalidate_tags(tags)
+    # The change may not be committed yet.
+    if not hasattr(_pending, 'tags'):
+        _pending.tags = set()
+    _pending.tags.update(tags)
+
+def _invalidate_pending(**kwargs):
+    """
+    Invalidates the values invalidated during the request again, now that
+    its changes have been committed.
+    """
+    from django.core.cache import cache
+    tags = getattr(_pending, 'tags', None)
+    if tags:
+        _pending.tags = set()
+        cache.invalidate_tags(list(tags))
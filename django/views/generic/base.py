@@ -4,6 +4,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.template.response import TemplateResponse
 from django.utils.log import getLogger
 from django.utils.decorators import classonlymethod
+from django.views.decorators.http import condition, model_last_modified
 
 logger = getLogger('django.request')
 
@@ -80,6 +81,46 @@ class View(object):
         return self.get(*args, **kwargs)
 
 
+class ConditionalMixin(object):
+    """
+    A mixin that answers conditional requests before the view's handler is
+    called, using the ETag and last modification time of the requested
+    resource returned by get_etag() and get_last_modified(). See the
+    ``condition`` decorator in django.views.decorators.http.
+    """
+    last_modified_field = None
+    last_modified_timeout = None
+
+    def get_etag(self, request, *args, **kwargs):
+        """
+        Returns the ETag of the requested resource, or None.
+        """
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """
+        Returns the datetime of the last modification of the requested
+        resource, or None. By default, the latest value of the
+        ``last_modified_field`` field among the objects of get_queryset(), if
+        the field is set (see model_last_modified()).
+        """
+        if self.last_modified_field is None:
+            return None
+        func = model_last_modified(self.get_queryset(), self.last_modified_field,
+                                   self.last_modified_timeout)
+        return func(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        # get_etag() and get_last_modified() may need these.
+        self.request = request
+        self.args = args
+        self.kwargs = kwargs
+        handler = super(ConditionalMixin, self).dispatch
+        return condition(etag_func=self.get_etag,
+                         last_modified_func=self.get_last_modified)(handler)(
+                             request, *args, **kwargs)
+
+
 class TemplateResponseMixin(object):
     """
     A mixin that can be used to render a template.
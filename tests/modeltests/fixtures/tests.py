@@ -1,10 +1,29 @@
-import StringIO
+from __future__ import with_statement
 
+import bz2
+import datetime
+import gzip
+import os
+import shutil
+import StringIO
+import tempfile
+import time
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.sites.models import Site
-from django.core import management
+from django.core import management, serializers
+from django.core.management.commands import loaddata
+from django.core.management.commands.dumpdata import dump_model, iterate_in_chunks
+from django.db import connection, connections, DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler
 from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import simplejson, unittest
 
-from models import Article, Book, Spy, Tag, Visa
+from models import Article, Book, Category, Person, Spy, Tag, Visa
 
 
 class TestCaseFixtureLoadingTests(TestCase):
@@ -210,6 +229,210 @@ class FixtureLoadingTests(TestCase):
         # even those normally filtered by the manager
         self._dumpdata_assert(['fixtures.Spy'], '[{"pk": %d, "model": "fixtures.spy", "fields": {"cover_blown": true}}, {"pk": %d, "model": "fixtures.spy", "fields": {"cover_blown": false}}]' % (spy2.pk, spy1.pk), use_base_manager=True)
 
+    def test_bulk_loading(self):
+        fixtures = ['initial_data.json', 'fixture1.json', 'fixture2.json',
+                    'fixture3.xml', 'fixture6.json', 'fixture7.xml',
+                    'fixture8.json', 'fixture9.xml']
+        def load_and_dump(bulk):
+            for model in (Book, Visa, Tag, Article, Category, Person):
+                model.objects.all().delete()
+            for fixture in fixtures:
+                management.call_command('loaddata', fixture, verbosity=0,
+                                        commit=False, bulk=bulk)
+            new_io = StringIO.StringIO()
+            management.call_command('dumpdata', 'fixtures', stdout=new_io)
+            return new_io.getvalue()
+        # Existing objects are updated and many-to-many relations replaced
+        # like they are when saving the objects one at a time.
+        self.assertEqual(load_and_dump(bulk=True), load_and_dump(bulk=False))
+
+    def test_bulk_loading_batches(self):
+        old_batch_size = loaddata.BULK_BATCH_SIZE
+        loaddata.BULK_BATCH_SIZE = 2
+        try:
+            for fixture in ['fixture1.json', 'fixture6.json', 'fixture8.json',
+                            'fixture9.xml']:
+                management.call_command('loaddata', fixture, verbosity=0,
+                                        commit=False, bulk=True)
+        finally:
+            loaddata.BULK_BATCH_SIZE = old_batch_size
+        self.assertQuerysetEqual(Visa.objects.all(), [
+            '<Visa: Django Reinhardt Can add user, Can change user, Can delete user>',
+            '<Visa: Stephane Grappelli Can add user, Can delete user>',
+            '<Visa: Artist formerly known as "Prince" Can change user>'
+        ])
+        self.assertQuerysetEqual(Book.objects.all(), [
+            '<Book: Music for all ages by Artist formerly known as "Prince" and Django Reinhardt>'
+        ])
+
+    def test_dependency_levels(self):
+        self.assertEqual(
+            loaddata.dependency_levels([Visa, Person, Article, Tag, Book, Category]),
+            [[Article, Category, Person, Tag], [Book, Visa]])
+        self.assertEqual(loaddata.get_fixture_model('/tmp/fixtures.visa.json.gz'), Visa)
+        self.assertEqual(loaddata.get_fixture_model('fixture1.json'), None)
+
+    def test_parallel_in_memory_database(self):
+        if connection.settings_dict['NAME'] != ':memory:':
+            self.skipTest("Only in-memory SQLite databases can't be dumped in parallel.")
+        new_io = StringIO.StringIO()
+        self.assertRaises(SystemExit, management.call_command, 'dumpdata',
+            'fixtures', output=tempfile.gettempdir(), parallel=2, stderr=new_io)
+        self.assertTrue("in-memory SQLite database" in new_io.getvalue())
+
+    def test_dumpdata_to_output_file(self):
+        management.call_command('loaddata', 'fixture1.json', verbosity=0, commit=False)
+        new_io = StringIO.StringIO()
+        management.call_command('dumpdata', 'fixtures', stdout=new_io)
+        expected = new_io.getvalue()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for name, open_file in [('dump.json', open),
+                                    ('dump.json.gz', gzip.GzipFile),
+                                    ('dump.json.bz2', bz2.BZ2File)]:
+                filename = os.path.join(tmpdir, name)
+                management.call_command('dumpdata', 'fixtures', output=filename)
+                f = open_file(filename, 'rb')
+                try:
+                    self.assertEqual(f.read(), expected)
+                finally:
+                    f.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @unittest.skipIf(yaml is None, "PyYAML isn't installed")
+    def test_dumpdata_yaml(self):
+        management.call_command('loaddata', 'fixture1.json', verbosity=0, commit=False)
+        new_io = StringIO.StringIO()
+        management.call_command('dumpdata', 'fixtures', stdout=new_io)
+        count = len(simplejson.loads(new_io.getvalue()))
+        tmpdir = tempfile.mkdtemp()
+        try:
+            # Neither standard output nor the output file is a StringIO.
+            filename = os.path.join(tmpdir, 'stdout.yaml')
+            stdout = open(filename, 'w')
+            try:
+                management.call_command('dumpdata', 'fixtures', format='yaml',
+                                        stdout=stdout)
+            finally:
+                stdout.close()
+            output = os.path.join(tmpdir, 'dump.yaml')
+            management.call_command('dumpdata', 'fixtures', format='yaml',
+                                    output=output)
+            for name in (filename, output):
+                f = open(name)
+                try:
+                    self.assertEqual(len(list(serializers.deserialize('yaml', f))), count)
+                finally:
+                    f.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_iterate_in_chunks(self):
+        article = Article.objects.create(headline='Chunky',
+                                         pub_date=datetime.datetime(2011, 1, 1))
+        for i in range(6):
+            Tag.objects.create(name='tag%d' % i, tagged=article)
+        expected = list(Tag.objects.order_by('pk'))
+        # Six tags in chunks of two, and a last empty chunk.
+        with self.assertNumQueries(4):
+            self.assertEqual(list(iterate_in_chunks(Tag.objects.all(), 2)), expected)
+        # Ordered querysets are fetched in chunks too, keeping their order.
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                list(iterate_in_chunks(Tag.objects.order_by('-pk'), 2)),
+                expected[::-1])
+        # Ties in the ordering are broken by the primary key, across chunks.
+        Tag.objects.filter(pk__in=[t.pk for t in expected[1:4]]).update(name='same')
+        ordered = list(Tag.objects.order_by('-name', 'pk'))
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                list(iterate_in_chunks(Tag.objects.order_by('-name'), 2)),
+                ordered)
+        # The default ordering of the model is used.
+        for i in range(4):
+            Article.objects.create(headline='Chunk %d' % (i % 2),
+                                   pub_date=datetime.datetime(2011, 1, 1))
+        articles = list(Article.objects.order_by('-pub_date', 'headline', 'pk'))
+        with self.assertNumQueries(len(articles) // 2 + 1):
+            self.assertEqual(list(iterate_in_chunks(Article.objects.all(), 2)),
+                             articles)
+        # Orderings across relations fall back to primary key order.
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                list(iterate_in_chunks(Tag.objects.order_by('tagged_type'), 2)),
+                expected)
+
+    def test_fixture_dir_listings(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            # Listings of recently modified directories aren't cached.
+            old = time.time() - 60
+            os.utime(tmpdir, (old, old))
+            listing = loaddata.list_fixture_dir(tmpdir)
+            self.assertEqual(listing, set())
+            self.assertTrue(loaddata.list_fixture_dir(tmpdir) is listing)
+
+            label = os.path.join(tmpdir, 'extra')
+            new_io = StringIO.StringIO()
+            management.call_command('loaddata', label, commit=False, stdout=new_io)
+            self.assertEqual(new_io.getvalue(), 'No fixtures found.\n')
+
+            # Adding a fixture modifies the directory.
+            f = open(label + '.json', 'w')
+            try:
+                f.write('[{"pk": 1, "model": "fixtures.category", '
+                        '"fields": {"title": "Extra", "description": ""}}]')
+            finally:
+                f.close()
+            new_io = StringIO.StringIO()
+            management.call_command('loaddata', label, commit=False, stdout=new_io)
+            self.assertEqual(new_io.getvalue(), 'Installed 1 object(s) from 1 fixture(s)\n')
+            self.assertEqual(loaddata.list_fixture_dir(tmpdir), set(['extra.json']))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_fixture_name_case(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            f = open(os.path.join(tmpdir, 'Extra.json'), 'w')
+            try:
+                f.write('[{"pk": 1, "model": "fixtures.category", '
+                        '"fields": {"title": "Extra", "description": ""}}]')
+            finally:
+                f.close()
+            # The fixture is found in another case as long as the filesystem
+            # ignores case.
+            if os.path.exists(os.path.join(tmpdir, 'extra.json')):
+                expected = 'Installed 1 object(s) from 1 fixture(s)\n'
+            else:
+                expected = 'No fixtures found.\n'
+            new_io = StringIO.StringIO()
+            management.call_command('loaddata', os.path.join(tmpdir, 'extra'),
+                                    commit=False, stdout=new_io)
+            self.assertEqual(new_io.getvalue(), expected)
+            new_io = StringIO.StringIO()
+            management.call_command('loaddata', os.path.join(tmpdir, 'Extra'),
+                                    commit=False, stdout=new_io)
+            self.assertEqual(new_io.getvalue(), 'Installed 1 object(s) from 1 fixture(s)\n')
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_fixture_dir_non_ascii_names(self):
+        # Byte string names listed in a directory, here the current one, are
+        # compared with unicode labels.
+        tmpdir = tempfile.mkdtemp()
+        old_cwd = os.getcwd()
+        try:
+            open(os.path.join(tmpdir, 'caf\xc3\xa9.txt'), 'w').close()
+            os.chdir(tmpdir)
+            new_io = StringIO.StringIO()
+            management.call_command('loaddata', u'extra', commit=False, stdout=new_io)
+            self.assertEqual(new_io.getvalue(), 'No fixtures found.\n')
+        finally:
+            os.chdir(old_cwd)
+            shutil.rmtree(tmpdir)
+
     def test_compress_format_loading(self):
         # Load fixture 4 (compressed), using format specification
         management.call_command('loaddata', 'fixture4.json', verbosity=0, commit=False)
@@ -310,6 +533,83 @@ class FixtureTransactionTests(TransactionTestCase):
         command_output = new_io.getvalue().strip()
         self.assertEqual(command_output, output)
 
+    def test_parallel_dump_and_load(self):
+        # An in-memory database can't be shared by the worker processes, so
+        # the test runs on a database file of its own.
+        tmpdir = tempfile.mkdtemp()
+        test_connection = ConnectionHandler({DEFAULT_DB_ALIAS: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'TEST_NAME': os.path.join(tmpdir, 'test.db'),
+        }})[DEFAULT_DB_ALIAS]
+        old_connection = connections._connections.get(DEFAULT_DB_ALIAS)
+        connections._connections[DEFAULT_DB_ALIAS] = test_connection
+        ContentType.objects.clear_cache()
+        try:
+            test_connection.creation.create_test_db(0)
+            self._test_parallel_dump_and_load(os.path.join(tmpdir, 'fixtures'))
+        finally:
+            test_connection.close()
+            connections._connections[DEFAULT_DB_ALIAS] = old_connection
+            ContentType.objects.clear_cache()
+            shutil.rmtree(tmpdir)
+
+    def _test_parallel_dump_and_load(self, directory):
+        management.call_command('loaddata', 'fixture6.json', 'fixture8.json',
+                                verbosity=0)
+        new_io = StringIO.StringIO()
+        management.call_command('dumpdata', 'fixtures', 'auth.permission',
+                                stdout=new_io)
+        expected = new_io.getvalue()
+        management.call_command('dumpdata', 'fixtures', 'auth.permission',
+                                output=directory, parallel=2)
+        file_names = sorted(os.listdir(directory))
+        self.assertTrue('fixtures.visa.json' in file_names)
+        for model in (Visa, Tag, Person, Article):
+            model.objects.all().delete()
+        # Permissions can be updated in parallel with the people, visas
+        # wait for both.
+        management.call_command('loaddata', verbosity=0, parallel=2,
+            *[os.path.join(directory, name) for name in file_names])
+        new_io = StringIO.StringIO()
+        management.call_command('dumpdata', 'fixtures', 'auth.permission',
+                                stdout=new_io)
+        self.assertEqual(new_io.getvalue(), expected)
+
+    @skipUnlessDBFeature('can_share_snapshots')
+    def test_dump_model_snapshot(self):
+        Article.objects.create(headline='Before the snapshot',
+                               pub_date=datetime.datetime(2011, 1, 1))
+        # The snapshot is exported by another connection, whose transaction
+        # must stay open while it's imported.
+        exporter = ConnectionHandler({
+            DEFAULT_DB_ALIAS: dict(connection.settings_dict),
+        })[DEFAULT_DB_ALIAS]
+        exporter.enter_transaction_management()
+        exporter.managed(True)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            cursor = exporter.cursor()
+            cursor.execute(exporter.ops.export_snapshot_sql())
+            snapshot = cursor.fetchone()[0]
+            Article.objects.create(headline='After the snapshot',
+                                   pub_date=datetime.datetime(2011, 1, 2))
+            path = os.path.join(tmpdir, 'fixtures.article.json')
+            self.assertEqual(dump_model({
+                'model': 'fixtures.Article', 'path': path,
+                'using': DEFAULT_DB_ALIAS, 'snapshot': snapshot,
+                'format': 'json', 'indent': None,
+                'use_natural_keys': False, 'use_base_manager': False,
+            }), None)
+            content = open(path).read()
+        finally:
+            exporter.rollback()
+            exporter.leave_transaction_management()
+            exporter.close()
+            shutil.rmtree(tmpdir)
+        # The worker only sees the data of the snapshot.
+        self.assertTrue('Before the snapshot' in content)
+        self.assertFalse('After the snapshot' in content)
+
     @skipUnlessDBFeature('supports_forward_references')
     def test_format_discovery(self):
         # Load fixture 1 again, using format discovery
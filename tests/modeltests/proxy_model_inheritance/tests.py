@@ -6,12 +6,13 @@ for the proxied model (as described in #12286).  This test creates two dummy
 apps and calls syncdb, then verifies that the table has been created.
 """
 
+import copy
 import os
 import sys
 
 from django.conf import settings
 from django.core.management import call_command
-from django.db.models.loading import load_app
+from django.db.models.loading import cache, load_app
 from django.test import TransactionTestCase
 from django.test.utils import override_settings
 
@@ -21,10 +22,17 @@ class ProxyModelInheritanceTests(TransactionTestCase):
     def setUp(self):
         self.old_sys_path = sys.path[:]
         sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        # The dummy apps are removed from the app cache afterwards, since
+        # they aren't installed in the other tests.
+        self.old_app_models = copy.deepcopy(cache.app_models)
+        self.old_app_store = copy.deepcopy(cache.app_store)
         map(load_app, settings.INSTALLED_APPS)
 
     def tearDown(self):
         sys.path = self.old_sys_path
+        cache.app_models = self.old_app_models
+        cache.app_store = self.old_app_store
+        cache._get_models_cache.clear()
 
     def test_table_exists(self):
         call_command('syncdb', verbosity=0)
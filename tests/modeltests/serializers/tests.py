@@ -9,6 +9,8 @@ from xml.dom import minidom
 
 from django.conf import settings
 from django.core import serializers
+from django.core.serializers import binary
+from django.core.serializers.json import DjangoJSONEncoder, iterload
 from django.db import transaction, connection
 from django.test import TestCase, TransactionTestCase, Approximate
 from django.utils import simplejson, unittest
@@ -131,6 +133,25 @@ class SerializersTestBase(object):
         self.assertTrue(Article.objects.filter(headline=new_headline))
         self.assertFalse(Article.objects.filter(headline=old_headline))
 
+    def test_serialize_values(self):
+        """Tests that the rows of a values() queryset can be serialized"""
+        fields = ('headline', 'pub_date', 'author')
+        serial_str = serializers.serialize(self.serializer_name,
+                                           Article.objects.all(), fields=fields)
+        with self.assertNumQueries(1):
+            values_str = serializers.serialize(self.serializer_name,
+                                               Article.objects.values())
+        self.assertEqual(values_str, serial_str)
+        values_str = serializers.serialize(self.serializer_name,
+                                           Article.objects.values('id', *fields))
+        self.assertEqual(values_str, serial_str)
+
+    def test_foreign_keys_without_queries(self):
+        """Tests that related objects aren't fetched to serialize their keys"""
+        with self.assertNumQueries(1):
+            serializers.serialize(self.serializer_name, Article.objects.all(),
+                                  fields=('headline', 'author'))
+
     def test_one_to_one_as_pk(self):
         """
         Tests that if you use your own primary key field
@@ -365,6 +386,18 @@ class JsonSerializerTestCase(SerializersTestBase, TestCase):
                 ret_list.append(obj_dict["fields"][field_name])
         return ret_list
 
+    def test_streamed_output(self):
+        # The objects are encoded one at a time, but the output is the same
+        # as when dumping the whole list at once.
+        objects = list(Category.objects.all()) + list(Article.objects.all())
+        data = serializers.serialize('python', objects)
+        for indent in (None, 2):
+            self.assertEqual(
+                serializers.serialize('json', objects, indent=indent),
+                simplejson.dumps(data, indent=indent, cls=DjangoJSONEncoder))
+        self.assertEqual(serializers.serialize('json', []), '[]')
+        self.assertEqual(serializers.serialize('json', [], indent=2), '[]')
+
 class JsonSerializerTransactionTestCase(SerializersTransactionTestBase, TransactionTestCase):
     serializer_name = "json"
     fwd_ref_str = """[
@@ -393,6 +426,104 @@ class JsonSerializerTransactionTestCase(SerializersTransactionTestBase, Transact
         }
     }]"""
 
+class JsonIterloadTests(unittest.TestCase):
+    def iterload(self, data, chunk_size):
+        return list(iterload(StringIO(data), chunk_size))
+
+    def test_chunk_boundaries(self):
+        items = [{"pk": i, "fields": {"name": u"\xe9" * i}} for i in range(20)]
+        items.append(12345)
+        data = simplejson.dumps(items, indent=1)
+        for chunk_size in (1, 2, 3, 7, 64, 4096):
+            self.assertEqual(self.iterload(data, chunk_size), items)
+
+    def test_lazy(self):
+        stream = StringIO('[1, 2, ' + '3, ' * 100000 + '4]')
+        items = iterload(stream, 16)
+        self.assertEqual(items.next(), 1)
+        self.assertTrue(stream.tell() < 100)
+
+    def test_empty_list(self):
+        self.assertEqual(self.iterload(' [ ] ', 1), [])
+
+    def test_not_a_list(self):
+        self.assertEqual(self.iterload('{"a": 1}', 2), ["a"])
+        self.assertRaises(ValueError, self.iterload, '', 2)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.iterload, '[1, 2', 2)
+        self.assertRaises(ValueError, self.iterload, '[1 2]', 2)
+        self.assertRaises(ValueError, self.iterload, '[{"a": 1]', 2)
+
+def binary_str(objects):
+    stream = StringIO()
+    writer = binary.Writer(stream)
+    for obj in objects:
+        writer.write(obj)
+    return stream.getvalue()
+
+class BinarySerializerTestCase(SerializersTestBase, TestCase):
+    serializer_name = "binary"
+    pkless_str = binary_str([
+        {"pk": None, "model": "serializers.category", "fields": {"name": "Reference"}}])
+
+    @staticmethod
+    def _validate_output(serial_str):
+        try:
+            list(binary.read_objects(StringIO(serial_str)))
+        except Exception:
+            return False
+        else:
+            return True
+
+    @staticmethod
+    def _get_pk_values(serial_str):
+        return [obj_dict["pk"] for obj_dict in binary.read_objects(StringIO(serial_str))]
+
+    @staticmethod
+    def _get_field_values(serial_str, field_name):
+        ret_list = []
+        for obj_dict in binary.read_objects(StringIO(serial_str)):
+            if field_name in obj_dict["fields"]:
+                ret_list.append(obj_dict["fields"][field_name])
+        return ret_list
+
+    def test_altering_serialized_output(self):
+        # The records are prefixed by their length, so the data can't be
+        # edited in place.
+        serial_str = serializers.serialize(self.serializer_name,
+                                           Article.objects.all())
+        objects = list(binary.read_objects(StringIO(serial_str)))
+        for obj in objects:
+            obj["fields"]["headline"] = obj["fields"]["headline"].replace("ESPN", "television")
+        for obj in serializers.deserialize(self.serializer_name, binary_str(objects)):
+            obj.save()
+        self.assertTrue(Article.objects.filter(headline="Poker has no place on television"))
+        self.assertFalse(Article.objects.filter(headline="Poker has no place on ESPN"))
+
+    def test_header_written_once(self):
+        serial_str = serializers.serialize(self.serializer_name,
+                                           Article.objects.all())
+        self.assertEqual(serial_str.count("headline"), 1)
+
+    def test_invalid(self):
+        serial_str = serializers.serialize(self.serializer_name,
+                                           Article.objects.all())
+        for data in ("", "DJBIN0\n", serial_str[:-1], serial_str[:-20] + "\xff" * 20):
+            self.assertRaises(serializers.base.DeserializationError, list,
+                              serializers.deserialize(self.serializer_name, data))
+
+class BinarySerializerTransactionTestCase(SerializersTransactionTestBase, TransactionTestCase):
+    serializer_name = "binary"
+    fwd_ref_str = binary_str([
+        {"pk": 1, "model": "serializers.article", "fields": {
+            "headline": "Forward references pose no problem",
+            "pub_date": "2006-06-16 15:00:00",
+            "categories": [1],
+            "author": 1}},
+        {"pk": 1, "model": "serializers.category", "fields": {"name": "Reference"}},
+        {"pk": 1, "model": "serializers.author", "fields": {"name": "Agnes"}}])
+
 try:
     import yaml
 except ImportError:
@@ -14,6 +14,9 @@ from django.utils import unittest
 
 
 class AdminScriptTestCase(unittest.TestCase):
+    # The tests write the same settings files.
+    run_serially = True
+
     def write_settings(self, filename, apps=None, is_dir=False, sdict=None):
         test_dir = os.path.dirname(os.path.dirname(__file__))
         if is_dir:
@@ -8,15 +8,20 @@ import hashlib
 import os
 import re
 import tempfile
+from StringIO import StringIO
 import time
 import warnings
 
 from django.conf import settings
-from django.core import management
+from django.core import management, signals
 from django.core.cache import get_cache, DEFAULT_CACHE_ALIAS
 from django.core.cache.backends.base import (CacheKeyWarning,
     InvalidCacheBackendError)
-from django.http import HttpResponse, HttpRequest, QueryDict
+from django.core.cache.backends.memcached import BaseMemcachedCache, HashRing
+from django.core.cache.instrumentation import (InstrumentedCache, get_stats,
+    reset_stats, _Recorder)
+from django.core.cache.signals import cache_operation
+from django.http import HttpResponse, HttpRequest, QueryDict, StreamingHttpResponse
 from django.middleware.cache import (FetchFromCacheMiddleware,
     UpdateCacheMiddleware, CacheMiddleware)
 from django.template import Template
@@ -169,6 +174,12 @@ class DummyCacheTests(unittest.TestCase):
         self.assertRaises(ValueError, self.cache.decr_version, 'answer')
         self.assertRaises(ValueError, self.cache.decr_version, 'does_not_exist')
 
+    def test_tags(self):
+        "Dummy cache doesn't store tagged values"
+        self.cache.set_tagged('fragment', 'value', ['product:42'])
+        self.assertEqual(self.cache.get_tagged('fragment'), None)
+        self.cache.invalidate_tags(['product:42'])
+
 
 class BaseCacheTests(object):
     # A common set of tests to apply to all cache backends
@@ -466,6 +477,55 @@ class BaseCacheTests(object):
             restore_warnings_state(_warnings_state)
             self.cache.key_func = old_func
 
+    def test_tags(self):
+        self.cache.set_tagged('fragment1', 'value1', ['product:42', 'shop'])
+        self.cache.set_tagged('fragment2', 'value2', ['product:43', 'shop'])
+        self.cache.set_tagged('fragment3', 'value3', [])
+        self.assertEqual(self.cache.get_tagged('fragment1'), 'value1')
+        self.assertEqual(self.cache.get_tagged('fragment2'), 'value2')
+        self.assertEqual(self.cache.get_tagged('fragment3'), 'value3')
+        self.assertEqual(self.cache.get_tagged('missing', 'default'), 'default')
+
+        self.cache.invalidate_tags(['product:42'])
+        self.assertEqual(self.cache.get_tagged('fragment1'), None)
+        self.assertEqual(self.cache.get_tagged('fragment1', 'default'), 'default')
+        self.assertEqual(self.cache.get_tagged('fragment2'), 'value2')
+
+        # New values pick up the current tag version.
+        self.cache.set_tagged('fragment1', 'new value', ['product:42', 'shop'])
+        self.assertEqual(self.cache.get_tagged('fragment1'), 'new value')
+
+        self.cache.invalidate_tags(['shop'])
+        self.assertEqual(self.cache.get_tagged('fragment1'), None)
+        self.assertEqual(self.cache.get_tagged('fragment2'), None)
+        self.assertEqual(self.cache.get_tagged('fragment3'), 'value3')
+
+    def test_tags_evicted(self):
+        "Values whose tag version has gone missing are treated as invalid"
+        self.cache.set_tagged('fragment', 'value', ['product:42'])
+        self.cache.delete('django.cache.tag:product:42')
+        self.assertEqual(self.cache.get_tagged('fragment'), None)
+
+    def test_tags_evicted_during_set(self):
+        "A tag version evicted as soon as another client set it up is replaced"
+        for evictions in (1, 5):
+            cache_add = self.cache.add
+            calls = []
+            def add(key, value, timeout=None, version=None):
+                if key.startswith('django.cache.tag:') and len(calls) < evictions:
+                    # Another client sets the tag version up, which is
+                    # evicted before it can be read.
+                    calls.append(key)
+                    return False
+                return cache_add(key, value, timeout, version)
+            self.cache.add = add
+            try:
+                self.cache.set_tagged('fragment', 'value', ['product:42'])
+            finally:
+                del self.cache.add
+            self.assertEqual(self.cache.get_tagged('fragment'), 'value')
+            self.cache.delete('django.cache.tag:product:42')
+
     def test_cache_versioning_get_set(self):
         # set, using default version = 1
         self.cache.set('answer1', 42)
@@ -853,6 +913,34 @@ class MemcachedCacheTests(unittest.TestCase, BaseCacheTests):
 
 MemcachedCacheTests = unittest.skipUnless(settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'].startswith('django.core.cache.backends.memcached.'), "memcached not available")(MemcachedCacheTests)
 
+class HashRingTests(unittest.TestCase):
+    def test_distribution(self):
+        servers = ['10.0.0.%d:11211' % i for i in range(4)]
+        ring = HashRing(servers)
+        nodes = [ring.get_node('key%d' % i) for i in range(4000)]
+        for index in range(len(servers)):
+            self.assertTrue(600 < nodes.count(index) < 1400)
+
+    def test_adding_server_keeps_most_keys(self):
+        servers = ['10.0.0.%d:11211' % i for i in range(4)]
+        ring = HashRing(servers)
+        bigger_ring = HashRing(servers + ['10.0.0.4:11211'])
+        keys = ['key%d' % i for i in range(4000)]
+        moved = [k for k in keys if ring.get_node(k) != bigger_ring.get_node(k)]
+        # Only keys taken over by the new server change hands.
+        self.assertTrue(len(moved) < 1400)
+        for k in moved:
+            self.assertEqual(bigger_ring.get_node(k), 4)
+
+    def test_server_key(self):
+        cache = BaseMemcachedCache(['a:11211', 'b:11211'],
+            {'OPTIONS': {'CONSISTENT_HASHING': True}}, None, ValueError)
+        node, key = cache._server_key('foo')
+        self.assertEqual(key, 'foo')
+        self.assertEqual(node, cache._ring.get_node('foo'))
+        cache = BaseMemcachedCache(['a:11211', 'b:11211'], {}, None, ValueError)
+        self.assertEqual(cache._server_key('foo'), 'foo')
+
 class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
     """
     Specific test cases for the file-based cache.
@@ -900,6 +988,250 @@ class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
         self.cache = get_cache('file://%s?max_entries=30' % self.dirname)
         self.perform_cull_test(50, 29)
 
+    def test_entry_index(self):
+        """The entry count is tracked without walking the cache directory"""
+        self.cache.set('foo', 'bar')
+        self.cache.set('baz', 'qux')
+        self.assertEqual(self.cache._num_entries, 2)
+        old_walk = os.walk
+        os.walk = None
+        try:
+            self.cache.set('foo', 'overwritten')
+            self.cache.set('spam', 'eggs')
+            self.cache.delete('baz')
+            self.assertEqual(self.cache._num_entries, 2)
+        finally:
+            os.walk = old_walk
+        # Instances sharing a directory share the index.
+        self.assertEqual(self.prefix_cache._num_entries, 2)
+        self.cache.clear()
+        self.assertEqual(self.cache._num_entries, 0)
+
+    def test_atomic_write(self):
+        """Entries are written to a temporary file and renamed into place"""
+        self.cache.set('foo', 'bar')
+        keypath = self.cache._key_to_file(self.cache.make_key('foo'))
+        self.assertEqual(os.listdir(os.path.dirname(keypath)),
+                         [os.path.basename(keypath)])
+
+    def test_file_permissions(self):
+        """Entries are created with the permissions allowed by the umask"""
+        old_umask = os.umask(022)
+        try:
+            self.cache.set('foo', 'bar')
+        finally:
+            os.umask(old_umask)
+        keypath = self.cache._key_to_file(self.cache.make_key('foo'))
+        self.assertEqual(os.stat(keypath).st_mode & 0777, 0644)
+
+    def test_expiry_header(self):
+        """Expired entries are rejected without unpickling the value"""
+        self.cache.set('foo', 'bar', 1)
+        keypath = self.cache._key_to_file(self.cache.make_key('foo'))
+        f = open(keypath, 'r+b')
+        try:
+            # Corrupt the pickled value; it must never be read.
+            f.seek(8)
+            f.write('garbage')
+        finally:
+            f.close()
+        time.sleep(2)
+        self.assertEqual(self.cache.get('foo'), None)
+        self.assertFalse(os.path.exists(keypath))
+
+    def test_large_value(self):
+        """Values larger than mmap_threshold are read back correctly"""
+        value = 'x' * (self.cache.mmap_threshold + 1)
+        self.cache.set('large', value)
+        self.assertEqual(self.cache.get('large'), value)
+
+class InstrumentedCacheTests(FileBasedCacheTests):
+    """
+    The instrumentation wrapper must behave exactly like the backend it wraps.
+    """
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.cache = get_cache(self.backend_name, LOCATION=self.dirname, OPTIONS={'MAX_ENTRIES': 30}, INSTRUMENTATION=True)
+        self.prefix_cache = get_cache(self.backend_name, LOCATION=self.dirname, KEY_PREFIX='cacheprefix', INSTRUMENTATION=True)
+        self.v2_cache = get_cache(self.backend_name, LOCATION=self.dirname, VERSION=2, INSTRUMENTATION=True)
+        self.custom_key_cache = get_cache(self.backend_name, LOCATION=self.dirname, KEY_FUNCTION=custom_key_func, INSTRUMENTATION=True)
+        self.custom_key_cache2 = get_cache(self.backend_name, LOCATION=self.dirname, KEY_FUNCTION='regressiontests.cache.tests.custom_key_func', INSTRUMENTATION=True)
+
+    def tearDown(self):
+        self.cache.clear()
+        reset_stats()
+
+    def test_instrumented(self):
+        self.assertTrue(isinstance(self.cache, InstrumentedCache))
+        self.assertEqual(self.cache.alias, self.backend_name)
+
+    def test_stats(self):
+        self.cache = get_cache(self.backend_name, LOCATION=self.dirname,
+                               INSTRUMENTATION=True, INSTRUMENTATION_SIZES=True)
+        reset_stats()
+        self.cache.set('product:1', 'abc')
+        self.cache.set('product:2', 'defg')
+        self.cache.set('other', 'x')
+        self.assertEqual(self.cache.get('product:1'), 'abc')
+        self.assertEqual(self.cache.get('product:3', 'default'), 'default')
+        self.assertEqual(self.cache.get_many(['product:2', 'missing']), {'product:2': 'defg'})
+        self.cache.delete('other')
+
+        stats = get_stats(self.backend_name)
+        self.assertEqual(stats.hits, 2)
+        self.assertEqual(stats.misses, 2)
+        self.assertEqual(stats.sets, 3)
+        self.assertEqual(stats.deletes, 1)
+        self.assertEqual(stats.bytes_written, 8)
+        self.assertEqual(stats.bytes_read, 7)
+        self.assertEqual(stats.hit_rate, 0.5)
+        self.assertEqual(sum(stats.latency), 7)
+
+        product = stats.prefixes['product']
+        self.assertEqual((product.hits, product.misses, product.sets), (2, 1, 2))
+        self.assertEqual(sum(product.latency), 5)
+        other = stats.prefixes['']
+        self.assertEqual((other.misses, other.sets, other.deletes), (1, 1, 1))
+
+        self.assertTrue(get_stats()[self.backend_name] is stats)
+
+    def test_sizes_not_measured(self):
+        reset_stats()
+        self.cache.set('key', {'value': 1})
+        self.cache.get('key')
+        stats = get_stats(self.backend_name)
+        self.assertEqual((stats.hits, stats.sets), (1, 1))
+        self.assertEqual((stats.bytes_read, stats.bytes_written), (0, 0))
+
+    def test_signal(self):
+        received = []
+        def receiver(sender, **kwargs):
+            received.append(kwargs)
+        cache_operation.connect(receiver)
+        try:
+            self.cache.set('key', 'value')
+            self.cache.get('key')
+            self.cache.get_many(['key', 'missing'])
+        finally:
+            cache_operation.disconnect(receiver)
+        self.assertEqual([r['operation'] for r in received], ['set', 'get', 'get_many'])
+        self.assertEqual(received[1]['keys'], ['key'])
+        self.assertEqual((received[1]['hits'], received[1]['misses']), (1, 0))
+        self.assertEqual((received[2]['hits'], received[2]['misses']), (1, 1))
+        self.assertEqual(received[2]['alias'], self.backend_name)
+        self.assertTrue(received[0]['duration'] >= 0)
+
+    def test_shared_stats(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.flush_stats()
+        # The stats flushed to the cache are visible to every process using
+        # it, even one that hasn't collected any stats itself.
+        other = get_cache(self.backend_name, LOCATION=self.dirname, INSTRUMENTATION=True)
+        other._recorder = _Recorder()
+        shared = other.get_shared_stats()
+        self.assertEqual((shared.hits, shared.sets), (1, 1))
+        other.reset_shared_stats()
+        self.assertEqual(other.get_shared_stats().hits, 0)
+
+    def test_cachestats_command(self):
+        self.cache.set('product:1', 'value')
+        self.cache.get('product:1')
+        self.cache.get('product:2')
+        self.cache.flush_stats()
+        out = StringIO()
+        with override_settings(CACHES={'stats': {
+                'BACKEND': self.backend_name,
+                'LOCATION': self.dirname,
+                'INSTRUMENTATION': True}}):
+            management.call_command('cachestats', prefixes=True, stdout=out)
+        output = out.getvalue()
+        self.assertTrue('stats:' in output)
+        self.assertTrue('hits: 1, misses: 1 (hit rate: 50.0%)' in output)
+        self.assertTrue("prefix 'product':" in output)
+
+    def test_cachestats_command_errors(self):
+        with override_settings(CACHES={'default': {'BACKEND': self.backend_name,
+                                                   'LOCATION': self.dirname}}):
+            for args, message in (
+                    ((), "No cache has INSTRUMENTATION enabled."),
+                    (('default',), "Cache 'default' doesn't have INSTRUMENTATION enabled."),
+                    (('missing',), "Unknown cache alias 'missing'.")):
+                err = StringIO()
+                self.assertRaises(SystemExit, management.call_command, 'cachestats', *args, stderr=err)
+                self.assertTrue(message in err.getvalue())
+
+
+class RequestMemoCacheTests(unittest.TestCase):
+    backend_name = 'django.core.cache.backends.locmem.LocMemCache'
+
+    def setUp(self):
+        self.cache = get_cache(self.backend_name, LOCATION='memo', REQUEST_MEMO=True)
+        self.backend = self.cache._wrapped
+        signals.request_started.send(sender=self.__class__)
+
+    def tearDown(self):
+        signals.request_finished.send(sender=self.__class__)
+        self.cache.clear()
+
+    def test_memoized_get(self):
+        self.backend.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        # Later reads in the same request don't reach the backend.
+        self.backend.set('key', 'changed')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_many(['key']), {'key': 'value'})
+        self.assertTrue(self.cache.has_key('key'))
+        # A new request sees the new value.
+        signals.request_finished.send(sender=self.__class__)
+        signals.request_started.send(sender=self.__class__)
+        self.assertEqual(self.cache.get('key'), 'changed')
+
+    def test_memoized_miss(self):
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+        self.backend.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertEqual(self.cache.get_many(['key']), {})
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_writes_update_memo(self):
+        self.assertEqual(self.cache.get('key'), None)
+        self.cache.set('key', 'value')
+        self.assertEqual(self.backend.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache.delete('key')
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertTrue(self.cache.add('key', 'added'))
+        self.assertEqual(self.cache.get('key'), 'added')
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        self.assertEqual(self.cache.incr('a'), 2)
+        self.assertEqual(self.cache.get('a'), 2)
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+        self.cache.set('c', 3)
+        self.cache.clear()
+        self.assertEqual(self.cache.get('c'), None)
+
+    def test_failed_add(self):
+        self.backend.set('key', 'value')
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_versions(self):
+        self.cache.set('key', 'v1')
+        self.cache.set('key', 'v2', version=2)
+        self.assertEqual(self.cache.get('key'), 'v1')
+        self.assertEqual(self.cache.get('key', version=2), 'v2')
+
+    def test_outside_request(self):
+        signals.request_finished.send(sender=self.__class__)
+        self.cache.set('key', 'value')
+        self.backend.set('key', 'changed')
+        self.assertEqual(self.cache.get('key'), 'changed')
+        self.assertEqual(self.cache.get_many(['key']), {'key': 'changed'})
+
+
 class CustomCacheKeyValidationTests(unittest.TestCase):
     """
     Tests for the ability to mixin a custom ``validate_key`` method to
@@ -944,6 +1276,8 @@ class CacheUtils(unittest.TestCase):
         settings.CACHE_MIDDLEWARE_KEY_PREFIX = 'settingsprefix'
         settings.CACHE_MIDDLEWARE_SECONDS = 1
         settings.USE_I18N = False
+        # Don't depend on the entries left by the tests run before.
+        get_cache(DEFAULT_CACHE_ALIAS).clear()
 
     def tearDown(self):
         settings.CACHE_MIDDLEWARE_KEY_PREFIX = self.old_cache_middleware_key_prefix
@@ -1125,6 +1459,8 @@ class CacheI18nTest(unittest.TestCase):
         )
         settings.CACHE_MIDDLEWARE_KEY_PREFIX = 'settingsprefix'
         self.path = '/cache/test/'
+        # Don't depend on the entries left by the tests run before.
+        get_cache(DEFAULT_CACHE_ALIAS).clear()
 
     def tearDown(self):
         settings.CACHE_MIDDLEWARE_SECONDS = self.orig_cache_middleware_seconds
@@ -1242,6 +1578,20 @@ class CacheI18nTest(unittest.TestCase):
         get_cache_data = FetchFromCacheMiddleware().process_request(request)
         self.assertEqual(get_cache_data.content, es_message)
 
+    def test_middleware_doesnt_cache_streaming_response(self):
+        settings.CACHE_MIDDLEWARE_SECONDS = 60
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            }
+        }
+        request = self._get_request_cache()
+        response = StreamingHttpResponse(iter(['Check for cache with streaming content']))
+        UpdateCacheMiddleware().process_response(request, response)
+        get_cache_data = FetchFromCacheMiddleware().process_request(request)
+        self.assertEqual(get_cache_data, None)
+        self.assertEqual(list(response), ['Check for cache with streaming content'])
+
 class PrefixedCacheI18nTest(CacheI18nTest):
     def setUp(self):
         super(PrefixedCacheI18nTest, self).setUp()
@@ -1250,7 +1600,7 @@ class PrefixedCacheI18nTest(CacheI18nTest):
 
     def tearDown(self):
         super(PrefixedCacheI18nTest, self).tearDown()
-        if self.old_cache_key_prefix is not None:
+        if self.old_cache_key_prefix is None:
             del settings.CACHES['default']['KEY_PREFIX']
         else:
             settings.CACHES['default']['KEY_PREFIX'] = self.old_cache_key_prefix
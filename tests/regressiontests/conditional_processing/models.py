@@ -1,9 +1,16 @@
 # -*- coding:utf-8 -*-
+from __future__ import with_statement
+
 from datetime import datetime
 
+from django.core import signals as core_signals
+from django.core.cache import cache
+from django.db import models
+from django.db.models import signals
 from django.test import TestCase
 from django.utils import unittest
 from django.utils.http import parse_etags, quote_etag, parse_http_date
+from django.views.decorators import http
 
 FULL_RESPONSE = 'Test conditional get response'
 LAST_MODIFIED = datetime(2007, 10, 21, 23, 21, 47)
@@ -15,6 +22,24 @@ ETAG = 'b4246ffc4f62314ca13147c9d4f76974'
 EXPIRED_ETAG = '7fae4cd4b0f81e7d2914700043aa8ed6'
 
 
+class Entry(models.Model):
+    title = models.CharField(max_length=100)
+    updated_at = models.DateTimeField()
+
+
+class EntryProxy(Entry):
+    class Meta:
+        proxy = True
+
+
+class Article(models.Model):
+    updated_at = models.DateTimeField()
+
+
+class Review(Article):
+    rating = models.IntegerField(default=0)
+
+
 class ConditionalGet(TestCase):
     urls = 'regressiontests.conditional_processing.urls'
 
@@ -129,6 +154,113 @@ class ConditionalGet(TestCase):
         self.assertFullResponse(response, check_last_modified=False)
 
 
+class ModelConditionalGet(TestCase):
+    urls = 'regressiontests.conditional_processing.urls'
+
+    def setUp(self):
+        # Values cached by earlier tests were computed from rolled back data.
+        cache.clear()
+        Entry.objects.create(title='old', updated_at=datetime(2007, 1, 1))
+        Entry.objects.create(title='new', updated_at=LAST_MODIFIED)
+
+    def tearDown(self):
+        # The receivers invalidating the cached values mustn't outlive the
+        # tests, which count the receivers of post_save.
+        http._unwatch_models()
+
+    def assertConditionalGet(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], LAST_MODIFIED_STR)
+
+        # The latest modification time is cached.
+        self.client.defaults['HTTP_IF_MODIFIED_SINCE'] = LAST_MODIFIED_STR
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 304)
+
+        # Saving an entry invalidates it.
+        Entry.objects.create(title='newer', updated_at=datetime(2010, 10, 18, 16, 56, 23))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], LAST_MODIFIED_NEWER_STR)
+
+        Entry.objects.filter(title='newer').delete()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 304)
+
+    def testModelLastModified(self):
+        self.assertConditionalGet('/condition/model/')
+
+    def testConditionalMixin(self):
+        self.assertConditionalGet('/condition/class/')
+
+    def testConditionalMixinETag(self):
+        self.client.defaults['HTTP_IF_NONE_MATCH'] = '"%s"' % ETAG
+        response = self.client.get('/condition/class_etag/')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"%s"' % ETAG)
+
+    def testReceiversDisconnected(self):
+        receivers = (len(signals.post_save.receivers), len(signals.post_delete.receivers),
+                     len(core_signals.request_finished.receivers))
+        self.client.get('/condition/model/')
+        self.assertTrue(Entry in http._watched_models)
+        http._unwatch_models()
+        self.assertEqual(http._watched_models, frozenset())
+        self.assertEqual((len(signals.post_save.receivers), len(signals.post_delete.receivers),
+                          len(core_signals.request_finished.receivers)),
+                         receivers)
+
+    def testInvalidatedAfterRequest(self):
+        self.assertEqual(http._latest_value(Entry, 'updated_at'), LAST_MODIFIED)
+        newer = Entry.objects.create(title='newer', updated_at=datetime(2010, 10, 18))
+        # A concurrent request caches the value before the change is
+        # committed, which update() stands for.
+        Entry.objects.filter(pk=newer.pk).update(updated_at=LAST_MODIFIED)
+        self.assertEqual(http._latest_value(Entry, 'updated_at'), LAST_MODIFIED)
+        Entry.objects.filter(pk=newer.pk).update(updated_at=datetime(2010, 10, 18))
+        # The value is invalidated again once the request has finished.
+        core_signals.request_finished.send(sender=self.__class__)
+        self.assertEqual(http._latest_value(Entry, 'updated_at'),
+                         datetime(2010, 10, 18))
+
+    def testProxyModel(self):
+        self.assertEqual(http._latest_value(EntryProxy, 'updated_at'), LAST_MODIFIED)
+        self.assertEqual(http._latest_value(Entry, 'updated_at'), LAST_MODIFIED)
+        self.assertEqual(http._watched_models, frozenset([Entry]))
+        # Saving the concrete model invalidates the values of its proxies.
+        newer = Entry.objects.create(title='newer', updated_at=datetime(2010, 10, 18))
+        self.assertEqual(http._latest_value(EntryProxy, 'updated_at'),
+                         datetime(2010, 10, 18))
+        # And saving a proxy invalidates the values of the concrete model.
+        EntryProxy.objects.get(pk=newer.pk).delete()
+        self.assertEqual(http._latest_value(Entry, 'updated_at'), LAST_MODIFIED)
+
+    def testInheritedModel(self):
+        Article.objects.create(updated_at=LAST_MODIFIED)
+        self.assertEqual(http._latest_value(Article, 'updated_at'), LAST_MODIFIED)
+        # Saving a child changes the table of its parent.
+        review = Review.objects.create(updated_at=datetime(2010, 10, 18))
+        self.assertEqual(http._latest_value(Article, 'updated_at'),
+                         datetime(2010, 10, 18))
+        self.assertEqual(http._latest_value(Review, 'updated_at'),
+                         datetime(2010, 10, 18))
+        # Saving the parent part of a child changes the child.
+        article = Article.objects.get(pk=review.pk)
+        article.updated_at = datetime(2011, 1, 1)
+        article.save()
+        self.assertEqual(http._latest_value(Review, 'updated_at'), datetime(2011, 1, 1))
+        review.delete()
+        self.assertEqual(http._latest_value(Article, 'updated_at'), LAST_MODIFIED)
+
+    def testEmptyQuerySet(self):
+        Entry.objects.all().delete()
+        response = self.client.get('/condition/model/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+
 class ETagProcessing(unittest.TestCase):
     def testParsing(self):
         etags = parse_etags(r'"", "etag", "e\"t\"ag", "e\\tag", W/"weak"')
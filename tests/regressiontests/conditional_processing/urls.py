@@ -7,4 +7,7 @@ urlpatterns = patterns('',
     ('^condition/last_modified2/$', views.last_modified_view2),
     ('^condition/etag/$', views.etag_view1),
     ('^condition/etag2/$', views.etag_view2),
+    ('^condition/model/$', views.model_view),
+    ('^condition/class/$', views.EntryView.as_view()),
+    ('^condition/class_etag/$', views.ETagView.as_view()),
 )
@@ -1,8 +1,10 @@
 # -*- coding:utf-8 -*-
-from django.views.decorators.http import condition, etag, last_modified
+from django.views.decorators.http import (condition, etag, last_modified,
+    model_last_modified)
+from django.views.generic.base import ConditionalMixin, View
 from django.http import HttpResponse
 
-from models import FULL_RESPONSE, LAST_MODIFIED, ETAG
+from models import FULL_RESPONSE, LAST_MODIFIED, ETAG, Entry
 
 def index(request):
     return HttpResponse(FULL_RESPONSE)
@@ -24,3 +26,22 @@ def etag_view2(request):
     return HttpResponse(FULL_RESPONSE)
 etag_view2 = etag(lambda r: ETAG)(etag_view2)
 
+def model_view(request):
+    return HttpResponse(FULL_RESPONSE)
+model_view = condition(last_modified_func=model_last_modified(Entry, 'updated_at'))(model_view)
+
+class EntryView(ConditionalMixin, View):
+    last_modified_field = 'updated_at'
+
+    def get_queryset(self):
+        return Entry.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(FULL_RESPONSE)
+
+class ETagView(ConditionalMixin, View):
+    def get_etag(self, request, *args, **kwargs):
+        return ETAG
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(FULL_RESPONSE)
@@ -7,10 +7,16 @@ import os
 import shutil
 from StringIO import StringIO
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
 from django.core.files import temp as tempfile
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+    InMemoryUploadedFile, TemporaryUploadedFile)
+from django.core.files.uploadhandler import (SpooledFileUploadHandler,
+    TemporaryFileUploadHandler)
 from django.http.multipartparser import MultiPartParser
 from django.test import TestCase, client
+from django.test.utils import override_settings
 from django.utils import simplejson
 from django.utils import unittest
 
@@ -401,3 +407,68 @@ class MultiParserTests(unittest.TestCase):
             'CONTENT_TYPE':     'multipart/form-data; boundary=_foo',
             'CONTENT_LENGTH':   '1'
         }, StringIO('x'), [], 'utf-8')
+
+    def _parse(self, payload, handlers):
+        payload = "\r\n".join(payload + ['--' + client.BOUNDARY + '--', ''])
+        return MultiPartParser({
+            'CONTENT_TYPE': client.MULTIPART_CONTENT,
+            'CONTENT_LENGTH': len(payload),
+        }, StringIO(payload), handlers, 'utf-8').parse()
+
+    def _file_part(self, name, content):
+        return [
+            '--' + client.BOUNDARY,
+            'Content-Disposition: form-data; name="%s"; filename="%s.txt"' % (name, name),
+            'Content-Type: application/octet-stream',
+            '',
+            content,
+        ]
+
+    def test_boundary_across_chunks(self):
+        """
+        Data is split correctly whatever the position of the boundaries
+        relative to the chunks read from the input.
+        """
+        contents = ['', 'a', '\r\n', '--', 'x' * 100 + '\r\n--' + client.BOUNDARY[:5],
+                    '\r' * 30 + '-' * 30]
+        payload = []
+        for i, content in enumerate(contents):
+            payload.extend(self._file_part('f%d' % i, content))
+        for chunk_size in (1, 7, 16, 64, 4096):
+            handler = TemporaryFileUploadHandler()
+            handler.chunk_size = chunk_size
+            post, files = self._parse(payload, [handler])
+            for i, content in enumerate(contents):
+                self.assertEqual(files['f%d' % i].read(), content)
+
+    def test_spooled_upload_handler(self):
+        old_max_memory_size = settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 1000
+        try:
+            payload = self._file_part('small', 'a' * 1000) + self._file_part('large', 'b' * 1001)
+            handler = SpooledFileUploadHandler()
+            handler.chunk_size = 256
+            post, files = self._parse(payload, [handler, TemporaryFileUploadHandler()])
+            self.assertTrue(isinstance(files['small'], InMemoryUploadedFile))
+            self.assertEqual(files['small'].read(), 'a' * 1000)
+            self.assertTrue(isinstance(files['large'], TemporaryUploadedFile))
+            self.assertEqual(files['large'].size, 1001)
+            self.assertEqual(files['large'].read(), 'b' * 1001)
+        finally:
+            settings.FILE_UPLOAD_MAX_MEMORY_SIZE = old_max_memory_size
+
+    def _field_part(self, name, value):
+        return [
+            '--' + client.BOUNDARY,
+            'Content-Disposition: form-data; name="%s"' % name,
+            '',
+            value,
+        ]
+
+    @override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=2)
+    def test_max_number_fields(self):
+        payload = self._field_part('a', '1') + self._field_part('b', '2')
+        post, files = self._parse(payload + self._file_part('f', 'x'), [TemporaryFileUploadHandler()])
+        self.assertEqual(post.getlist('a') + post.getlist('b'), [u'1', u'2'])
+        payload += self._field_part('a', '3')
+        self.assertRaises(SuspiciousOperation, self._parse, payload, [TemporaryFileUploadHandler()])
@@ -133,6 +133,16 @@ class Book(models.Model):
         )
 
 
+class Pseudonym(models.Model):
+    name = models.CharField(max_length=255)
+    person = models.ForeignKey(Person, null=True)
+
+    def natural_key(self):
+        if self.person is None:
+            return (self.name,)
+        return (self.name,) + self.person.natural_key()
+
+
 class NKManager(models.Manager):
     def get_by_natural_key(self, data):
         return self.get(data=data)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 # Unittests for fixtures.
+from __future__ import with_statement
+
 import os
 import re
 try:
@@ -7,18 +9,19 @@ try:
 except ImportError:
     from StringIO import StringIO
 
-from django.core import management
+from django.core import management, serializers
 from django.core.management.commands.dumpdata import sort_dependencies
 from django.core.management.base import CommandError
 from django.db.models import signals
-from django.db import transaction
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
 from django.test import (TestCase, TransactionTestCase, skipIfDBFeature,
     skipUnlessDBFeature)
+from django.utils import simplejson
 
 from models import Animal, Stuff
 from models import Absolute, Parent, Child
 from models import Article, Widget
-from models import Store, Person, Book
+from models import Store, Person, Book, Pseudonym
 from models import NKChild, RefToNKChild
 from models import Circle1, Circle2, Circle3
 from models import ExternalDependency
@@ -483,6 +486,125 @@ class NaturalKeyFixtureTests(TestCase):
             """[{"pk": 2, "model": "fixtures_regress.store", "fields": {"name": "Amazon"}}, {"pk": 3, "model": "fixtures_regress.store", "fields": {"name": "Borders"}}, {"pk": 4, "model": "fixtures_regress.person", "fields": {"name": "Neal Stephenson"}}, {"pk": 1, "model": "fixtures_regress.book", "fields": {"stores": [["Amazon"], ["Borders"]], "name": "Cryptonomicon", "author": ["Neal Stephenson"]}}]"""
         )
 
+    def test_nk_lookups_cached(self):
+        """
+        Each natural key is only looked up once during a deserialization,
+        and the objects of small tables are fetched at once.
+        """
+        Person.objects.create(name="Neal Stephenson")
+        for name in ("Amazon", "Borders"):
+            Store.objects.create(name=name)
+        data = simplejson.dumps([{
+            "model": "fixtures_regress.book",
+            "pk": i + 1,
+            "fields": {"name": "Book %d" % i, "author": ["Neal Stephenson"],
+                       "stores": [["Amazon"], ["Borders"]]},
+        } for i in range(20)])
+        # The size of each table is checked before fetching its objects.
+        with self.assertNumQueries(4):
+            objects = list(serializers.deserialize('json', data))
+        self.assertEqual(len(objects), 20)
+        self.assertEqual(objects[-1].object.author_id, Person.objects.get().pk)
+
+        data = serializers.serialize('xml', [obj.object for obj in objects],
+                                     fields=('name', 'author'), use_natural_keys=True)
+        with self.assertNumQueries(2):
+            objects = list(serializers.deserialize('xml', data))
+        self.assertEqual(len(objects), 20)
+
+    def test_nk_lookups_after_prefetch(self):
+        """
+        Natural keys of objects saved after the objects of their model were
+        fetched are still found.
+        """
+        Person.objects.create(name="Neal Stephenson")
+        data = simplejson.dumps([
+            {"model": "fixtures_regress.book", "pk": 1,
+             "fields": {"name": "Cryptonomicon", "author": ["Neal Stephenson"]}},
+            {"model": "fixtures_regress.person", "pk": 2,
+             "fields": {"name": "Greg Egan"}},
+            {"model": "fixtures_regress.book", "pk": 2,
+             "fields": {"name": "Permutation City", "author": ["Greg Egan"]}},
+        ])
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        self.assertEqual(Book.objects.get(pk=2).author.name, "Greg Egan")
+
+    def test_nk_lookups_after_change(self):
+        """
+        Natural keys changed or moved to another object by the objects
+        deserialized since the objects of their model were fetched resolve
+        to their new object.
+        """
+        old_neal = Person(pk=1, name="Neal Stephenson")
+        greg = Person(pk=1, name="Greg Egan")
+        neal = Person(pk=2, name="Neal Stephenson")
+        objects = [Book(pk=1, name="Cryptonomicon", author=old_neal), greg, neal,
+                   Book(pk=2, name="Anathem", author=neal),
+                   Book(pk=3, name="Diaspora", author=greg)]
+        for format in ('json', 'xml'):
+            Book.objects.all().delete()
+            Person.objects.all().delete()
+            Person.objects.create(pk=1, name="Neal Stephenson")
+            data = serializers.serialize(format, objects, fields=('name', 'author'),
+                                         use_natural_keys=True)
+            for obj in serializers.deserialize(format, data):
+                obj.save()
+            self.assertEqual(Book.objects.get(pk=1).author_id, 1)
+            self.assertEqual(Book.objects.get(pk=2).author_id, 2)
+            self.assertEqual(Book.objects.get(pk=3).author_id, 1)
+
+    def test_nk_lookups_duplicates(self):
+        """
+        Natural keys shared by several objects aren't resolved to any of them.
+        """
+        Person.objects.create(name="Neal Stephenson")
+        Person.objects.create(name="Neal Stephenson")
+        Person.objects.create(name="Greg Egan")
+        data = simplejson.dumps([
+            {"model": "fixtures_regress.book", "pk": 1,
+             "fields": {"name": "Diaspora", "author": ["Greg Egan"]}},
+            {"model": "fixtures_regress.book", "pk": 2,
+             "fields": {"name": "Cryptonomicon", "author": ["Neal Stephenson"]}},
+        ])
+        objects = serializers.deserialize('json', data)
+        self.assertEqual(objects.next().object.name, "Diaspora")
+        self.assertRaises(Person.MultipleObjectsReturned, objects.next)
+
+    def test_nk_prefetch_nullable_fks(self):
+        """
+        The related objects used by natural_key() are fetched along with the
+        objects, even through nullable foreign keys.
+        """
+        for i in range(5):
+            person = Person.objects.create(name="Person %d" % i)
+            Pseudonym.objects.create(name="Pseudonym %d" % i, person=person)
+        Pseudonym.objects.create(name="Anonymous")
+        resolver = serializers.base.NaturalKeyResolver(DEFAULT_DB_ALIAS)
+        # The size of the table is checked, then the objects are fetched.
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                resolver.get(Pseudonym, ["Pseudonym 3", "Person 3"]).name,
+                "Pseudonym 3")
+            self.assertEqual(resolver.get(Pseudonym, ["Anonymous"]).person, None)
+
+    def test_nk_prefetch_limit(self):
+        """
+        The objects of tables larger than PREFETCH_LIMIT aren't fetched, and
+        their natural keys are looked up one by one.
+        """
+        for i in range(5):
+            Person.objects.create(name="Person %d" % i)
+        resolver = serializers.base.NaturalKeyResolver(DEFAULT_DB_ALIAS)
+        resolver.PREFETCH_LIMIT = 3
+        with self.assertNumQueries(2):
+            self.assertEqual(resolver.get(Person, ["Person 3"]).name, "Person 3")
+        # Only the primary keys were fetched to check the size of the table.
+        self.assertEqual(
+            connections[DEFAULT_DB_ALIAS].queries[-2]['sql'].count(','), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.get(Person, ["Person 1"]).name, "Person 1")
+
     def test_dependency_sorting(self):
         """
         Now lets check the dependency sorting explicitly
@@ -1,7 +1,10 @@
 from django.utils import unittest
 from django.conf import settings
+from django.core import signals
+from django.core.handlers import instrumentation
 from django.core.handlers.wsgi import WSGIHandler
 from django.test import RequestFactory
+from django.test.utils import override_settings
 
 
 class HandlerTests(unittest.TestCase):
@@ -32,3 +35,77 @@ class HandlerTests(unittest.TestCase):
         handler = WSGIHandler()
         response = handler(environ, lambda *a, **k: None)
         self.assertEqual(response.status_code, 400)
+
+    def test_file_wrapper(self):
+        """
+        Tests that the file of a FileResponse is handed to the server's
+        wsgi.file_wrapper.
+        """
+        class FileWrapper(object):
+            def __init__(self, filelike, block_size):
+                self.filelike = filelike
+                self.block_size = block_size
+
+        environ = RequestFactory().get('/views/site_media/file.txt').environ
+        environ['wsgi.file_wrapper'] = FileWrapper
+        handler = WSGIHandler()
+        response = handler(environ, lambda *a, **k: None)
+        self.assertTrue(isinstance(response, FileWrapper))
+        self.assertEqual(response.filelike.read(), 'An example media file.')
+        response.filelike.close()
+
+        # A range isn't sent with the file wrapper.
+        environ = RequestFactory().get('/views/site_media/file.txt',
+                                       HTTP_RANGE='bytes=0-1').environ
+        environ['wsgi.file_wrapper'] = FileWrapper
+        response = handler(environ, lambda *a, **k: None)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(''.join(response), 'An')
+        response.close()
+
+    def test_streaming_request_finished(self):
+        """
+        The request of a streaming response only finishes when the server
+        closes the response, once its content has been generated.
+        """
+        finished = []
+        def receiver(sender, **kwargs):
+            finished.append(sender)
+        signals.request_finished.connect(receiver)
+        try:
+            environ = RequestFactory().get('/views/site_media/file.txt').environ
+            handler = WSGIHandler()
+            response = handler(environ, lambda *a, **k: None)
+            self.assertEqual(finished, [])
+            self.assertEqual(''.join(response), 'An example media file.')
+            self.assertEqual(finished, [])
+            response.close()
+            self.assertEqual(finished, [WSGIHandler])
+            response.close()
+            self.assertEqual(finished, [WSGIHandler])
+
+            # Other responses finish the request right away.
+            environ = RequestFactory().get('/views/site_media/missing.txt').environ
+            response = handler(environ, lambda *a, **k: None)
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(finished, [WSGIHandler, WSGIHandler])
+        finally:
+            signals.request_finished.disconnect(receiver)
+
+    @override_settings(MIDDLEWARE_INSTRUMENTATION=True,
+                       MIDDLEWARE_CLASSES=('django.middleware.common.CommonMiddleware',))
+    def test_middleware_instrumentation(self):
+        instrumentation.reset_stats()
+        environ = RequestFactory().get('/views/site_media/file.txt').environ
+        handler = WSGIHandler()
+        for i in range(2):
+            handler(environ, lambda *a, **k: None).close()
+        stats = instrumentation.get_stats()
+        path = 'django.middleware.common.CommonMiddleware'
+        self.assertEqual(sorted(stats), [(path, 'process_request'), (path, 'process_response')])
+        request_stats = stats[(path, 'process_request')]
+        self.assertEqual(request_stats.calls, 2)
+        self.assertTrue(request_stats.max_time <= request_stats.total_time)
+        self.assertEqual(request_stats.mean_time, request_stats.total_time / 2)
+        instrumentation.reset_stats()
+        self.assertEqual(instrumentation.get_stats(), {})
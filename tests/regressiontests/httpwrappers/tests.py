@@ -1,8 +1,14 @@
+from __future__ import with_statement
+
 import copy
+import os
 import pickle
+from StringIO import StringIO
 
-from django.http import (QueryDict, HttpResponse, SimpleCookie, BadHeaderError,
-        parse_cookie)
+from django.core.exceptions import SuspiciousOperation
+from django.http import (QueryDict, HttpResponse, StreamingHttpResponse,
+        FileResponse, SimpleCookie, BadHeaderError, parse_cookie)
+from django.test.utils import override_settings
 from django.utils import unittest
 
 class QueryDictTests(unittest.TestCase):
@@ -195,6 +201,46 @@ class QueryDictTests(unittest.TestCase):
         x.update(y)
         self.assertEqual(x.getlist('a'), [u'1', u'2', u'3', u'4'])
 
+    def test_blank_values(self):
+        q = QueryDict('a=&b&c=1;a=+2+&&')
+        self.assertEqual(q.lists(), [(u'a', [u'', u' 2 ']), (u'c', [u'1']), (u'b', [u''])])
+        self.assertTrue(all(isinstance(k, unicode) for k in q.keys()))
+        self.assertTrue(all(isinstance(v, unicode) for v in q.values()))
+
+    def test_lazy_decoding(self):
+        """
+        Percent-encoded values are only decoded when they are accessed, but
+        are always returned decoded.
+        """
+        q = QueryDict('a=caf%C3%A9&b=%FF&caf%C3%A9=a+b')
+        self.assertEqual(q['a'], u'caf\xe9')
+        self.assertEqual(q.getlist('b'), [u'\ufffd'])
+        self.assertEqual(q[u'caf\xe9'], u'a b')
+        q = QueryDict('a=caf%C3%A9&b=%FF')
+        self.assertEqual(q, QueryDict('a=caf\xc3\xa9&b=\xff'))
+        self.assertEqual(sorted(q.items()), [(u'a', u'caf\xe9'), (u'b', u'\ufffd')])
+        self.assertEqual(QueryDict('a=%41').copy(), QueryDict('a=A'))
+        self.assertEqual(repr(QueryDict('a=%41')), "<QueryDict: {u'a': [u'A']}>")
+
+    def test_mutate_undecoded_key(self):
+        q = QueryDict('a=%41&b=%41&c=%41&d=%41', mutable=True)
+        q['a'] = '%41'
+        q.setlist('b', ['%41'])
+        q.appendlist('c', '%41')
+        del q['d']
+        q['d'] = '%41'
+        self.assertEqual(q.lists(), [(u'a', [u'%41']), (u'c', [u'A', u'%41']),
+                                     (u'b', [u'%41']), (u'd', [u'%41'])])
+        self.assertEqual(q.pop('c'), [u'A', u'%41'])
+
+    @override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=2)
+    def test_max_number_fields(self):
+        self.assertEqual(QueryDict('a=1&&a=2&').getlist('a'), [u'1', u'2'])
+        self.assertRaises(SuspiciousOperation, QueryDict, 'a=1&b=2;c')
+        self.assertRaises(SuspiciousOperation, QueryDict, 'a=%31&b=2&c')
+        with override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=None):
+            self.assertEqual(len(QueryDict('&'.join(['a=1'] * 3000)).getlist('a')), 3000)
+
     def test_non_default_encoding(self):
         """#13572 - QueryDict with a non-default encoding"""
         q = QueryDict('sbb=one', encoding='rot_13')
@@ -295,6 +341,94 @@ class HttpResponseTests(unittest.TestCase):
         self.assertRaises(UnicodeEncodeError,
                           getattr, r, 'content')
 
+class StreamingHttpResponseTests(unittest.TestCase):
+    def test_streaming_content(self):
+        r = StreamingHttpResponse(iter(['hello', u'caf\xe9', 3]))
+        self.assertTrue(r.streaming)
+        self.assertEqual(list(r), ['hello', 'caf\xc3\xa9', '3'])
+        # The content can only be consumed once.
+        self.assertEqual(list(r), [])
+
+    def test_no_content_attribute(self):
+        r = StreamingHttpResponse(iter(['hello']))
+        self.assertRaises(AttributeError, getattr, r, 'content')
+        self.assertRaises(AttributeError, setattr, r, 'content', 'hello')
+        self.assertRaises(Exception, r.write, 'hello')
+        self.assertRaises(Exception, r.tell)
+        # Nothing was consumed.
+        self.assertEqual(list(r), ['hello'])
+
+    def test_wrap_streaming_content(self):
+        r = StreamingHttpResponse(iter(['hello', 'world']))
+        r.streaming_content = (chunk.upper() for chunk in r.streaming_content)
+        self.assertEqual(list(r), ['HELLO', 'WORLD'])
+
+    def test_close(self):
+        class Closable(object):
+            closed = False
+            def __iter__(self):
+                return iter(['hello'])
+            def close(self):
+                self.closed = True
+
+        content = Closable()
+        r = StreamingHttpResponse(content)
+        r.streaming_content = (chunk.upper() for chunk in r.streaming_content)
+        self.assertEqual(list(r), ['HELLO'])
+        r.close()
+        self.assertTrue(content.closed)
+
+class FileResponseTests(unittest.TestCase):
+    def test_file_response(self):
+        f = open(__file__, 'rb')
+        r = FileResponse(f)
+        r.block_size = 100
+        self.assertTrue(r.file_to_stream is f)
+        self.assertEqual(r.file_size, os.path.getsize(__file__))
+        self.assertEqual(r['Content-Length'], str(r.file_size))
+        self.assertEqual(r['Accept-Ranges'], 'bytes')
+        content = list(r)
+        self.assertEqual(len(content[0]), 100)
+        self.assertEqual(''.join(content), open(__file__, 'rb').read())
+        r.close()
+        self.assertTrue(f.closed)
+
+    def test_set_range(self):
+        r = FileResponse(open(__file__, 'rb'))
+        r.set_range(7, 13)
+        self.assertEqual(r.status_code, 206)
+        self.assertTrue(r.file_to_stream is None)
+        self.assertEqual(r['Content-Range'], 'bytes 7-12/%d' % r.file_size)
+        self.assertEqual(r['Content-Length'], '6')
+        self.assertEqual(''.join(r), open(__file__, 'rb').read()[7:13])
+        r.close()
+
+    def test_not_regular_file(self):
+        "Pipes and devices have an unknown size, even if they can tell()"
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, 'binary content')
+        os.close(write_fd)
+        for f in (os.fdopen(read_fd, 'rb'), open(os.devnull, 'rb')):
+            r = FileResponse(f)
+            self.assertEqual(r.file_size, None)
+            self.assertFalse(r.has_header('Content-Length'))
+            self.assertFalse(r.has_header('Accept-Ranges'))
+            r.close()
+
+    def test_file_like(self):
+        "File-like objects without a file descriptor have an unknown size"
+        r = FileResponse(StringIO('binary content'))
+        self.assertEqual(r.file_size, None)
+        self.assertFalse(r.has_header('Content-Length'))
+        self.assertFalse(r.has_header('Accept-Ranges'))
+        self.assertEqual(''.join(r), 'binary content')
+
+    def test_replaced_content(self):
+        r = FileResponse(StringIO('binary content'))
+        r.streaming_content = (chunk.upper() for chunk in r.streaming_content)
+        self.assertTrue(r.file_to_stream is None)
+        self.assertEqual(''.join(r), 'BINARY CONTENT')
+
 class CookieTests(unittest.TestCase):
     def test_encode(self):
         """
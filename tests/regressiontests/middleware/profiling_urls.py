@@ -0,0 +1,11 @@
+from django.conf.urls import patterns, url
+from django.db import connection
+from django.http import HttpResponse
+
+def profiled_view(request):
+    connection.cursor().execute('SELECT 1')
+    return HttpResponse('profiled')
+
+urlpatterns = patterns('',
+    url(r'^profiled/$', profiled_view, name='profiled'),
+)
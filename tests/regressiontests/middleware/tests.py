@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
+from __future__ import with_statement
 
+import gzip
+import os
 import re
+import shutil
+import tempfile
+import zlib
+from StringIO import StringIO
 
 from django.conf import settings
-from django.core import mail
+from django.core import mail, management
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
 from django.http import HttpRequest
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.utils import conditional_content_removal
 from django.middleware.clickjacking import XFrameOptionsMiddleware
 from django.middleware.common import CommonMiddleware
+from django.middleware.gzip import GZipMiddleware
 from django.middleware.http import ConditionalGetMiddleware
+from django.middleware.profiling import ProfilingMiddleware, load_profiles
 from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.text import compress_sequence
 
 
 class CommonMiddlewareTest(TestCase):
@@ -287,6 +300,22 @@ class CommonMiddlewareTest(TestCase):
         CommonMiddleware().process_response(request, response)
         self.assertEqual(len(mail.outbox), 0)
 
+    def test_etag_not_computed_for_streaming_response(self):
+        """
+        Tests that USE_ETAGS doesn't consume the content of a streaming
+        response to hash it.
+        """
+        old_use_etags = settings.USE_ETAGS
+        settings.USE_ETAGS = True
+        try:
+            request = self._get_request('slash/')
+            response = StreamingHttpResponse(iter(['content']))
+            response = CommonMiddleware().process_response(request, response)
+            self.assertFalse(response.has_header('ETag'))
+            self.assertEqual(list(response), ['content'])
+        finally:
+            settings.USE_ETAGS = old_use_etags
+
 
 class ConditionalGetMiddlewareTest(TestCase):
     urls = 'regressiontests.middleware.cond_get_urls'
@@ -321,6 +350,21 @@ class ConditionalGetMiddlewareTest(TestCase):
         self.resp = ConditionalGetMiddleware().process_response(self.req, self.resp)
         self.assertEqual(int(self.resp['Content-Length']), bad_content_length)
 
+    def test_no_content_length_for_streaming_response(self):
+        self.resp = StreamingHttpResponse(iter(['content']))
+        self.resp = ConditionalGetMiddleware().process_response(self.req, self.resp)
+        self.assertFalse('Content-Length' in self.resp)
+        self.assertEqual(list(self.resp), ['content'])
+
+    def test_streaming_response_not_modified(self):
+        self.req.META['HTTP_IF_NONE_MATCH'] = 'spam'
+        self.resp = StreamingHttpResponse(iter(['content']))
+        self.resp['ETag'] = 'spam'
+        self.resp = ConditionalGetMiddleware().process_response(self.req, self.resp)
+        self.assertEqual(self.resp.status_code, 304)
+        self.resp = conditional_content_removal(self.req, self.resp)
+        self.assertEqual(list(self.resp), [])
+
     # Tests for the ETag header
 
     def test_if_none_match_and_no_etag(self):
@@ -375,6 +419,225 @@ class ConditionalGetMiddlewareTest(TestCase):
         self.assertEqual(self.resp.status_code, 200)
 
 
+class GZipMiddlewareTest(TestCase):
+    """
+    Tests the GZip middleware.
+    """
+    short_string = "This string is too short to be worth compressing."
+    compressible_string = 'a' * 500
+
+    def setUp(self):
+        self.req = HttpRequest()
+        self.req.META = {
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': 80,
+        }
+        self.req.path = self.req.path_info = "/"
+        self.req.META['HTTP_ACCEPT_ENCODING'] = 'gzip, deflate'
+        self.compression_level = settings.GZIP_COMPRESSION_LEVEL
+        self.minimum_size = settings.GZIP_MINIMUM_SIZE
+        self.content_types = settings.GZIP_CONTENT_TYPES
+
+    def tearDown(self):
+        settings.GZIP_COMPRESSION_LEVEL = self.compression_level
+        settings.GZIP_MINIMUM_SIZE = self.minimum_size
+        settings.GZIP_CONTENT_TYPES = self.content_types
+
+    @staticmethod
+    def decompress(gzipped_string):
+        return gzip.GzipFile(mode='rb', fileobj=StringIO(gzipped_string)).read()
+
+    def test_compress_response(self):
+        resp = HttpResponse(self.compressible_string)
+        r = GZipMiddleware().process_response(self.req, resp)
+        self.assertEqual(self.decompress(r.content), self.compressible_string)
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertEqual(r['Content-Length'], str(len(r.content)))
+
+    def test_no_compress_short_response(self):
+        resp = HttpResponse(self.short_string)
+        r = GZipMiddleware().process_response(self.req, resp)
+        self.assertEqual(r.content, self.short_string)
+        self.assertFalse(r.has_header('Content-Encoding'))
+
+    def test_compress_streaming_response(self):
+        """
+        Tests that streaming responses are compressed incrementally, without
+        their content being consumed by the middleware.
+        """
+        consumed = []
+        def content():
+            for chunk in (self.compressible_string, self.short_string):
+                consumed.append(chunk)
+                yield chunk
+
+        resp = StreamingHttpResponse(content())
+        resp['Content-Length'] = len(self.compressible_string + self.short_string)
+        r = GZipMiddleware().process_response(self.req, resp)
+        self.assertEqual(consumed, [])
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertFalse(r.has_header('Content-Length'))
+        self.assertEqual(self.decompress(''.join(r)),
+                         self.compressible_string + self.short_string)
+
+    def test_streaming_response_short_content_length(self):
+        resp = StreamingHttpResponse(iter([self.short_string]))
+        resp['Content-Length'] = len(self.short_string)
+        r = GZipMiddleware().process_response(self.req, resp)
+        self.assertFalse(r.has_header('Content-Encoding'))
+        self.assertEqual(list(r), [self.short_string])
+
+    def test_compress_iterator_response(self):
+        """
+        Tests that the compressed content of a response created with an
+        iterator can be read more than once.
+        """
+        resp = HttpResponse(iter([self.compressible_string, self.short_string]))
+        r = GZipMiddleware().process_response(self.req, resp)
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertEqual(r['Content-Length'], str(len(r.content)))
+        self.assertEqual(self.decompress(r.content),
+                         self.compressible_string + self.short_string)
+        self.assertEqual(self.decompress(''.join(r)),
+                         self.compressible_string + self.short_string)
+
+    def test_compress_iterator_response_etag(self):
+        """
+        Tests that middleware computing an ETag from the compressed content
+        of a response created with an iterator doesn't empty it.
+        """
+        resp = HttpResponse(iter([self.compressible_string, self.short_string]))
+        r = GZipMiddleware().process_response(self.req, resp)
+        with override_settings(USE_ETAGS=True):
+            r = CommonMiddleware().process_response(self.req, r)
+        self.assertTrue(r.has_header('ETag'))
+        self.assertEqual(self.decompress(''.join(r)),
+                         self.compressible_string + self.short_string)
+
+    def test_compression_level(self):
+        content = ' '.join(str(i * i % 1009) for i in range(2000))
+        for level in (1, 9):
+            settings.GZIP_COMPRESSION_LEVEL = level
+            r = GZipMiddleware().process_response(self.req, HttpResponse(content))
+            self.assertEqual(self.decompress(r.content), content)
+            # The raw deflate stream follows the 10-byte gzip header.
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            deflated = compressor.compress(content) + compressor.flush()
+            self.assertEqual(r.content[10:10 + len(deflated)], deflated)
+
+    def test_minimum_size(self):
+        settings.GZIP_MINIMUM_SIZE = 1000
+        r = GZipMiddleware().process_response(self.req, HttpResponse(self.compressible_string))
+        self.assertFalse(r.has_header('Content-Encoding'))
+        settings.GZIP_MINIMUM_SIZE = 10
+        r = GZipMiddleware().process_response(self.req, HttpResponse(self.short_string))
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+
+    def test_content_types(self):
+        settings.GZIP_CONTENT_TYPES = ('text/*', 'application/json')
+        for content_type, compressed in (('text/html; charset=utf-8', True),
+                                         ('application/json', True),
+                                         ('application/javascript', False),
+                                         ('image/png', False)):
+            resp = HttpResponse(self.compressible_string, content_type=content_type)
+            r = GZipMiddleware().process_response(self.req, resp)
+            self.assertEqual(r.has_header('Content-Encoding'), compressed, content_type)
+
+    def test_compress_sequence_chunks(self):
+        """
+        Tests that compress_sequence() yields compressed data as the
+        sequence is consumed, not only at its end.
+        """
+        chunks = ['%05d' % i * 1000 for i in range(100)]
+        output = []
+        for data in compress_sequence(chunks, chunk_size=10000):
+            output.append(data)
+        self.assertTrue(len([data for data in output if data]) > 2)
+        self.assertEqual(self.decompress(''.join(output)), ''.join(chunks))
+
+
+class ProfilingMiddlewareTest(TestCase):
+    urls = 'regressiontests.middleware.profiling_urls'
+
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_profiled_request(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIRECTORY=self.dirname,
+                MIDDLEWARE_CLASSES=('django.middleware.profiling.ProfilingMiddleware',)):
+            self.client.get('/profiled/')
+            self.client.get('/profiled/')
+        # Each request is saved to its own file.
+        self.assertEqual(len(os.listdir(self.dirname)), 2)
+        profiles = list(load_profiles(self.dirname))
+        # The requests to a URL name are added up in a single profile.
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual([name for name in os.listdir(self.dirname)
+                          if not name.startswith('.')],
+                         [os.path.basename(profiles[0]['file'])])
+        profile = profiles[0]
+        self.assertEqual(profile['url_name'], 'profiled')
+        self.assertEqual(profile['view'], 'regressiontests.middleware.profiling_urls.profiled_view')
+        self.assertEqual(profile['requests'], 2)
+        self.assertEqual(profile['queries'], 2)
+        self.assertTrue(profile['max_duration'] <= profile['total_duration'])
+        view_stats = [stats for func, stats in profile['stats'].items()
+                      if func[2] == 'profiled_view']
+        self.assertEqual(len(view_stats), 1)
+        # The number of calls of the view.
+        self.assertEqual(view_stats[0][1], 2)
+
+        out = StringIO()
+        management.call_command('profilestats', directory=self.dirname, clear=True, stdout=out)
+        output = out.getvalue()
+        self.assertTrue(re.search(r'^profiled +2 ', output, re.M))
+        self.assertTrue('(profiled_view)' in output)
+        self.assertEqual(list(load_profiles(self.dirname)), [])
+
+    def test_sample_rate(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0.5, PROFILING_DIRECTORY=self.dirname,
+                MIDDLEWARE_CLASSES=('django.middleware.profiling.ProfilingMiddleware',)):
+            for i in range(100):
+                self.client.get('/profiled/')
+        profiles = list(load_profiles(self.dirname))
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(0 < profiles[0]['requests'] < 100)
+
+    def test_samples_added_to_profile(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIRECTORY=self.dirname,
+                MIDDLEWARE_CLASSES=('django.middleware.profiling.ProfilingMiddleware',)):
+            self.client.get('/profiled/')
+            self.assertEqual(list(load_profiles(self.dirname))[0]['requests'], 1)
+            self.client.get('/profiled/')
+            sample = [name for name in os.listdir(self.dirname)
+                      if name.endswith('.sample')][0]
+            data = open(os.path.join(self.dirname, sample), 'rb').read()
+            profile = list(load_profiles(self.dirname))[0]
+        self.assertEqual(profile['requests'], 2)
+        # A sample that couldn't be deleted after being merged isn't counted
+        # again.
+        open(os.path.join(self.dirname, sample), 'wb').write(data)
+        self.assertEqual(list(load_profiles(self.dirname))[0]['requests'], 2)
+
+    def test_save_error(self):
+        # The directory can't be created where a file exists.
+        path = os.path.join(self.dirname, 'file')
+        open(path, 'w').close()
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIRECTORY=path,
+                MIDDLEWARE_CLASSES=('django.middleware.profiling.ProfilingMiddleware',)):
+            response = self.client.get('/profiled/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_used(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_DIRECTORY=self.dirname):
+            self.assertRaises(MiddlewareNotUsed, ProfilingMiddleware)
+        with override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIRECTORY=None):
+            self.assertRaises(ImproperlyConfigured, ProfilingMiddleware)
+
+
 class XFrameOptionsMiddlewareTest(TestCase):
     """
     Tests for the X-Frame-Options clickjacking prevention middleware.
@@ -420,9 +683,12 @@ class XFrameOptionsMiddlewareTest(TestCase):
         Tests that if the X_FRAME_OPTIONS setting is not set then it defaults
         to SAMEORIGIN.
         """
-        del settings.X_FRAME_OPTIONS
-        r = XFrameOptionsMiddleware().process_response(HttpRequest(),
-                                                       HttpResponse())
+        # The setting is deleted from overridden settings, so that the
+        # settings seen by the other tests are left alone.
+        with override_settings(X_FRAME_OPTIONS='DENY'):
+            del settings.X_FRAME_OPTIONS
+            r = XFrameOptionsMiddleware().process_response(HttpRequest(),
+                                                           HttpResponse())
         self.assertEqual(r['X-Frame-Options'], 'SAMEORIGIN')
 
     def test_dont_set_if_set(self):
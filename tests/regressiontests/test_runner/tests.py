@@ -1,15 +1,31 @@
 """
 Tests for django test runner
 """
+from __future__ import with_statement
+
+import os
+import shutil
+import sqlite3
 import StringIO
+import tempfile
 from optparse import make_option
 import warnings
-
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured
 from django.core.management import call_command
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler
 from django.test import simple
 from django.test.simple import get_tests
-from django.test.utils import get_warnings_state, restore_warnings_state
+from django.test.utils import (get_warnings_state, restore_warnings_state,
+    override_settings)
 from django.utils import unittest
 from django.utils.importlib import import_module
 
@@ -223,3 +239,223 @@ class ModulesTestsPackages(unittest.TestCase):
         "Test for #12658 - Tests with ImportError's shouldn't fail silently"
         module = import_module(TEST_APP_ERROR)
         self.assertRaises(ImportError, get_tests, module)
+
+
+class TestDatabaseTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.test_name = os.path.join(self.tmpdir, 'test.db')
+        self.connection = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'TEST_NAME': self.test_name,
+        }})['default']
+        self.creation = self.connection.creation
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_fingerprint(self):
+        fingerprint = self.creation.test_db_fingerprint()
+        self.assertEqual(self.creation.test_db_fingerprint(), fingerprint)
+        f = open(os.path.join(self.tmpdir, 'initial_data.json'), 'w')
+        f.write('[]')
+        f.close()
+        with override_settings(FIXTURE_DIRS=(self.tmpdir,)):
+            self.assertNotEqual(self.creation.test_db_fingerprint(), fingerprint)
+
+    def test_fingerprint_permissions(self):
+        # Custom permissions don't change the SQL, but the rows created by
+        # post_syncdb.
+        fingerprint = self.creation.test_db_fingerprint()
+        old_permissions = Group._meta.permissions
+        Group._meta.permissions = [('frobnicate_group', 'Can frobnicate group')]
+        try:
+            self.assertNotEqual(self.creation.test_db_fingerprint(), fingerprint)
+        finally:
+            Group._meta.permissions = old_permissions
+
+    def test_save_template(self):
+        stale_name = self.test_name + '_template_0123456789ab'
+        open(stale_name, 'w').close()
+        template_name = self.creation._get_test_db_template_name()
+        # Build the test database, and its template, on this connection.
+        old_connection = connections._connections.get(DEFAULT_DB_ALIAS)
+        connections._connections[DEFAULT_DB_ALIAS] = self.connection
+        try:
+            self.assertEqual(self.creation.create_test_db(0, keepdb=True), self.test_name)
+            permissions = Permission.objects.count()
+            self.connection.close()
+        finally:
+            connections._connections[DEFAULT_DB_ALIAS] = old_connection
+            ContentType.objects.clear_cache()
+        self.assertTrue(permissions > 0)
+        self.assertFalse(os.path.exists(stale_name))
+        self.assertEqual(self.creation._get_test_db_templates(), [template_name])
+        # The template holds the rows created by post_syncdb.
+        template = sqlite3.connect(template_name)
+        try:
+            self.assertEqual(
+                template.execute('SELECT COUNT(*) FROM auth_permission').fetchone(),
+                (permissions,))
+        finally:
+            template.close()
+
+    def test_create_test_db_without_keepdb(self):
+        # Backends overriding create_test_db() without the keepdb argument
+        # still work when the option isn't used.
+        calls = []
+        def create_test_db(verbosity=1, autoclobber=False):
+            calls.append(verbosity)
+            return ':memory:'
+        old_names = {}
+        for alias in connections:
+            old_names[alias] = connections[alias].settings_dict['NAME']
+            connections[alias].creation.create_test_db = create_test_db
+        try:
+            simple.DjangoTestSuiteRunner(verbosity=0).setup_databases()
+        finally:
+            for alias in connections:
+                del connections[alias].creation.create_test_db
+                connections[alias].settings_dict['NAME'] = old_names[alias]
+        self.assertTrue(calls)
+
+    def test_clone_from_template(self):
+        template_name = self.creation._get_test_db_template_name()
+        self.assertTrue(template_name.startswith(self.test_name + '_template_'))
+        template = sqlite3.connect(template_name)
+        template.execute('CREATE TABLE kept (id integer)')
+        template.close()
+        stale_name = self.test_name + '_template_0123456789ab'
+        open(stale_name, 'w').close()
+        self.assertEqual(sorted(self.creation._get_test_db_templates()),
+                         sorted([template_name, stale_name]))
+
+        # The test database is cloned rather than synced.
+        self.assertEqual(self.creation.create_test_db(0, keepdb=True), self.test_name)
+        self.assertEqual(self.connection.introspection.table_names(), ['kept'])
+        self.creation.destroy_test_db('', 0)
+        self.assertFalse(os.path.exists(self.test_name))
+        self.assertTrue(os.path.exists(template_name))
+
+    def test_in_memory_database(self):
+        self.connection.settings_dict['TEST_NAME'] = None
+        self.assertTrue(self.connection.features.can_clone_databases)
+        self.assertFalse(self.creation.can_keep_test_db())
+
+    def test_worker_clones(self):
+        source = sqlite3.connect(self.test_name)
+        source.execute('CREATE TABLE cloned (id integer)')
+        source.close()
+        self.connection.settings_dict['NAME'] = self.test_name
+        names = self.creation.create_worker_test_dbs(2, '', 0)
+        self.assertEqual(names, [self.test_name + '_1', self.test_name + '_2'])
+        for name in names:
+            clone = sqlite3.connect(name)
+            self.assertEqual(clone.execute('SELECT name FROM sqlite_master').fetchall(),
+                             [('cloned',)])
+            clone.close()
+        self.assertEqual(self.connection.settings_dict['NAME'], self.test_name)
+        self.creation.destroy_worker_test_dbs(names, '', 0)
+        self.assertFalse(os.path.exists(names[0]))
+        self.assertFalse(os.path.exists(names[1]))
+
+        # The workers inherit the in-memory database.
+        self.connection.settings_dict['NAME'] = ':memory:'
+        self.assertEqual(self.creation.create_worker_test_dbs(2, '', 0),
+                         [':memory:', ':memory:'])
+
+
+class ParallelTestSuiteTests(unittest.TestCase):
+    def get_suite(self):
+        class PassingTests(unittest.TestCase):
+            def test_one(self):
+                pass
+
+            def test_two(self):
+                pass
+
+        class FailingTests(unittest.TestCase):
+            def test_error(self):
+                1 / 0
+
+            def test_failure(self):
+                self.fail("Expected failure message")
+
+            @unittest.skip("Skipped")
+            def test_skip(self):
+                pass
+
+        loader = unittest.defaultTestLoader
+        return unittest.TestSuite([loader.loadTestsFromTestCase(PassingTests),
+                                   loader.loadTestsFromTestCase(FailingTests)])
+
+    def test_partition_suite_by_case(self):
+        suite = self.get_suite()
+        subsuites = simple.partition_suite_by_case(suite)
+        self.assertEqual([[test.id().split('.')[-1] for test in subsuite]
+                          for subsuite in subsuites],
+                         [['test_one', 'test_two'],
+                          ['test_error', 'test_failure', 'test_skip']])
+
+    @unittest.skipIf(multiprocessing is None, "multiprocessing isn't available")
+    def test_run(self):
+        parallel_suite = simple.ParallelTestSuite(self.get_suite(), 2, {})
+        # The outcomes are reported for the tests of the suite.
+        tests = list(parallel_suite.subsuites[1])
+        result = unittest.TestResult()
+        parallel_suite.run(result)
+        self.assertEqual(result.testsRun, 5)
+        self.assertEqual([test for test, err in result.errors], [tests[0]])
+        self.assertTrue('ZeroDivisionError' in result.errors[0][1])
+        self.assertEqual([test for test, err in result.failures], [tests[1]])
+        self.assertTrue('Expected failure message' in result.failures[0][1])
+        self.assertEqual(result.skipped, [(tests[2], "Skipped")])
+
+    @unittest.skipIf(multiprocessing is None, "multiprocessing isn't available")
+    def test_dead_worker(self):
+        class CrashingTests(unittest.TestCase):
+            def test_crash(self):
+                os._exit(1)
+
+            def test_not_run(self):
+                pass
+
+        loader = unittest.defaultTestLoader
+        suite = unittest.TestSuite([loader.loadTestsFromTestCase(CrashingTests),
+                                    self.get_suite()])
+        parallel_suite = simple.ParallelTestSuite(suite, 2, {})
+        crashing = list(parallel_suite.subsuites[0])
+        result = unittest.TestResult()
+        parallel_suite.run(result)
+        # The worker is reported and replaced; the other tests still run.
+        self.assertEqual(result.testsRun, 6)
+        self.assertEqual(len(result.errors), 2)
+        test, err = result.errors[0]
+        if test is not crashing[0]:
+            test, err = result.errors[1]
+        self.assertEqual(test, crashing[0])
+        self.assertTrue('died with exit code 1' in err)
+        self.assertTrue(crashing[1].id() in err)
+
+    @unittest.skipIf(multiprocessing is None, "multiprocessing isn't available")
+    def test_run_serially(self):
+        pid = os.getpid()
+
+        class SerialTests(unittest.TestCase):
+            run_serially = True
+
+            def test_main_process(self):
+                self.assertEqual(os.getpid(), pid)
+
+        class ParallelTests(unittest.TestCase):
+            def test_worker_process(self):
+                self.assertNotEqual(os.getpid(), pid)
+
+        loader = unittest.defaultTestLoader
+        suite = unittest.TestSuite([loader.loadTestsFromTestCase(SerialTests),
+                                    loader.loadTestsFromTestCase(ParallelTests)])
+        result = unittest.TestResult()
+        simple.ParallelTestSuite(suite, 2, {}).run(result)
+        self.assertEqual(result.testsRun, 2)
+        self.assertTrue(result.wasSuccessful())
@@ -3,8 +3,10 @@ Unit tests for reverse URL lookups.
 """
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured, ViewDoesNotExist
+from django.core import urlresolvers
 from django.core.urlresolvers import (reverse, resolve, NoReverseMatch,
-    Resolver404, ResolverMatch, RegexURLResolver, RegexURLPattern)
+    Resolver404, ResolverMatch, RegexURLResolver, RegexURLPattern,
+    literal_prefix, clear_url_caches, get_script_prefix, set_script_prefix)
 from django.http import HttpResponseRedirect, HttpResponsePermanentRedirect
 from django.shortcuts import redirect
 from django.test import TestCase
@@ -164,6 +166,50 @@ class URLPatternReverse(TestCase):
         # Reversing None should raise an error, not return the last un-named view.
         self.assertRaises(NoReverseMatch, reverse, None)
 
+    def test_urlpattern_reverse_cached(self):
+        # Results are the same the second time round, when they're cached.
+        for name, expected, args, kwargs in test_data * 2:
+            try:
+                got = reverse(name, args=args, kwargs=kwargs)
+            except NoReverseMatch, e:
+                self.assertEqual(expected, NoReverseMatch)
+            else:
+                self.assertEqual(got, expected)
+
+    def test_reverse_cache(self):
+        clear_url_caches()
+        self.assertEqual(reverse('places', args=[3]), '/places/3/')
+        self.assertEqual(len(urlresolvers._reverse_cache), 1)
+        self.assertEqual(reverse('places', args=['3']), '/places/3/')
+        self.assertEqual(len(urlresolvers._reverse_cache), 2)
+        self.assertEqual(reverse('places', args=[3], prefix='/prefix/'), '/prefix/places/3/')
+        old_prefix = get_script_prefix()
+        set_script_prefix('/script/')
+        try:
+            self.assertEqual(reverse('places', args=[3]), '/script/places/3/')
+        finally:
+            set_script_prefix(old_prefix)
+        self.assertEqual(len(urlresolvers._reverse_cache), 4)
+        # Arguments that could stringify differently aren't cached.
+        class Place(object):
+            def __unicode__(self):
+                return u'3'
+        self.assertEqual(reverse('places', args=[Place()]), '/places/3/')
+        self.assertEqual(len(urlresolvers._reverse_cache), 4)
+        clear_url_caches()
+        self.assertEqual(len(urlresolvers._reverse_cache), 0)
+
+    def test_reverse_cache_size(self):
+        clear_url_caches()
+        old_size = urlresolvers.REVERSE_CACHE_SIZE
+        urlresolvers.REVERSE_CACHE_SIZE = 2
+        try:
+            for i in range(5):
+                self.assertEqual(reverse('places', args=[i]), '/places/%d/' % i)
+                self.assertTrue(len(urlresolvers._reverse_cache) <= 2)
+        finally:
+            urlresolvers.REVERSE_CACHE_SIZE = old_size
+
 class ResolverTests(unittest.TestCase):
     def test_non_regex(self):
         """
@@ -215,6 +261,64 @@ class ResolverTests(unittest.TestCase):
                         else:
                             self.assertEqual(t.name, e['name'], 'Wrong URL name.  Expected "%s", got "%s".' % (e['name'], t.name))
 
+class ResolverDispatchTests(unittest.TestCase):
+    def test_literal_prefix(self):
+        for regex, prefix in (
+                (r'^normal/$', 'normal/'),
+                (r'^normal/(?P<arg1>\d+)/$', 'normal/'),
+                (r'^places?/$', 'place'),
+                (r'^places+/$', 'place'),
+                (r'^places{1,2}/$', 'place'),
+                (r'^a\.b\/c\d', 'a.b/c'),
+                (r'^[abc]/', ''),
+                (r'^foo|^bar', ''),
+                (r'^Foo/(?i)', ''),
+                (r'normal/$', ''),
+                (r'^', ''),
+                (r'^$', ''),
+                (u'^caf\xe9/', u'caf\xe9/')):
+            self.assertEqual(literal_prefix(regex), prefix)
+
+    def test_pattern_order(self):
+        """
+        Patterns are tried in order, whether or not they have a literal prefix.
+        """
+        patterns = [
+            RegexURLPattern(r'^foo/bar/$', views.empty_view, name='foo-bar'),
+            RegexURLPattern(r'^(?P<slug>\w+)/bar/$', views.empty_view, name='slug-bar'),
+            RegexURLPattern(r'^foo/(?P<other>\w+)/$', views.empty_view, name='foo-other'),
+            RegexURLPattern(r'^f', views.empty_view, name='f'),
+            RegexURLPattern(r'^foo/baz/$', views.empty_view, name='unreachable'),
+            RegexURLPattern(r'baz', views.empty_view, name='baz'),
+        ]
+        resolver = RegexURLResolver(r'^/', patterns)
+        for path, name in (('/foo/bar/', 'foo-bar'), ('/spam/bar/', 'slug-bar'),
+                           ('/foo/baz/', 'foo-other'), ('/fo/', 'f'),
+                           ('/x/baz', 'baz')):
+            self.assertEqual(resolver.resolve(path).url_name, name)
+        self.assertRaises(Resolver404, resolver.resolve, '/x/')
+
+    def test_patterns_changed(self):
+        patterns = [RegexURLPattern(r'^foo/$', views.empty_view, name='foo')]
+        resolver = RegexURLResolver(r'^/', patterns)
+        self.assertEqual(resolver.resolve('/foo/').url_name, 'foo')
+        patterns.insert(0, RegexURLPattern(r'^fo', views.empty_view, name='fo'))
+        self.assertEqual(resolver.resolve('/foo/').url_name, 'fo')
+
+    def test_custom_resolve(self):
+        """
+        Patterns that override resolve() are always tried.
+        """
+        class AnyPattern(RegexURLPattern):
+            def resolve(self, path):
+                return ResolverMatch(views.empty_view, (), {}, 'any')
+        resolver = RegexURLResolver(r'^/', [
+            RegexURLPattern(r'^foo/$', views.empty_view, name='foo'),
+            AnyPattern(r'^never/$', views.empty_view),
+        ])
+        self.assertEqual(resolver.resolve('/foo/').url_name, 'foo')
+        self.assertEqual(resolver.resolve('/bar/').url_name, 'any')
+
 class ReverseLazyTest(TestCase):
     urls = 'regressiontests.urlpatterns_reverse.reverse_lazy_urls'
 
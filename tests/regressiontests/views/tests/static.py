@@ -26,10 +26,73 @@ class StaticTests(TestCase):
         for filename in media_files:
             response = self.client.get('/views/%s/%s' % (self.prefix, filename))
             file_path = path.join(media_dir, filename)
-            self.assertEqual(open(file_path).read(), response.content)
-            self.assertEqual(len(response.content), int(response['Content-Length']))
+            content = ''.join(response)
+            self.assertEqual(open(file_path).read(), content)
+            self.assertEqual(len(content), int(response['Content-Length']))
             self.assertEqual(mimetypes.guess_type(file_path)[1], response.get('Content-Encoding', None))
 
+    def test_range(self):
+        "The static view answers single byte range requests"
+        url = '/views/%s/file.txt' % self.prefix
+        response = self.client.get(url, HTTP_RANGE='bytes=3-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 3-9/22')
+        self.assertEqual(response['Content-Length'], '7')
+        self.assertEqual(''.join(response), 'example')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-6')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 16-21/22')
+        self.assertEqual(''.join(response), ' file.')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=16-100')
+        self.assertEqual(response['Content-Range'], 'bytes 16-21/22')
+        self.assertEqual(''.join(response), ' file.')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get('/views/%s/file.txt' % self.prefix,
+                                   HTTP_RANGE='bytes=22-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */22')
+        self.assertEqual(''.join(response), '')
+
+    def test_ignored_range(self):
+        "Multiple, invalid and outdated ranges are answered with the whole file"
+        url = '/views/%s/file.txt' % self.prefix
+        for extra in ({'HTTP_RANGE': 'bytes=0-1,4-5'},
+                      {'HTTP_RANGE': 'bytes=5-2'},
+                      {'HTTP_RANGE': 'lines=1-2'},
+                      {'HTTP_RANGE': 'bytes=0-1',
+                       'HTTP_IF_RANGE': 'Thu, 01 Jan 1970 00:00:00 GMT'}):
+            response = self.client.get(url, **extra)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(''.join(response), 'An example media file.')
+
+    def test_sendfile_header(self):
+        old_header = settings.SENDFILE_HEADER
+        old_roots = settings.SENDFILE_ROOTS
+        url = '/views/%s/file.txt' % self.prefix
+        try:
+            settings.SENDFILE_HEADER = 'X-Sendfile'
+            response = self.client.get(url)
+            self.assertEqual(response['X-Sendfile'], path.join(media_dir, 'file.txt'))
+            self.assertEqual(''.join(response), '')
+
+            settings.SENDFILE_HEADER = 'X-Accel-Redirect'
+            settings.SENDFILE_ROOTS = {media_dir: '/protected/'}
+            response = self.client.get(url, HTTP_RANGE='bytes=0-1')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/file.txt')
+            self.assertFalse(response.has_header('Content-Length'))
+
+            settings.SENDFILE_ROOTS = {'/elsewhere/': '/protected/'}
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('X-Accel-Redirect'))
+            self.assertEqual(''.join(response), 'An example media file.')
+        finally:
+            settings.SENDFILE_HEADER = old_header
+            settings.SENDFILE_ROOTS = old_roots
+
     def test_unknown_mime_type(self):
         response = self.client.get('/views/%s/file.unknown' % self.prefix)
         self.assertEqual('application/octet-stream', response['Content-Type'])
@@ -38,14 +101,14 @@ class StaticTests(TestCase):
         file_name = 'file.txt'
         response = self.client.get('/views/%s//%s' % (self.prefix, file_name))
         file = open(path.join(media_dir, file_name))
-        self.assertEqual(file.read(), response.content)
+        self.assertEqual(file.read(), ''.join(response))
 
     def test_is_modified_since(self):
         file_name = 'file.txt'
         response = self.client.get('/views/%s/%s' % (self.prefix, file_name),
             HTTP_IF_MODIFIED_SINCE='Thu, 1 Jan 1970 00:00:00 GMT')
         file = open(path.join(media_dir, file_name))
-        self.assertEqual(file.read(), response.content)
+        self.assertEqual(file.read(), ''.join(response))
 
     def test_not_modified_since(self):
         file_name = 'file.txt'
@@ -68,9 +131,9 @@ class StaticTests(TestCase):
         response = self.client.get('/views/%s/%s' % (self.prefix, file_name),
                                    HTTP_IF_MODIFIED_SINCE=invalid_date)
         file = open(path.join(media_dir, file_name))
-        self.assertEqual(file.read(), response.content)
-        self.assertEqual(len(response.content),
-                          int(response['Content-Length']))
+        content = ''.join(response)
+        self.assertEqual(file.read(), content)
+        self.assertEqual(len(content), int(response['Content-Length']))
 
     def test_invalid_if_modified_since2(self):
         """Handle even more bogus If-Modified-Since values gracefully
@@ -83,9 +146,9 @@ class StaticTests(TestCase):
         response = self.client.get('/views/%s/%s' % (self.prefix, file_name),
                                    HTTP_IF_MODIFIED_SINCE=invalid_date)
         file = open(path.join(media_dir, file_name))
-        self.assertEqual(file.read(), response.content)
-        self.assertEqual(len(response.content),
-                          int(response['Content-Length']))
+        content = ''.join(response)
+        self.assertEqual(file.read(), content)
+        self.assertEqual(len(content), int(response['Content-Length']))
 
 
 class StaticHelperTest(StaticTests):
@@ -131,7 +131,7 @@ def teardown(state):
     for key, value in state.items():
         setattr(settings, key, value)
 
-def django_tests(verbosity, interactive, failfast, test_labels):
+def django_tests(verbosity, interactive, failfast, test_labels, parallel=1):
     from django.conf import settings
     state = setup(verbosity, test_labels)
     extra_tests = []
@@ -148,7 +148,8 @@ def django_tests(verbosity, interactive, failfast, test_labels):
         settings.TEST_RUNNER = 'django.test.simple.DjangoTestSuiteRunner'
     TestRunner = get_runner(settings)
 
-    test_runner = TestRunner(verbosity=verbosity, interactive=interactive, failfast=failfast)
+    test_runner = TestRunner(verbosity=verbosity, interactive=interactive, failfast=failfast,
+                             parallel=parallel)
     failures = test_runner.run_tests(test_labels, extra_tests=extra_tests)
 
     teardown(state)
@@ -262,6 +263,8 @@ if __name__ == "__main__":
         help='Tells Django to NOT prompt the user for input of any kind.')
     parser.add_option('--failfast', action='store_true', dest='failfast', default=False,
         help='Tells Django to stop running the test suite after first failed test.')
+    parser.add_option('--parallel', action='store', dest='parallel', type='int', default=1,
+        help='Runs the tests in up to this number of processes, each using its own copy of the test databases.')
     parser.add_option('--settings',
         help='Python path to settings module, e.g. "myproject.settings". If this isn\'t provided, the DJANGO_SETTINGS_MODULE environment variable will be used.')
     parser.add_option('--bisect', action='store', dest='bisect', default=None,
@@ -282,6 +285,7 @@ if __name__ == "__main__":
     elif options.pair:
         paired_tests(options.pair, options, args)
     else:
-        failures = django_tests(int(options.verbosity), options.interactive, options.failfast, args)
+        failures = django_tests(int(options.verbosity), options.interactive, options.failfast, args,
+                                options.parallel)
         if failures:
             sys.exit(bool(failures))